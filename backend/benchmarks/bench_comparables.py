@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import argparse
+
+import numpy as np
+import pandas as pd
+from common import measure, time_call, write_results
+
+from spi_train.comparables import build_comparables_index
+
+DISTRICTS = ["Södermalm", "Kungsholmen", "Vasastan", "Östermalm", "Bromma", "Farsta"]
+NUMERIC = ["area", "rooms", "year_built", "monthly_fee", "transaction_year"]
+
+
+def _sales(rng: np.random.Generator, n: int) -> tuple[pd.DataFrame, pd.Series]:
+    X = pd.DataFrame(
+        {
+            "area": rng.uniform(20, 150, n),
+            "rooms": rng.integers(1, 6, n).astype(float),
+            "year_built": rng.integers(1900, 2024, n).astype(float),
+            "monthly_fee": rng.uniform(1500, 7000, n),
+            "transaction_year": rng.integers(2010, 2025, n).astype(float),
+            "district": rng.choice(DISTRICTS, n),
+        }
+    )
+    return X, pd.Series(50000 + X["area"] * 100 + rng.normal(0, 5000, n))
+
+
+def _brute_force(values: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    z = (values - values.mean(axis=0)) / values.std(axis=0)
+    zq = (query - values.mean(axis=0)) / values.std(axis=0)
+    dist = ((z - zq) ** 2).sum(axis=1)
+    return np.argpartition(dist, k)[:k]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--out", default="backend/reports/benchmarks/comparables.json")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    query = np.array([65.0, 2.0, 1998.0, 3200.0, 2020.0])
+    results: list[dict] = []
+    for n in [int(s) for s in args.sizes.split(",")]:
+        X, y = _sales(rng, n)
+        values = X[NUMERIC].to_numpy()
+        index, build = measure(
+            build_comparables_index,
+            values,
+            X[NUMERIC],
+            y,
+            districts=X["district"],
+            target_col="total_price",
+        )
+        row = {
+            "n_rows": n,
+            "build_s": build["wall_s"],
+            "build_peak_mb": build["peak_mb"],
+            "query_district": time_call(index.query, query, "Vasastan", args.k, repeat=args.repeat),
+            "query_unknown_district": time_call(
+                index.query, query, "Atlantis", args.k, repeat=args.repeat
+            ),
+            "brute_force": time_call(
+                _brute_force, values, query, args.k, repeat=max(5, args.repeat // 20)
+            ),
+        }
+        results.append(row)
+        print(
+            f"n={n:<9} build={row['build_s']:.2f}s  "
+            f"district p50={row['query_district']['p50_ms']:.3f}ms  "
+            f"unknown p50={row['query_unknown_district']['p50_ms']:.3f}ms  "
+            f"brute p50={row['brute_force']['p50_ms']:.2f}ms"
+        )
+
+    out_path = write_results(args.out, "comparables", results, k=args.k)
+    print(f"Wrote {out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
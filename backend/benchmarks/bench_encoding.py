@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import argparse
+
+import numpy as np
+import pandas as pd
+from common import measure, time_call, write_results
+
+from spi_train.config import ModelSpec
+from spi_train.metrics import mae
+from spi_train.models import build_model
+from spi_train.preprocessing import build_preprocessor, native_categorical_indices
+
+NUMERIC = ["area", "rooms", "year_built", "monthly_fee", "transaction_year"]
+CATEGORICAL = ["district"]
+
+
+def _make_frame(n: int, n_districts: int, rng: np.random.Generator) -> pd.DataFrame:
+    # Zipf-like district popularity, as in a real municipality/postcode split
+    weights = 1.0 / np.arange(1, n_districts + 1) ** 1.1
+    codes = rng.choice(n_districts, size=n, p=weights / weights.sum())
+    premium = rng.normal(0, 12000, size=n_districts)
+    area = rng.uniform(20, 300, size=n)
+    year_built = rng.integers(1850, 2025, size=n)
+    monthly_fee = np.clip(rng.normal(3500, 1600, size=n), 0, 20000)
+    transaction_year = rng.integers(2000, 2025, size=n)
+    price = (
+        45000
+        + premium[codes]
+        + (transaction_year - 2015) * 900
+        - np.clip((2026 - year_built) * 70, 0, 12000)
+        - (monthly_fee - 2500) * 1.2
+        + rng.normal(0, 4000, size=n)
+    )
+    return pd.DataFrame(
+        {
+            "area": area,
+            "rooms": np.clip(rng.normal(2.6, 1.2, size=n), 1, 10),
+            "district": np.char.add("D", codes.astype(str)),
+            "year_built": year_built,
+            "monthly_fee": monthly_fee,
+            "transaction_year": transaction_year,
+            "price_per_sqm": price,
+        }
+    )
+
+
+def _dense(X):
+    # HistGradientBoosting rejects sparse input, so one-hot output has to be densified
+    return X.toarray() if hasattr(X, "toarray") else X
+
+
+def _fit(pre, model, X, y):
+    model.fit(_dense(pre.fit_transform(X, y)), y)
+
+
+def _predict(pre, model, X):
+    return model.predict(_dense(pre.transform(X)))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=50000)
+    parser.add_argument("--districts", default="36,300,2000")
+    parser.add_argument("--encodings", default="onehot,ordinal,target")
+    parser.add_argument("--max-iter", type=int, default=200)
+    parser.add_argument("--out", default="backend/reports/benchmarks/encoding.json")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    spec = ModelSpec(type="hist_gradient_boosting", params={"max_iter": args.max_iter})
+    results: list[dict] = []
+
+    for n_districts in [int(x) for x in args.districts.split(",")]:
+        df = _make_frame(args.n, n_districts, rng)
+        split = int(len(df) * 0.8)
+        X, y = df[NUMERIC + CATEGORICAL], df["price_per_sqm"]
+        X_train, y_train, X_test, y_test = X[:split], y[:split], X[split:], y[split:]
+        one_row = X_test.iloc[[0]]
+
+        for encoding in args.encodings.split(","):
+            pre = build_preprocessor(
+                numeric_features=NUMERIC,
+                categorical_features=CATEGORICAL,
+                encoding=encoding,
+                random_state=42,
+            )
+            model = build_model(
+                spec,
+                random_state=42,
+                categorical_features=native_categorical_indices(
+                    numeric_features=NUMERIC, categorical_features=CATEGORICAL, encoding=encoding
+                ),
+            )
+            _, fit_stats = measure(_fit, pre, model, X_train, y_train)
+            y_pred = _predict(pre, model, X_test)
+            row = {
+                "n_rows": args.n,
+                "n_districts": n_districts,
+                "encoding": encoding,
+                "n_features_out": int(pre.transform(one_row).shape[1]),
+                "fit": fit_stats,
+                "single_row_predict": time_call(_predict, pre, model, one_row),
+                "mae": mae(y_test, y_pred),
+            }
+            results.append(row)
+            print(
+                f"districts={n_districts:>5} encoding={encoding:<7} "
+                f"fit={fit_stats['wall_s']:.2f}s peak={fit_stats['peak_mb']:.1f}MB "
+                f"predict_p50={row['single_row_predict']['p50_ms']:.2f}ms MAE={row['mae']:.1f}"
+            )
+
+    out_path = write_results(args.out, "encoding", results, max_iter=args.max_iter)
+    print(f"Wrote {out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
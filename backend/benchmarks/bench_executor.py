@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from time import perf_counter
+
+import joblib
+import numpy as np
+import pandas as pd
+from common import write_results
+from sklearn.ensemble import RandomForestRegressor
+
+from spi_api.executor import InferenceExecutor
+from spi_api.inference import frame_from_rows, predict_frame
+from spi_api.model_loader import load_artifacts
+from spi_train.preprocessing import build_preprocessor
+
+DISTRICTS = ["Södermalm", "Kungsholmen", "Vasastan", "Östermalm", "Bromma", "Farsta"]
+
+
+def _frame(rng: np.random.Generator, n: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "area": rng.uniform(20, 150, n),
+            "rooms": rng.integers(1, 6, n).astype(float),
+            "district": rng.choice(DISTRICTS, n),
+            "year_built": rng.integers(1900, 2024, n),
+            "monthly_fee": rng.uniform(1500, 7000, n),
+            "transaction_year": rng.integers(2010, 2025, n),
+        }
+    )
+
+
+def _write_artifacts(tmp: Path, args: argparse.Namespace) -> None:
+    rng = np.random.default_rng(42)
+    X = _frame(rng, args.n_train)
+    y = 50000 + X["area"] * 100 + rng.normal(0, 5000, args.n_train)
+    pre = build_preprocessor(
+        numeric_features=["area", "rooms", "year_built", "monthly_fee", "transaction_year"],
+        categorical_features=["district"],
+    )
+    model = RandomForestRegressor(
+        n_estimators=args.n_estimators, max_depth=args.max_depth, random_state=42, n_jobs=-1
+    ).fit(pre.fit_transform(X), y)
+    model.n_jobs = None
+    joblib.dump(pre, tmp / "pre.pkl")
+    joblib.dump(model, tmp / "model.pkl")
+    os.environ.update(
+        MODEL_PATH=str(tmp / "model.pkl"),
+        PREPROCESSOR_PATH=str(tmp / "pre.pkl"),
+        MODEL_VERSION="bench",
+    )
+
+
+def _run(predict, requests: list[pd.DataFrame], concurrency: int) -> dict:
+    # `concurrency` client threads, like the API threadpool serving parallel requests
+    latencies: list[float] = []
+
+    def one(X_df: pd.DataFrame) -> None:
+        start = perf_counter()
+        predict(X_df)
+        latencies.append((perf_counter() - start) * 1000.0)
+
+    start = perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        list(clients.map(one, requests))
+    elapsed = perf_counter() - start
+    latencies.sort()
+    return {
+        "requests_per_s": len(requests) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-train", type=int, default=20000)
+    parser.add_argument("--n-estimators", type=int, default=400)
+    parser.add_argument("--max-depth", type=int, default=14)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=1, help="Rows per request")
+    parser.add_argument("--concurrency", default="1,2,4,8")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--out", default="backend/reports/benchmarks/executor.json")
+    args = parser.parse_args()
+
+    results: list[dict] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        _write_artifacts(Path(tmp), args)
+        artifacts = load_artifacts()
+        rng = np.random.default_rng(0)
+        requests = [
+            frame_from_rows(_frame(rng, args.rows).to_dict("records")) for _ in range(args.requests)
+        ]
+
+        executor = InferenceExecutor(args.workers)
+        executor.start()
+        try:
+            for concurrency in [int(c) for c in args.concurrency.split(",")]:
+                for mode, predict in [
+                    ("threadpool", lambda X_df: predict_frame(artifacts, X_df)),
+                    ("process_pool", executor.predict),
+                ]:
+                    row = {
+                        "mode": mode,
+                        "concurrency": concurrency,
+                        **_run(predict, requests, concurrency),
+                    }
+                    results.append(row)
+                    print(
+                        f"{mode:<12} c={concurrency:<3} {row['requests_per_s']:8.1f} req/s  "
+                        f"p50={row['p50_ms']:.1f}ms p95={row['p95_ms']:.1f}ms"
+                    )
+        finally:
+            executor.shutdown()
+
+    out_path = write_results(
+        args.out,
+        "executor",
+        results,
+        workers=args.workers,
+        n_estimators=args.n_estimators,
+        max_depth=args.max_depth,
+        rows_per_request=args.rows,
+        cpu_count=os.cpu_count(),
+    )
+    print(f"Wrote {out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
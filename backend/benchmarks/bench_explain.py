@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import argparse
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+from common import measure, time_call, write_results
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+
+from spi_train.preprocessing import build_preprocessor, output_feature_groups
+from spi_train.treeshap import build_tree_explainer
+
+DISTRICTS = ["Södermalm", "Kungsholmen", "Vasastan", "Östermalm", "Bromma", "Farsta"]
+NUMERIC = ["area", "rooms", "year_built", "monthly_fee", "transaction_year"]
+
+
+def _frame(rng: np.random.Generator, n: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "area": rng.uniform(20, 150, n),
+            "rooms": rng.integers(1, 6, n).astype(float),
+            "district": rng.choice(DISTRICTS, n),
+            "year_built": rng.integers(1900, 2024, n),
+            "monthly_fee": rng.uniform(1500, 7000, n),
+            "transaction_year": rng.integers(2010, 2025, n),
+        }
+    )
+
+
+def _naive_tree_shap(tree, x: np.ndarray, phi: np.ndarray) -> None:
+    # Per-tree recursive TreeSHAP (Lundberg et al., Algorithm 2) in plain Python: the
+    # baseline a straightforward implementation would use, one tree and one row at a time
+    t = tree.tree_
+    left, right, feature = t.children_left, t.children_right, t.feature
+    threshold, cover, value = t.threshold, t.weighted_n_node_samples, t.value[:, 0, 0]
+
+    def extend(path, pz, po, pi):
+        path = [list(p) for p in path] + [[pi, pz, po, 1.0 if not path else 0.0]]
+        n = len(path) - 1
+        for i in range(n - 1, -1, -1):
+            path[i + 1][3] += po * path[i][3] * (i + 1) / (n + 1)
+            path[i][3] = pz * path[i][3] * (n - i) / (n + 1)
+        return path
+
+    def unwind(path, i):
+        path = [list(p) for p in path]
+        n = len(path) - 1
+        _, pz, po, _ = path[i]
+        nxt = path[n][3]
+        for j in range(n - 1, -1, -1):
+            if po != 0:
+                tmp = path[j][3]
+                path[j][3] = nxt * (n + 1) / ((j + 1) * po)
+                nxt = tmp - path[j][3] * pz * (n - j) / (n + 1)
+            else:
+                path[j][3] = path[j][3] * (n + 1) / (pz * (n - j))
+        for j in range(i, n):
+            path[j][:3] = path[j + 1][:3]
+        return path[:-1]
+
+    def unwound_sum(path, i):
+        n = len(path) - 1
+        _, pz, po, _ = path[i]
+        total, nxt = 0.0, path[n][3]
+        for j in range(n - 1, -1, -1):
+            if po != 0:
+                tmp = nxt * (n + 1) / ((j + 1) * po)
+                total += tmp
+                nxt = path[j][3] - tmp * pz * (n - j) / (n + 1)
+            else:
+                total += path[j][3] / (pz * (n - j) / (n + 1))
+        return total
+
+    def recurse(node, path, pz, po, pi):
+        path = extend(path, pz, po, pi)
+        if left[node] == -1:
+            for i in range(1, len(path)):
+                w = unwound_sum(path, i)
+                phi[path[i][0]] += w * (path[i][2] - path[i][1]) * value[node]
+            return
+        f = feature[node]
+        hot, cold = (
+            (left[node], right[node])
+            if np.float32(x[f]) <= threshold[node]
+            else (right[node], left[node])
+        )
+        iz, io = 1.0, 1.0
+        for k in range(1, len(path)):
+            if path[k][0] == f:
+                iz, io = path[k][1], path[k][2]
+                path = unwind(path, k)
+                break
+        recurse(hot, path, iz * cover[hot] / cover[node], io, f)
+        recurse(cold, path, iz * cover[cold] / cover[node], 0.0, f)
+
+    recurse(0, [], 1.0, 1.0, -1)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-train", type=int, default=20000)
+    parser.add_argument("--rf-trees", type=int, default=400)
+    parser.add_argument("--rf-depth", type=int, default=12)
+    parser.add_argument("--hgb-iter", type=int, default=500)
+    parser.add_argument("--hgb-depth", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--naive-trees", type=int, default=10, help="Trees timed for the baseline")
+    parser.add_argument("--out", default="backend/reports/benchmarks/explain.json")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    X = _frame(rng, args.n_train)
+    y = 50000 + X["area"] * 100 + rng.normal(0, 5000, args.n_train)
+    pre = build_preprocessor(numeric_features=NUMERIC, categorical_features=["district"])
+    Xt = pre.fit_transform(X)
+    Xt = Xt.toarray() if hasattr(Xt, "toarray") else np.asarray(Xt)
+    groups, names = output_feature_groups(pre)
+    rows = np.asarray(pre.transform(_frame(rng, args.batch)))
+
+    models = {
+        "random_forest": RandomForestRegressor(
+            n_estimators=args.rf_trees, max_depth=args.rf_depth, n_jobs=-1, random_state=0
+        ),
+        "hist_gradient_boosting": HistGradientBoostingRegressor(
+            max_iter=args.hgb_iter, max_depth=args.hgb_depth, early_stopping=False, random_state=0
+        ),
+    }
+    results: list[dict] = []
+    for name, model in models.items():
+        model.fit(Xt, y)
+        explainer, build = measure(
+            build_tree_explainer, model, feature_groups=groups, group_names=names
+        )
+        single = time_call(explainer.shap_values, rows[:1], repeat=args.repeat)
+        batch = time_call(explainer.shap_values, rows, repeat=max(1, args.repeat // 5))
+        row = {
+            "model": name,
+            "n_leaves": int(explainer.leaves.size),
+            "n_groups": len(explainer.group_names),
+            "build_s": build["wall_s"],
+            "build_peak_mb": build["peak_mb"],
+            "single_row": single,
+            "batch_rows": args.batch,
+            "batch_per_row_ms": batch["p50_ms"] / args.batch,
+        }
+        if name == "random_forest":
+            # Naive per-tree Python on a few trees, scaled to the whole forest
+            phi = np.zeros(Xt.shape[1])
+            start = perf_counter()
+            for tree in model.estimators_[: args.naive_trees]:
+                _naive_tree_shap(tree, rows[0], phi)
+            elapsed = perf_counter() - start
+            row["naive_python_single_row_ms"] = elapsed * 1000.0 * args.rf_trees / args.naive_trees
+        results.append(row)
+        naive = row.get("naive_python_single_row_ms")
+        print(
+            f"{name:<23} leaves={row['n_leaves']:<8} build={row['build_s']:.2f}s  "
+            f"single p50={single['p50_ms']:.1f}ms  batch={row['batch_per_row_ms']:.1f}ms/row"
+            + (f"  naive≈{naive:.0f}ms" if naive is not None else "")
+        )
+
+    out_path = write_results(args.out, "explain", results, n_train=args.n_train)
+    print(f"Wrote {out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
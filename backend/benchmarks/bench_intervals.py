@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import argparse
+
+import numpy as np
+from common import time_call, write_results
+from sklearn.ensemble import RandomForestRegressor
+
+from spi_train.tree_arrays import flatten_forest, quantile_interval
+
+
+def _naive_interval(model, X, level):
+    per_tree = np.stack([est.predict(X) for est in model.estimators_])
+    return quantile_interval(per_tree, level)
+
+
+def _flat_interval(forest, X, level):
+    return quantile_interval(forest.predict_per_tree(X), level)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-train", type=int, default=20000)
+    parser.add_argument("--n-estimators", type=int, default=400)
+    parser.add_argument("--max-depth", type=int, default=14)
+    parser.add_argument("--batch-sizes", default="1,10,100,1000")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--out", default="backend/reports/benchmarks/intervals.json")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    n_features = 42  # five numeric columns plus one-hot districts, as in params_full.json
+    X = rng.normal(size=(args.n_train, n_features))
+    y = X[:, 0] * 3000 + X[:, 1] * 1000 + rng.normal(0, 500, size=args.n_train)
+    model = RandomForestRegressor(
+        n_estimators=args.n_estimators,
+        max_depth=args.max_depth,
+        min_samples_split=6,
+        random_state=42,
+        n_jobs=-1,
+    ).fit(X, y)
+    forest = flatten_forest(model)
+
+    results: list[dict] = []
+    for batch in [int(b) for b in args.batch_sizes.split(",")]:
+        X_batch = rng.normal(size=(batch, n_features))
+        point = time_call(model.predict, X_batch, repeat=args.repeat)
+        flat = time_call(_flat_interval, forest, X_batch, 0.8, repeat=args.repeat)
+        naive = time_call(_naive_interval, model, X_batch, 0.8, repeat=max(3, args.repeat // 5))
+        row = {
+            "batch_size": batch,
+            "point_predict": point,
+            "interval_vectorized": flat,
+            "interval_per_estimator_loop": naive,
+            "overhead_ratio": flat["p50_ms"] / point["p50_ms"],
+        }
+        results.append(row)
+        print(
+            f"batch={batch:>5} point={point['p50_ms']:.2f}ms interval={flat['p50_ms']:.2f}ms "
+            f"loop={naive['p50_ms']:.2f}ms ratio={row['overhead_ratio']:.2f}"
+        )
+
+    out_path = write_results(
+        args.out,
+        "intervals",
+        results,
+        n_estimators=args.n_estimators,
+        max_depth=args.max_depth,
+        n_train=args.n_train,
+    )
+    print(f"Wrote {out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+from common import write_results
+
+from spi_api.logging_utils import ColumnarSink, JsonlSink, read_columnar_log
+
+DISTRICTS = ["Södermalm", "Kungsholmen", "Vasastan", "Östermalm", "Bromma", "Farsta"]
+
+
+def _records(n: int, seed: int = 0) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    out = []
+    for i in range(n):
+        area = float(rng.uniform(20, 150))
+        price = float(rng.normal(70000, 15000))
+        out.append(
+            {
+                "request": {
+                    "area": area,
+                    "rooms": float(rng.integers(1, 6)),
+                    "district": DISTRICTS[i % len(DISTRICTS)],
+                    "year_built": int(rng.integers(1900, 2024)),
+                    "monthly_fee": float(rng.uniform(1500, 7000)),
+                    "transaction_year": None,
+                },
+                "predicted_price_per_sqm": price,
+                "predicted_total_price": price * area,
+                "model_version": "v1",
+                "inference_ms": float(rng.uniform(1, 5)),
+            }
+        )
+    return out
+
+
+def _write_all(sink, records: list[dict]) -> float:
+    start = perf_counter()
+    for r in records:
+        sink.write(r)
+    sink.close()
+    return (perf_counter() - start) / len(records) * 1e6
+
+
+def _scan_jsonl(path: Path) -> np.ndarray:
+    with open(path, encoding="utf-8") as f:
+        return np.array([json.loads(line)["predicted_price_per_sqm"] for line in f])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--batch-rows", type=int, default=256)
+    parser.add_argument("--out", default="backend/reports/benchmarks/log_formats.json")
+    args = parser.parse_args()
+
+    records = _records(args.rows)
+    results: list[dict] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        jsonl = Path(tmp) / "predictions.jsonl"
+        columnar = Path(tmp) / "predictions.spilog"
+
+        for fmt, sink, path in [
+            ("jsonl", JsonlSink(str(jsonl)), jsonl),
+            (
+                "columnar",
+                ColumnarSink(
+                    str(columnar),
+                    fallback=JsonlSink(os.path.join(tmp, "other.jsonl")),
+                    batch_rows=args.batch_rows,
+                ),
+                columnar,
+            ),
+        ]:
+            write_us = _write_all(sink, records)
+            start = perf_counter()
+            if fmt == "jsonl":
+                values = _scan_jsonl(path)
+                scan_all_s = scan_one_s = perf_counter() - start
+            else:
+                values = read_columnar_log(path, ["predicted_price_per_sqm"])[
+                    "predicted_price_per_sqm"
+                ]
+                scan_one_s = perf_counter() - start
+                start = perf_counter()
+                read_columnar_log(path)
+                scan_all_s = perf_counter() - start
+            assert len(values) == args.rows
+            row = {
+                "format": fmt,
+                "bytes_per_record": path.stat().st_size / args.rows,
+                "write_us_per_record": write_us,
+                "scan_one_column_rows_per_s": args.rows / scan_one_s,
+                "scan_all_columns_rows_per_s": args.rows / scan_all_s,
+            }
+            results.append(row)
+            print(
+                f"{fmt:<9} {row['bytes_per_record']:.1f} B/rec  write {write_us:.1f} us/rec  "
+                f"scan 1 col {row['scan_one_column_rows_per_s']:,.0f} rows/s  "
+                f"all {row['scan_all_columns_rows_per_s']:,.0f} rows/s"
+            )
+
+    out_path = write_results(
+        args.out, "log_formats", results, rows=args.rows, batch_rows=args.batch_rows
+    )
+    print(f"Wrote {out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+from common import REPO_ROOT, measure, write_results
+
+from spi_data.jsonstat2 import jsonstat2_to_frame
+from spi_data.pcaxis import pcaxis_to_frame
+from spi_data.prepare import prepare_dataset
+from spi_data.synth import district_table, generate_chunk
+from spi_train.config import load_params
+from spi_train.preprocessing import iqr_clip_frame
+from spi_train.training import train_and_evaluate
+
+NUMERIC = ["area", "rooms", "year_built", "monthly_fee", "transaction_year"]
+STAGES = ["jsonstat2_to_frame", "pcaxis_to_frame", "prepare_dataset", "iqr_clip_frame", "train"]
+YEARS = [str(y) for y in range(2000, 2025)]
+
+
+def _cube(n: int) -> tuple[list[str], np.ndarray]:
+    # A region x year cube like FastprisBRFRegionAr with about n cells
+    regions = [f"R{i:06d}" for i in range(max(1, math.ceil(n / len(YEARS))))]
+    values = np.random.default_rng(0).uniform(1000, 90000, size=len(regions) * len(YEARS))
+    return regions, values.round(1)
+
+
+def jsonstat2_fixture(n: int) -> dict:
+    regions, values = _cube(n)
+    return {
+        "version": "2.0",
+        "class": "dataset",
+        "id": ["Region", "Tid"],
+        "size": [len(regions), len(YEARS)],
+        "dimension": {
+            "Region": {"category": {"index": {r: i for i, r in enumerate(regions)}}},
+            "Tid": {"category": {"index": {y: i for i, y in enumerate(YEARS)}}},
+        },
+        "value": values.tolist(),
+    }
+
+
+def pcaxis_fixture(n: int) -> str:
+    regions, values = _cube(n)
+    rows = values.reshape(len(regions), len(YEARS))
+    lines = [
+        'CHARSET="ANSI";',
+        'STUB="Region";',
+        'HEADING="Tid";',
+        'VALUES("Region")=' + ",".join(f'"{r}"' for r in regions) + ";",
+        'VALUES("Tid")=' + ",".join(f'"{y}"' for y in YEARS) + ";",
+        "DATA=",
+        *(" ".join(f"{v:.1f}" for v in row) for row in rows),
+        ";",
+    ]
+    return "\n".join(lines)
+
+
+def _params(tmp: Path, model: str) -> Path:
+    models = {
+        "linear": {"type": "linear"},
+        "rf": {"type": "random_forest", "n_estimators": 50, "max_depth": 12, "n_jobs": -1},
+        "hgb": {"type": "hist_gradient_boosting", "max_iter": 100},
+    }
+    raw = {
+        "data": {
+            "train_csv": "processed.csv",
+            "target_col": "price_per_sqm",
+            "numeric_features": NUMERIC,
+            "categorical_features": ["district"],
+            # HistGradientBoosting needs dense input; ordinal codes are its native categoricals
+            "encoding": {"method": "ordinal" if model == "hgb" else "onehot"},
+        },
+        "train": {"random_state": 0, "cv_folds": 3, "bootstrap_samples": 0},
+        "models": {model: models[model]},
+        "artifacts": {"dir": "models"},
+        "reports": {"dir": "reports"},
+    }
+    path = tmp / "params.json"
+    path.write_text(json.dumps(raw), encoding="utf-8")
+    return path
+
+
+def _run(fn, *args, repeat: int, **kwargs) -> dict:
+    # Time without tracemalloc (it slows down Python-heavy code), then one traced run for
+    # the allocation peak
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        fn(*args, **kwargs)
+        timings.append(perf_counter() - start)
+    _, traced = measure(fn, *args, **kwargs)
+    return {
+        "wall_s": float(np.median(timings)),
+        "wall_min_s": float(min(timings)),
+        "peak_mb": traced["peak_mb"],
+    }
+
+
+def run_stages(
+    sizes: list[int], stages: list[str], *, repeat: int, train_max_rows: int, model: str
+) -> list[dict]:
+    results: list[dict] = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp = Path(tmp_dir)
+        params_path = _params(tmp, model)
+        for n in sizes:
+            raw = generate_chunk(n, seed=0, chunk=0, districts=district_table(300, skew=1.0))
+            raw.drop(columns=["price_per_sqm"]).to_csv(tmp / "raw.csv", index=False)
+            fixtures = {
+                "jsonstat2_to_frame": (jsonstat2_to_frame, (jsonstat2_fixture(n),), {}),
+                "pcaxis_to_frame": (pcaxis_to_frame, (pcaxis_fixture(n),), {}),
+                "prepare_dataset": (
+                    prepare_dataset,
+                    (),
+                    {
+                        "raw_csv": tmp / "raw.csv",
+                        "processed_csv": tmp / "processed.csv",
+                        "summary_json": tmp / "summary.json",
+                        "required_features": NUMERIC + ["district"],
+                    },
+                ),
+                "iqr_clip_frame": (iqr_clip_frame, (raw, NUMERIC), {}),
+                "train": (
+                    train_and_evaluate,
+                    (),
+                    {
+                        "params": load_params(params_path),
+                        "model_name": model,
+                        "repo_root": tmp,
+                        "version_tag": "bench",
+                    },
+                ),
+            }
+            for stage in stages:
+                if stage == "train" and n > train_max_rows:
+                    continue
+                if stage == "train" and not (tmp / "processed.csv").exists():
+                    prepare_dataset(**fixtures["prepare_dataset"][2])
+                fn, args, kwargs = fixtures[stage]
+                row = {"stage": stage, "rows": n, **_run(fn, *args, repeat=repeat, **kwargs)}
+                results.append(row)
+                print(
+                    f"{stage:<20} rows={n:<9} wall={row['wall_s']:.3f}s peak={row['peak_mb']:.1f}MB"
+                )
+            (tmp / "processed.csv").unlink(missing_ok=True)
+    return results
+
+
+def compare(
+    results: list[dict], baseline: list[dict], *, tolerance: float, min_wall_s: float
+) -> list[dict]:
+    # A regression is a stage/size whose time or allocation peak grew by more than
+    # tolerance; tiny timings are skipped as noise
+    base = {(r["stage"], r["rows"]): r for r in baseline}
+    regressions = []
+    for row in results:
+        old = base.get((row["stage"], row["rows"]))
+        if old is None:
+            continue
+        for metric, floor in (("wall_s", min_wall_s), ("peak_mb", 1.0)):
+            if row[metric] > old[metric] * (1 + tolerance) and row[metric] - old[metric] > floor:
+                regressions.append(
+                    {
+                        "stage": row["stage"],
+                        "rows": row["rows"],
+                        "metric": metric,
+                        "baseline": old[metric],
+                        "current": row[metric],
+                        "change": row[metric] / old[metric] - 1 if old[metric] else math.inf,
+                    }
+                )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--model", choices=["linear", "rf", "hgb"], default="hgb")
+    parser.add_argument("--train-max-rows", type=int, default=100000)
+    parser.add_argument("--out", default="backend/reports/benchmarks/pipeline.json")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--min-wall-s", type=float, default=0.05)
+    args = parser.parse_args()
+
+    stages = args.stages.split(",")
+    unknown = sorted(set(stages) - set(STAGES))
+    if unknown:
+        parser.error(f"Unknown stages: {unknown}")
+    sizes = [int(s) for s in args.sizes.split(",")]
+    results = run_stages(
+        sizes, stages, repeat=args.repeat, train_max_rows=args.train_max_rows, model=args.model
+    )
+    out_path = write_results(
+        args.out, "pipeline", results, sizes=sizes, model=args.model, repeat=args.repeat
+    )
+    print(f"Wrote {out_path}")
+
+    if not args.baseline:
+        return 0
+    baseline_path = Path(args.baseline)
+    if not baseline_path.is_absolute():
+        baseline_path = REPO_ROOT / baseline_path
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))["results"]
+    regressions = compare(results, baseline, tolerance=args.tolerance, min_wall_s=args.min_wall_s)
+    for r in regressions:
+        print(
+            f"REGRESSION {r['stage']} rows={r['rows']} {r['metric']}: "
+            f"{r['baseline']:.3f} -> {r['current']:.3f} ({r['change']:+.0%})"
+        )
+    if not regressions:
+        print(f"No regressions against {baseline_path} (tolerance {args.tolerance:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
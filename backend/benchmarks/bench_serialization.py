@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import argparse
+import json
+from datetime import datetime, timezone
+
+from common import time_call, write_results
+from fastapi.encoders import jsonable_encoder
+
+from spi_api import serialization
+from spi_api.schemas import PredictRequest, PredictResponse
+
+REQUEST = {
+    "area": 65,
+    "rooms": 2,
+    "district": "Södermalm",
+    "year_built": 1998,
+    "monthly_fee": 3200,
+}
+RESULT = {
+    "predicted_price_per_sqm": 71234.56,
+    "predicted_total_price": 4630246.4,
+    "model_version": "v1",
+    "inference_ms": 2.345,
+    "prediction_interval": None,
+}
+
+
+def _default_response(result: dict) -> bytes:
+    # What FastAPI does for a returned model with response_model set: validate the model,
+    # run it through jsonable_encoder, then json.dumps
+    model = PredictResponse(**result)
+    validated = PredictResponse.model_validate(model.model_dump())
+    return json.dumps(jsonable_encoder(validated), ensure_ascii=False).encode("utf-8")
+
+
+def _default_log(record: dict) -> bytes:
+    return json.dumps(
+        {"ts": datetime.now(timezone.utc).isoformat(), **record}, ensure_ascii=False
+    ).encode("utf-8")
+
+
+def _fast_log(record: dict) -> bytes:
+    return serialization.dumps({"ts": datetime.now(timezone.utc).isoformat(), **record})
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20_000)
+    parser.add_argument("--out", default="backend/reports/benchmarks/serialization.json")
+    args = parser.parse_args()
+
+    raw = json.dumps(REQUEST).encode("utf-8")
+    log_record = {"request": REQUEST, **RESULT}
+    stages = {
+        "request_validate_dict": lambda: PredictRequest.model_validate(json.loads(raw)),
+        "request_validate_json": lambda: PredictRequest.model_validate_json(raw),
+        "response_default": lambda: _default_response(RESULT),
+        "response_fast": lambda: serialization.dumps(RESULT),
+        "log_encode_default": lambda: _default_log(log_record),
+        "log_encode_fast": lambda: _fast_log(log_record),
+    }
+
+    results: list[dict] = []
+    for name, fn in stages.items():
+        t = time_call(fn, repeat=args.repeat)
+        row = {"stage": name, "p50_us": t["p50_ms"] * 1000.0, "p95_us": t["p95_ms"] * 1000.0}
+        results.append(row)
+        print(f"{name:<24} p50={row['p50_us']:.2f}us p95={row['p95_us']:.2f}us")
+
+    out_path = write_results(
+        args.out,
+        "serialization",
+        results,
+        orjson=serialization.orjson is not None,
+        repeat=args.repeat,
+    )
+    print(f"Wrote {out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
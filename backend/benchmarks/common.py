@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import json
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter, process_time
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+def measure(fn, *args, **kwargs) -> tuple[object, dict]:
+    tracemalloc.start()
+    cpu_start = process_time()
+    start = perf_counter()
+    try:
+        result = fn(*args, **kwargs)
+        wall_s = perf_counter() - start
+        cpu_s = process_time() - cpu_start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, {
+        "wall_s": float(wall_s),
+        "cpu_s": float(cpu_s),
+        "peak_mb": float(peak / (1024 * 1024)),
+    }
+
+
+def time_call(fn, *args, repeat: int = 50, **kwargs) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        fn(*args, **kwargs)
+        timings.append((perf_counter() - start) * 1000.0)
+    timings.sort()
+    return {
+        "p50_ms": float(timings[len(timings) // 2]),
+        "p95_ms": float(timings[min(len(timings) - 1, int(len(timings) * 0.95))]),
+        "min_ms": float(timings[0]),
+    }
+
+
+def write_results(out: str, name: str, results: list[dict], **meta) -> Path:
+    out_path = (REPO_ROOT / out).resolve() if not Path(out).is_absolute() else Path(out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "benchmark": name,
+        "created_at_utc": datetime.now(timezone.utc).isoformat(),
+        **meta,
+        "results": results,
+    }
+    out_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    return out_path
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+
+def _resolve_runs(paths: list[str], repo_root: Path) -> list[Path]:
+    runs: list[Path] = []
+    for raw in paths:
+        p = Path(raw)
+        p = (repo_root / p).resolve() if not p.is_absolute() else p
+        if p.is_dir():
+            runs.extend(sorted(p.glob("run_*.json")))
+        else:
+            runs.append(p)
+    return runs
+
+
+def _load_profile(path: Path) -> dict | None:
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    profile = payload.get("profile") if isinstance(payload, dict) else None
+    return profile if isinstance(profile, dict) else None
+
+
+def _fmt_delta(value: float, base: float) -> str:
+    if base <= 0:
+        return ""
+    return f" ({(value - base) / base * 100.0:+.0f}%)"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Compare per-stage training profiles across run_*.json files"
+    )
+    parser.add_argument("runs", nargs="+", help="Run JSON files or reports directories")
+    parser.add_argument(
+        "--metric", choices=["wall_s", "cpu_s", "peak_tracemalloc_mb"], default="wall_s"
+    )
+    parser.add_argument("--folds", action="store_true", help="Show each fold separately")
+    args = parser.parse_args()
+
+    repo_root = Path(__file__).resolve().parents[2]
+    profiles: list[tuple[str, dict]] = []
+    for path in _resolve_runs(args.runs, repo_root):
+        profile = _load_profile(path)
+        if profile is None:
+            print(f"Skipping {path.name}: no profile recorded")
+            continue
+        profiles.append((path.stem, profile))
+    if not profiles:
+        print("No profiles to compare")
+        return 1
+
+    rows: dict[str, list[float | None]] = {}
+    for i, (_, profile) in enumerate(profiles):
+        if args.folds:
+            for s in profile.get("stages", []):
+                key = s["stage"] if s.get("fold") is None else f"{s['stage']}[{s['fold']}]"
+                rows.setdefault(key, [None] * len(profiles))[i] = s.get(args.metric)
+        else:
+            for stage, t in profile.get("totals", {}).items():
+                rows.setdefault(stage, [None] * len(profiles))[i] = t.get(args.metric)
+
+    width = max(len(k) for k in rows) + 2
+    col = max(18, *(len(name) for name, _ in profiles))
+    print("stage".ljust(width) + " | ".join(name.ljust(col) for name, _ in profiles))
+    for stage, values in rows.items():
+        base = values[0]
+        cells = []
+        for v in values:
+            if v is None:
+                cells.append("-")
+            else:
+                cells.append(f"{v:.3f}" + (_fmt_delta(v, base) if base is not None else ""))
+        print(stage.ljust(width) + " | ".join(c.ljust(col) for c in cells))
+    for name, profile in profiles:
+        print(
+            f"{name}: peak_tracemalloc_mb={profile.get('peak_tracemalloc_mb')} "
+            f"max_rss_mb={profile.get('max_rss_mb')}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
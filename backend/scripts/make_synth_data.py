@@ -1,115 +1,101 @@
 from __future__ import annotations
 
 import argparse
+import os
+import shutil
 from pathlib import Path
+from time import perf_counter
 
-import numpy as np
-import pandas as pd
+from spi_data.synth import DISTRICTS, district_table, write_partitions
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise SystemExit(
+            "Parquet output needs pyarrow. Install it with: pip install pyarrow"
+        ) from e
+    return pq
+
+
+def _concat_parts(parts: list[Path], out_path: Path, fmt: str) -> None:
+    tmp = out_path.with_name(out_path.name + ".tmp")
+    if fmt == "parquet":
+        pq = _require_pyarrow()
+        writer = None
+        try:
+            for part in parts:
+                table = pq.read_table(part)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        with open(tmp, "wb") as dst:
+            for i, part in enumerate(parts):
+                with open(part, "rb") as src:
+                    header = src.readline()
+                    if i == 0:
+                        dst.write(header)
+                    shutil.copyfileobj(src, dst, length=1024 * 1024)
+    os.replace(tmp, out_path)
 
 
 def main() -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument("--out", default="data/processed/train.csv")
+    parser.add_argument(
+        "--out-dir", help="Write one part file per chunk into this directory instead of --out"
+    )
     parser.add_argument("--n", type=int, default=6000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--format", choices=["csv", "parquet"], default=None)
+    parser.add_argument("--districts", type=int, default=len(DISTRICTS))
+    parser.add_argument(
+        "--skew", type=float, default=0.0, help="Zipf exponent of the district distribution"
+    )
     args = parser.parse_args()
 
     repo_root = Path(__file__).resolve().parents[2]
-    out_path = (repo_root / args.out).resolve()
-    out_path.parent.mkdir(parents=True, exist_ok=True)
+    fmt = args.format or ("parquet" if Path(args.out).suffix == ".parquet" else "csv")
+    if fmt == "parquet":
+        _require_pyarrow()
+    districts = district_table(args.districts, skew=args.skew)
 
-    rng = np.random.default_rng(42)
-    districts = np.array(
-        [
-            "Södermalm",
-            "Kungsholmen",
-            "Vasastan",
-            "Östermalm",
-            "Norrmalm",
-            "Bromma",
-            "Hägersten-Liljeholmen",
-            "Enskede-Årsta-Vantör",
-            "Farsta",
-            "Skärholmen",
-            "Spånga-Tensta",
-            "Rinkeby-Kista",
-            "Älvsjö",
-            "Skarpnäck",
-            "Stockholm",
-            "Solna",
-            "Sundbyberg",
-            "Nacka",
-            "Lidingö",
-            "Täby",
-            "Danderyd",
-            "Järfälla",
-            "Sollentuna",
-            "Upplands Väsby",
-            "Vallentuna",
-            "Värmdö",
-            "Tyresö",
-            "Haninge",
-            "Huddinge",
-            "Botkyrka",
-            "Salem",
-            "Ekerö",
-            "Sigtuna",
-            "Nynäshamn",
-            "Vaxholm",
-            "Österåker",
-            "Unknown",
-        ]
-    )
-
-    area = rng.uniform(20, 300, size=args.n)
-    rooms = np.clip(rng.normal(2.6, 1.2, size=args.n), 1, 10)
-    year_built = rng.integers(1850, 2025, size=args.n)
-    monthly_fee = np.clip(rng.normal(3500, 1600, size=args.n), 0, 20000)
-    transaction_year = rng.integers(2000, 2025, size=args.n)
-    district = rng.choice(districts, size=args.n)
-
-    base = 45000
-    district_premium = {
-        "Östermalm": 35000,
-        "Södermalm": 20000,
-        "Vasastan": 18000,
-        "Kungsholmen": 15000,
-        "Unknown": 0,
-    }
-    premium = np.array([district_premium.get(d, 0) for d in district], dtype=float)
-    age_penalty = np.clip((2026 - year_built) * 70, 0, 12000)
-    fee_penalty = (monthly_fee - 2500) * 1.2
-    year_trend = (transaction_year - 2015) * 900
-    noise = rng.normal(0, 4000, size=args.n)
+    start = perf_counter()
+    if args.out_dir:
+        out = (repo_root / args.out_dir).resolve()
+        parts = write_partitions(
+            out,
+            args.n,
+            chunk_rows=args.chunk_rows,
+            seed=args.seed,
+            districts=districts,
+            fmt=fmt,
+            workers=args.workers,
+        )
+        print(f"Wrote {args.n} rows to {len(parts)} parts in {out} ({perf_counter() - start:.1f}s)")
+        return 0
 
-    size_effect = np.clip((area - 60) * -18, -3500, 2500)
-    room_effect = np.clip((rooms - 2.5) * 650, -2500, 4500)
-    price_per_sqm = (
-        base
-        + premium
-        + year_trend
-        + size_effect
-        + room_effect
-        - age_penalty
-        - fee_penalty
-        + noise
-    )
-    price_per_sqm = np.clip(price_per_sqm, 25000, 140000)
-    total_price = price_per_sqm * area
-
-    df = pd.DataFrame(
-        {
-            "area": area,
-            "rooms": rooms,
-            "district": district,
-            "year_built": year_built,
-            "monthly_fee": monthly_fee,
-            "transaction_year": transaction_year,
-            "price_per_sqm": price_per_sqm,
-            "total_price": total_price,
-        }
+    out_path = (repo_root / args.out).resolve()
+    parts_dir = out_path.with_name(out_path.name + ".parts")
+    parts = write_partitions(
+        parts_dir,
+        args.n,
+        chunk_rows=args.chunk_rows,
+        seed=args.seed,
+        districts=districts,
+        fmt=fmt,
+        workers=args.workers,
     )
-    df.to_csv(out_path, index=False)
-    print(f"Wrote {len(df)} rows to {out_path}")
+    _concat_parts(parts, out_path, fmt)
+    shutil.rmtree(parts_dir)
+    print(f"Wrote {args.n} rows to {out_path} ({perf_counter() - start:.1f}s)")
     return 0
 
 
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from pathlib import Path
+
+from spi_api.monitoring import drift_report, load_feature_profile, summarize_logs
+from spi_train.config import load_params
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Summarize prediction logs and score drift against the training profile"
+    )
+    parser.add_argument("logs", nargs="+", help="predictions.jsonl or .spilog files")
+    parser.add_argument("--params", default="params.json")
+    parser.add_argument(
+        "--run", help="Run JSON with a profile (default: latest.json in the params' reports dir)"
+    )
+    parser.add_argument("--no-drift", action="store_true", help="Only summarize the logs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--out", help="Write the report as JSON here")
+    args = parser.parse_args()
+
+    repo_root = Path(__file__).resolve().parents[2]
+    profile = None
+    if not args.no_drift:
+        if args.run:
+            run_path = Path(args.run)
+            run_path = run_path if run_path.is_absolute() else repo_root / run_path
+        else:
+            params = load_params(repo_root / args.params)
+            run_path = repo_root / params.reports.dir / "latest.json"
+        if not run_path.exists():
+            print(f"No run JSON at {run_path}; pass --run, or --no-drift to skip drift scores")
+            return 1
+        try:
+            profile = load_feature_profile(run_path)
+        except ValueError as e:
+            print(f"{e}, or pass --no-drift")
+            return 1
+
+    summary = summarize_logs([Path(p) for p in args.logs], profile=profile, workers=args.workers)
+    report = {"summary": summary.to_dict()}
+    if profile is not None:
+        report["drift"] = drift_report(summary, profile)
+
+    s = report["summary"]
+    print(f"records={s['records']} bad_lines={s['bad_lines']} distinct~{s['distinct_requests']}")
+    print(f"endpoints={s['endpoints']}")
+    print(f"latency_ms={s['latency_ms']}")
+    for feature, d in report.get("drift", {}).items():
+        print(f"  {feature:<18} PSI={d['psi']:.3f} {d['status']}")
+
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Saved: {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,6 +3,7 @@ from __future__ import annotations
 import argparse
 from pathlib import Path
 
+from spi_train.cache import StageCache
 from spi_train.config import load_params
 from spi_train.training import train_and_evaluate
 
@@ -12,21 +13,36 @@ def main() -> int:
     parser.add_argument("--params", default="params.json")
     parser.add_argument("--model", default="baseline")
     parser.add_argument("--version", default="v1")
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="Record per-stage tracemalloc peaks (slower; wall/CPU time is always recorded)",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Recompute every stage")
+    parser.add_argument("--cache-dir", default="backend/.cache/spi_train")
+    parser.add_argument("--cache-max-mb", type=int, default=2048)
     args = parser.parse_args()
 
     repo_root = Path(__file__).resolve().parents[2]
     params = load_params(repo_root / args.params)
+    cache = None
+    if not args.no_cache:
+        cache = StageCache(repo_root / args.cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024)
     run, model_path, pre_path = train_and_evaluate(
         params=params,
         model_name=args.model,
         repo_root=repo_root,
         version_tag=args.version,
+        profile_memory=args.profile_memory,
+        cache=cache,
     )
 
     print(f"model={run.model_name} type={run.model_type}")
     print(f"MAE={run.mean_mae:.2f} RMSE={run.mean_rmse:.2f} R2={run.mean_r2:.4f}")
     print(f"Saved: {model_path}")
     print(f"Saved: {pre_path}")
+    if cache is not None:
+        print(f"Cache: {cache.hits} hits, {cache.misses} misses ({cache.root})")
     return 0
 
 
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import argparse
+import json
+from dataclasses import replace
+from pathlib import Path
+
+from spi_train.config import load_params
+from spi_train.search import run_search
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--params", default="params.json")
+    parser.add_argument("--model", default="rf", help="Model in params.json to search around")
+    parser.add_argument("--n-candidates", type=int, default=None)
+    parser.add_argument("--n-jobs", type=int, default=None)
+    args = parser.parse_args()
+
+    repo_root = Path(__file__).resolve().parents[2]
+    params = load_params(repo_root / args.params)
+    overrides = {
+        k: v
+        for k, v in (("n_candidates", args.n_candidates), ("n_jobs", args.n_jobs))
+        if v is not None
+    }
+    if overrides:
+        params = replace(params, search=replace(params.search, **overrides))
+
+    report, out_path = run_search(params=params, model_name=args.model, repo_root=repo_root)
+
+    for rung in report["rungs"]:
+        print(
+            f"rung {rung['rung']}: rows={rung['rows']} candidates={rung['candidates']} "
+            f"stopped={rung['stopped']} promoted={rung['promoted']} ({rung['wall_s']:.1f}s)"
+        )
+    winner = report["winner"]
+    print(f"best {report['metric']}={winner['score']:.2f}")
+    print(json.dumps(winner["spec"], ensure_ascii=False))
+    print(f"Saved: {out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from spi_api.inference import FEATURE_COLUMNS, predict_frame, price_outputs
+from spi_api.model_loader import LoadedArtifacts, load_artifacts
+
+OUTPUT_COLUMNS = ["predicted_price_per_sqm", "predicted_total_price", "error"]
+NUMERIC_COLUMNS = [c for c in FEATURE_COLUMNS if c != "district"]
+
+_artifacts: LoadedArtifacts | None = None
+_target_mode = "price_per_sqm"
+
+
+def _is_parquet(path: Path) -> bool:
+    return path.suffix.lower() in {".parquet", ".pq"}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise SystemExit(
+            "Parquet input/output needs pyarrow. Install it with: pip install pyarrow"
+        ) from e
+    return pq
+
+
+def input_columns(path: Path) -> list[str]:
+    if _is_parquet(path):
+        return list(_require_pyarrow().ParquetFile(path).schema_arrow.names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def iter_chunks(path: Path, chunk_rows: int, start_chunk: int = 0) -> Iterator[pd.DataFrame]:
+    # Chunks from index start_chunk on. CSV skips the earlier rows without parsing them;
+    # Parquet batches are still decoded and dropped.
+    if _is_parquet(path):
+        pq = _require_pyarrow()
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunk_rows)
+        for index, batch in enumerate(batches):
+            if index >= start_chunk:
+                yield batch.to_pandas()
+    else:
+        skip = range(1, 1 + start_chunk * chunk_rows) if start_chunk else None
+        for chunk in pd.read_csv(path, chunksize=chunk_rows, skiprows=skip):
+            # Skipping every row still yields one empty frame
+            if len(chunk):
+                yield chunk
+
+
+def _init_worker(env: dict[str, str]) -> None:
+    # Runs once per worker process: load artifacts a single time and keep each worker
+    # single-threaded so throughput scales with the number of processes.
+    global _artifacts, _target_mode
+    os.environ.update(env)
+    _artifacts = load_artifacts()
+    if hasattr(_artifacts.model, "n_jobs"):
+        _artifacts.model.n_jobs = 1
+    _target_mode = env.get("TARGET_MODE", "price_per_sqm").strip().lower()
+
+
+def _write_atomic(df: pd.DataFrame, path: Path) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    if _is_parquet(path):
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_csv(tmp, index=False, header=False)
+    os.replace(tmp, path)
+
+
+def score_chunk(index: int, chunk: pd.DataFrame, part_path: str) -> tuple[int, int]:
+    # Scores one chunk and writes it to its own part file, so completed chunks survive a
+    # crash and results never travel back through the parent process.
+    assert _artifacts is not None
+    X_df = chunk.reindex(columns=FEATURE_COLUMNS)
+    # Like /predict/bulk, a bad value fails its own row instead of the whole chunk: values
+    # that are present but not numbers get NaN predictions and an error, and missing
+    # values are left to the preprocessor's imputer.
+    coerced = X_df[NUMERIC_COLUMNS].apply(pd.to_numeric, errors="coerce")
+    bad = coerced.isna() & X_df[NUMERIC_COLUMNS].notna()
+    X_df[NUMERIC_COLUMNS] = coerced
+    valid = ~bad.any(axis=1).to_numpy()
+    pred = np.full(len(X_df), np.nan)
+    if valid.any():
+        pred[valid] = predict_frame(_artifacts, X_df[valid])
+    area = X_df["area"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        price_per_sqm, total_price = price_outputs(pred, area, target_mode=_target_mode)
+    out = chunk.copy()
+    out["predicted_price_per_sqm"] = price_per_sqm
+    out["predicted_total_price"] = total_price
+    out["error"] = [
+        None if ok else "non-numeric " + ", ".join(bad.columns[row])
+        for ok, row in zip(valid, bad.to_numpy(), strict=True)
+    ]
+    _write_atomic(out, Path(part_path))
+    return index, len(out)
+
+
+def _part_path(parts_dir: Path, index: int, parquet: bool) -> Path:
+    return parts_dir / f"part_{index:06d}.{'parquet' if parquet else 'csv'}"
+
+
+def _check_manifest(parts_dir: Path, manifest: dict, resume: bool) -> None:
+    path = parts_dir / "manifest.json"
+    if resume and path.exists():
+        previous = json.loads(path.read_text(encoding="utf-8"))
+        if previous != manifest:
+            raise SystemExit(
+                f"Cannot resume: {path} was written for a different input, chunk size or "
+                "model. Rerun without --resume to start over."
+            )
+        return
+    if parts_dir.exists():
+        shutil.rmtree(parts_dir)
+    parts_dir.mkdir(parents=True)
+    path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+
+def _concat_parts(parts: list[Path], header: list[str], out_path: Path) -> None:
+    tmp = out_path.with_name(out_path.name + ".tmp")
+    if _is_parquet(out_path):
+        pq = _require_pyarrow()
+        writer = None
+        try:
+            for part in parts:
+                table = pq.read_table(part)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        with open(tmp, "wb") as dst:
+            # Same quoting as the parts, so column names with commas or quotes survive
+            dst.write(pd.DataFrame(columns=header).to_csv(index=False).encode("utf-8"))
+            for part in parts:
+                with open(part, "rb") as src:
+                    shutil.copyfileobj(src, dst, length=1024 * 1024)
+    os.replace(tmp, out_path)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet file of apartments")
+    parser.add_argument("input")
+    parser.add_argument("--output", help="Defaults to <input>_scored.<ext>")
+    parser.add_argument("--chunk-rows", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--resume", action="store_true", help="Skip chunks already written")
+    parser.add_argument("--model-path", help="Overrides MODEL_PATH")
+    parser.add_argument("--preprocessor-path", help="Overrides PREPROCESSOR_PATH")
+    parser.add_argument("--model-version", help="Overrides MODEL_VERSION")
+    args = parser.parse_args()
+
+    in_path = Path(args.input).resolve()
+    out_path = (
+        Path(args.output).resolve()
+        if args.output
+        else in_path.with_name(f"{in_path.stem}_scored{in_path.suffix}")
+    )
+    parquet_out = _is_parquet(out_path)
+    if _is_parquet(in_path) or parquet_out:
+        _require_pyarrow()
+
+    for flag, var in [
+        ("model_path", "MODEL_PATH"),
+        ("preprocessor_path", "PREPROCESSOR_PATH"),
+        ("model_version", "MODEL_VERSION"),
+    ]:
+        if getattr(args, flag):
+            os.environ[var] = getattr(args, flag)
+    env = {
+        k: v
+        for k, v in os.environ.items()
+        if k in {"MODEL_PATH", "PREPROCESSOR_PATH", "MODEL_VERSION", "TARGET_MODE"}
+    }
+    # Fail fast in the parent rather than in every worker
+    model_version = load_artifacts().model_version
+
+    stat = in_path.stat()
+    parts_dir = out_path.with_name(out_path.name + ".parts")
+    _check_manifest(
+        parts_dir,
+        {
+            "input": str(in_path),
+            "input_size": stat.st_size,
+            "input_mtime_ns": stat.st_mtime_ns,
+            "chunk_rows": args.chunk_rows,
+            "model_version": model_version,
+            "env": env,
+        },
+        args.resume,
+    )
+
+    start = perf_counter()
+    workers = max(1, args.workers)
+    header = [*input_columns(in_path), *OUTPUT_COLUMNS]
+    # Finished chunks at the front are not read again at all; later finished ones (left by
+    # workers that completed out of order) are read but not rescored
+    first = 0
+    while _part_path(parts_dir, first, parquet_out).exists():
+        first += 1
+    parts = [_part_path(parts_dir, i, parquet_out) for i in range(first)]
+    scored = 0
+    skipped = first
+    pending: set[Future] = set()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(env,)) as ex:
+        for index, chunk in enumerate(iter_chunks(in_path, args.chunk_rows, first), start=first):
+            part = _part_path(parts_dir, index, parquet_out)
+            parts.append(part)
+            if part.exists():
+                skipped += 1
+                continue
+            # Bound the chunks held in memory to two per worker
+            while len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                scored += sum(f.result()[1] for f in done)
+            pending.add(ex.submit(score_chunk, index, chunk, str(part)))
+        for f in pending:
+            scored += f.result()[1]
+
+    if not parts:
+        print("Input has no rows")
+        return 1
+    _concat_parts(parts, header, out_path)
+    shutil.rmtree(parts_dir)
+
+    elapsed = perf_counter() - start
+    rate = scored / elapsed if elapsed > 0 else 0.0
+    print(f"Scored {scored} rows in {elapsed:.1f}s ({rate:,.0f} rows/s, {workers} workers)")
+    if skipped:
+        print(f"Resumed: {skipped} chunks reused from earlier parts")
+    print(f"Saved: {out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
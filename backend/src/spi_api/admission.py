@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+from collections import deque
+
+from starlette.requests import Request
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class AdmissionController:
+    # Concurrency limit with a bounded FIFO wait queue. With target_ms set, the limit
+    # adapts AIMD-style to the inference time the endpoints report: +1/limit per request
+    # under target, and a multiplicative decrease (at most once per `limit` completions)
+    # above it, so the limit converges to what the instance can serve within the target.
+    def __init__(
+        self,
+        *,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeout_s: float,
+        target_ms: float | None = None,
+        min_concurrency: int = 1,
+        decrease_factor: float = 0.9,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min(min_concurrency, max_concurrency)
+        self.max_queue = max_queue
+        self.queue_timeout_s = queue_timeout_s
+        self.target_ms = target_ms
+        self.decrease_factor = decrease_factor
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._since_decrease = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _capacity(self) -> int:
+        return max(self.min_concurrency, int(self.limit))
+
+    async def acquire(self) -> bool:
+        if self.in_flight < self._capacity() and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            self.shed += 1
+            return False
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await asyncio.wait({fut}, timeout=self.queue_timeout_s)
+        except asyncio.CancelledError:
+            # Client went away; give back a slot that was handed over in the meantime
+            if fut.done() and not fut.cancelled():
+                self.release()
+            raise
+        finally:
+            if not fut.done():
+                fut.cancel()
+                self._waiters.remove(fut)
+        if fut.cancelled():
+            self.shed += 1
+            return False
+        # release() handed this waiter its slot
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < self._capacity():
+            fut = self._waiters.popleft()
+            if not fut.done():
+                self.in_flight += 1
+                fut.set_result(None)
+
+    def observe(self, service_ms: float) -> None:
+        if self.target_ms is None:
+            return
+        self._since_decrease += 1
+        if service_ms > self.target_ms:
+            if self._since_decrease >= self.limit:
+                self.limit = max(float(self.min_concurrency), self.limit * self.decrease_factor)
+                self._since_decrease = 0
+        else:
+            self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+
+    def retry_after_s(self) -> int:
+        return max(1, math.ceil(self.queue_timeout_s))
+
+    def stats(self) -> dict:
+        return {
+            "limit": self._capacity(),
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "shed": self.shed,
+        }
+
+
+def controller_from_env() -> AdmissionController | None:
+    max_concurrency = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "32"))
+    if max_concurrency <= 0:
+        return None
+    target_ms = float(os.getenv("ADMISSION_TARGET_MS", "0"))
+    return AdmissionController(
+        max_concurrency=max_concurrency,
+        max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "64")),
+        queue_timeout_s=float(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "1000")) / 1000.0,
+        target_ms=target_ms if target_ms > 0 else None,
+        min_concurrency=int(os.getenv("ADMISSION_MIN_CONCURRENCY", "1")),
+    )
+
+
+# Every endpoint that runs the model or another per-request computation
+DEFAULT_ADMISSION_PATHS = (
+    "/predict",
+    "/predict/trend",
+    "/predict/bulk",
+    "/sensitivity",
+    "/explain",
+    "/explain/batch",
+    "/comparables",
+)
+
+
+def report_inference_ms(request: Request, inference_ms: float) -> None:
+    # Feeds the adaptive limit. Only single-request endpoints report; the streaming and
+    # batch paths are admitted but never observed, so one long upload cannot cut the
+    # limit for every /predict caller.
+    request.state.inference_ms = inference_ms
+
+
+def admission_paths_from_env() -> frozenset[str]:
+    raw = os.getenv("ADMISSION_PATHS", ",".join(DEFAULT_ADMISSION_PATHS))
+    return frozenset(p.strip() for p in raw.split(",") if p.strip())
+
+
+class AdmissionMiddleware:
+    # Pure ASGI so shedding happens before any request parsing or threadpool hand-off.
+    # Only the listed paths are limited; /health and everything else pass straight
+    # through and never wait behind model traffic.
+    def __init__(
+        self, app: ASGIApp, *, controller: AdmissionController, paths: frozenset[str]
+    ) -> None:
+        self.app = app
+        self.controller = controller
+        self.paths = paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] == "OPTIONS"
+            or scope["path"].rstrip("/") not in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        if not await self.controller.acquire():
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 503,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"retry-after", str(self.controller.retry_after_s()).encode()),
+                    ],
+                }
+            )
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": b'{"detail":"Server is at capacity, retry later"}',
+                }
+            )
+            return
+
+        # request.state is backed by scope["state"], so the endpoint's report lands here
+        state = scope.setdefault("state", {})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release()
+            inference_ms = state.get("inference_ms")
+            if inference_ms is not None:
+                self.controller.observe(inference_ms)
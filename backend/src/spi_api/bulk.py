@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import csv
+import json
+from collections.abc import AsyncIterator, Callable
+
+import numpy as np
+import pandas as pd
+from pydantic import ValidationError
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from spi_api.inference import frame_from_rows, predict_frame, price_outputs, row_from_request
+from spi_api.model_loader import LoadedArtifacts
+from spi_api.schemas import PredictRequest
+
+MAX_LINE_BYTES = 64 * 1024
+_TOO_LONG = object()
+
+
+class UploadStreamingResponse(StreamingResponse):
+    # The body iterator consumes the request stream itself. Starlette's default disconnect
+    # listener would race it for receive() messages, so stream straight to send instead;
+    # a dropped client still surfaces as ClientDisconnect from request.stream().
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError as e:
+            raise ClientDisconnect() from e
+        finally:
+            # Run the body generator's cleanup now, not whenever it is garbage collected
+            aclose = getattr(self.body_iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        if self.background is not None:
+            await self.background()
+
+
+def detect_format(content_type: str | None) -> str | None:
+    ct = (content_type or "").split(";", 1)[0].strip().lower()
+    if ct in {"text/csv", "application/csv"}:
+        return "csv"
+    if ct in {"application/x-ndjson", "application/ndjson", "application/jsonl"}:
+        return "ndjson"
+    return None
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[object]:
+    # Splits a byte stream into decoded lines while holding at most one partial line
+    buffer = b""
+    skipping = False
+    first = True
+    async for chunk in chunks:
+        # One split per chunk; the last piece is the unterminated tail
+        *complete, buffer = (buffer + chunk).split(b"\n")
+        for raw in complete:
+            if skipping:
+                skipping = False
+                continue
+            if first:
+                raw = raw.removeprefix(b"\xef\xbb\xbf")
+                first = False
+            yield raw.rstrip(b"\r").decode("utf-8", errors="replace")
+        if len(buffer) > MAX_LINE_BYTES:
+            if not skipping:
+                yield _TOO_LONG
+            skipping = True
+            buffer = b""
+    if buffer and not skipping:
+        yield buffer.rstrip(b"\r").decode("utf-8", errors="replace")
+
+
+def _csv_record(header: list[str], line: str) -> dict:
+    values = next(csv.reader([line]))
+    if len(values) != len(header):
+        raise ValueError(f"expected {len(header)} columns, got {len(values)}")
+    # Empty CSV cells mean "not provided" (e.g. optional transaction_year)
+    return {k: v for k, v in zip(header, values, strict=True) if v != ""}
+
+
+async def iter_records(
+    lines: AsyncIterator[object], fmt: str
+) -> AsyncIterator[tuple[int, dict | None, object]]:
+    # Yields (row_number, parsed_record | None, parse_error | None); rows are numbered
+    # from 0 in input order, excluding the CSV header and blank lines.
+    header: list[str] | None = None
+    row = 0
+    async for line in lines:
+        if line is not _TOO_LONG and not str(line).strip():
+            continue
+        if fmt == "csv" and header is None and line is not _TOO_LONG:
+            header = [h.strip() for h in next(csv.reader([str(line)]))]
+            continue
+        if line is _TOO_LONG:
+            yield row, None, f"line longer than {MAX_LINE_BYTES} bytes"
+        else:
+            try:
+                record = _csv_record(header, line) if fmt == "csv" else json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("expected a JSON object")
+                yield row, record, None
+            except ValueError as e:
+                yield row, None, str(e)
+        row += 1
+
+
+def score_records(
+    artifacts: LoadedArtifacts,
+    items: list[tuple[int, dict | None, object]],
+    *,
+    target_mode: str,
+    predict: Callable[[pd.DataFrame], np.ndarray] | None = None,
+) -> list[dict]:
+    # Validates each row, scores all valid rows of the chunk with one predict call and
+    # returns one output object per input row, in input order.
+    out: list[dict | None] = [None] * len(items)
+    rows: list[dict] = []
+    positions: list[int] = []
+    for i, (row_no, record, error) in enumerate(items):
+        if error is not None:
+            out[i] = {"row": row_no, "error": error}
+            continue
+        try:
+            req = PredictRequest.model_validate(record)
+        except ValidationError as e:
+            out[i] = {
+                "row": row_no,
+                "error": e.errors(include_url=False, include_context=False, include_input=False),
+            }
+            continue
+        rows.append(row_from_request(req))
+        positions.append(i)
+
+    if rows:
+        X_df = frame_from_rows(rows)
+        pred = predict(X_df) if predict is not None else predict_frame(artifacts, X_df)
+        area = np.array([r["area"] for r in rows], dtype=float)
+        price_per_sqm, total_price = price_outputs(pred, area, target_mode=target_mode)
+        for j, i in enumerate(positions):
+            out[i] = {
+                "row": items[i][0],
+                "predicted_price_per_sqm": float(price_per_sqm[j]),
+                "predicted_total_price": float(total_price[j]),
+            }
+    return out  # type: ignore[return-value]
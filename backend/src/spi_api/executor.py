@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+from spi_api.inference import FEATURE_COLUMNS, predict_frame
+from spi_api.model_loader import LoadedArtifacts, load_artifacts
+
+# Upper bound for every worker to start and load its artifacts during start()
+_WARMUP_TIMEOUT_S = 120.0
+
+_worker_artifacts: LoadedArtifacts | None = None
+_worker_barrier: threading.Barrier | None = None
+
+
+def _init_worker(barrier: threading.Barrier) -> None:
+    # Runs once per worker process; artifacts come from the same env as the parent app
+    global _worker_artifacts, _worker_barrier
+    _worker_artifacts = load_artifacts()
+    if hasattr(_worker_artifacts.model, "n_jobs"):
+        _worker_artifacts.model.n_jobs = 1
+    _worker_barrier = barrier
+
+
+def _warmup(_: int) -> int:
+    # Blocks until one task is running in every worker, so each worker takes exactly one
+    assert _worker_barrier is not None
+    _worker_barrier.wait(_WARMUP_TIMEOUT_S)
+    return os.getpid()
+
+
+def _predict_columns(columns: dict[str, np.ndarray]) -> np.ndarray:
+    assert _worker_artifacts is not None
+    return predict_frame(_worker_artifacts, pd.DataFrame(columns, columns=FEATURE_COLUMNS))
+
+
+def frame_to_columns(X_df: pd.DataFrame) -> dict[str, np.ndarray]:
+    # One typed array per feature: pickles as a few contiguous buffers instead of a
+    # DataFrame with its index and block manager
+    return {
+        col: X_df[col].to_numpy(dtype=object if col == "district" else float)
+        for col in FEATURE_COLUMNS
+    }
+
+
+class InferenceExecutor:
+    # transform + predict in a pool of worker processes, so CPU-bound models are not
+    # serialized by the GIL. Handlers call predict() from the threadpool and block on the
+    # result while a worker process does the work.
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self.restarts = 0
+        self._lock = threading.Lock()
+        self._pool = self._new_pool()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        ctx = multiprocessing.get_context("spawn")
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(ctx.Barrier(self.workers),),
+        )
+
+    def start(self) -> None:
+        # Spawn every worker (and load its artifacts) before serving the first request.
+        # The barrier only releases once all workers hold a warm-up task, so none is left
+        # to start lazily; a worker that fails to start raises here.
+        list(self._pool.map(_warmup, range(self.workers)))
+
+    def _replace_pool(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        # A worker that dies (e.g. OOM-killed) breaks the whole pool. The first request to
+        # notice swaps in a fresh one; concurrent requests then reuse it. Its workers start
+        # on demand, so the retried request pays for loading the artifacts.
+        with self._lock:
+            if self._pool is broken:
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._pool = self._new_pool()
+                self.restarts += 1
+            return self._pool
+
+    def predict(self, X_df: pd.DataFrame) -> np.ndarray:
+        columns = frame_to_columns(X_df)
+        pool = self._pool
+        try:
+            return pool.submit(_predict_columns, columns).result()
+        except BrokenProcessPool:
+            # Retried once; a pool that breaks again is reported to the caller
+            return self._replace_pool(pool).submit(_predict_columns, columns).result()
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+def executor_from_env() -> InferenceExecutor | None:
+    kind = os.getenv("INFERENCE_EXECUTOR", "thread").strip().lower()
+    if kind == "thread":
+        return None
+    if kind != "process":
+        raise ValueError(f"Unknown INFERENCE_EXECUTOR: {kind!r} (expected thread or process)")
+    return InferenceExecutor(int(os.getenv("INFERENCE_WORKERS", str(os.cpu_count() or 1))))
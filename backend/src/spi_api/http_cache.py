@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from collections.abc import Callable
+from urllib.parse import urlencode
+
+from spi_api.schemas import PredictRequest
+
+
+def strong_etag(*parts: str | bytes) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else part.encode("utf-8"))
+        h.update(b"\0")
+    return f'"{h.hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def file_signature(paths: list[str | None]) -> tuple:
+    sig = []
+    for path in paths:
+        try:
+            st = os.stat(path) if path else None
+        except OSError:
+            st = None
+        sig.append((path, st.st_mtime_ns, st.st_size) if st is not None else (path, None))
+    return tuple(sig)
+
+
+class Snapshot:
+    # Caches an encoded body and its ETag until the signature (file stats plus any other
+    # inputs the body depends on) changes; the body is only rebuilt then.
+    def __init__(self, build: Callable[[], bytes]) -> None:
+        self._build = build
+        self._signature: tuple | None = None
+        self._body = b""
+        self._etag = ""
+
+    def get(self, signature: tuple) -> tuple[bytes, str]:
+        if signature != self._signature:
+            body = self._build()
+            self._body, self._etag, self._signature = body, strong_etag(body), signature
+        return self._body, self._etag
+
+
+def canonical_predict_query(req: PredictRequest, interval: float | None) -> str:
+    # Validated values in a fixed key order and number format, so equivalent URLs
+    # (?rooms=2&area=65 vs ?area=65.0&rooms=2.0) share one cache key
+    items = req.model_dump(exclude_none=True)
+    if interval is not None:
+        items["interval"] = interval
+    return urlencode(
+        [(k, repr(float(v)) if isinstance(v, float) else v) for k, v in sorted(items.items())]
+    )
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import os
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from spi_api.model_loader import LoadedArtifacts
+from spi_api.schemas import PredictRequest
+from spi_train.preprocessing import output_feature_groups
+from spi_train.tree_arrays import quantile_interval, to_dense
+from spi_train.treeshap import TreeExplainer, build_tree_explainer
+
+FEATURE_COLUMNS = ["area", "rooms", "district", "year_built", "monthly_fee", "transaction_year"]
+
+
+def row_from_request(req: PredictRequest) -> dict:
+    return {
+        "area": float(req.area),
+        "rooms": float(req.rooms),
+        "district": req.district,
+        "year_built": int(req.year_built),
+        "monthly_fee": float(req.monthly_fee),
+        "transaction_year": int(req.transaction_year) if req.transaction_year is not None else None,
+    }
+
+
+def get_target_mode() -> str:
+    return os.getenv("TARGET_MODE", "price_per_sqm").strip().lower()
+
+
+def frame_from_rows(rows: list[dict]) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=FEATURE_COLUMNS)
+
+
+def predict_frame(artifacts: LoadedArtifacts, X_df: pd.DataFrame) -> np.ndarray:
+    X = artifacts.preprocessor.transform(X_df)
+    return np.asarray(artifacts.model.predict(X), dtype=float).reshape(-1)
+
+
+def price_outputs(
+    pred: np.ndarray, area: np.ndarray, *, target_mode: str
+) -> tuple[np.ndarray, np.ndarray]:
+    # Returns (price_per_sqm, total_price) whichever of the two the model was trained on
+    area = np.asarray(area, dtype=float)
+    if target_mode == "total_price":
+        return pred / area, pred
+    return pred, pred * area
+
+
+def predict_with_interval(
+    artifacts: LoadedArtifacts, X_df: pd.DataFrame, level: float
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, float] | None:
+    # (point, lower, upper, level) in model target units, or None if the model has no
+    # interval support. Forests use the spread of their trees at the requested level;
+    # gradient boosting uses the quantile pair trained for a fixed level.
+    X = artifacts.preprocessor.transform(X_df)
+    if artifacts.interval_model is not None:
+        point = np.asarray(artifacts.model.predict(X), dtype=float).reshape(-1)
+        lower = np.asarray(artifacts.interval_model["lower"].predict(X), dtype=float)
+        upper = np.asarray(artifacts.interval_model["upper"].predict(X), dtype=float)
+        # Independently fitted quantile models can cross; keep the band ordered
+        return (
+            point,
+            np.minimum(lower, upper),
+            np.maximum(lower, upper),
+            float(artifacts.interval_model["level"]),
+        )
+    if artifacts.forest is not None:
+        per_tree = artifacts.forest.predict_per_tree(X)
+        lower, upper = quantile_interval(per_tree, level)
+        return per_tree.mean(axis=0), lower, upper, float(level)
+    return None
+
+
+def predict_grid(
+    artifacts: LoadedArtifacts, row: dict, axes: list[tuple[str, list]]
+) -> tuple[np.ndarray, np.ndarray, dict[str, float]]:
+    # The preprocessor works column by column, so each axis only changes its own output
+    # columns. Transform the base row once, transform each axis' values once, and write
+    # those columns into a preallocated (n_cells, n_features) matrix for one predict call.
+    start = perf_counter()
+    pre = artifacts.preprocessor
+    base_t = to_dense(pre.transform(frame_from_rows([row])))
+    shape = tuple(len(values) for _, values in axes)
+    grid_idx = np.indices(shape).reshape(len(shape), -1)
+
+    X = np.empty((grid_idx.shape[1], base_t.shape[1]), dtype=base_t.dtype)
+    X[:] = base_t
+    area = np.full(X.shape[0], float(row["area"]))
+    for axis, (feature, values) in enumerate(axes):
+        axis_df = frame_from_rows([row] * len(values))
+        axis_df[feature] = values
+        axis_t = to_dense(pre.transform(axis_df))
+        cols = np.flatnonzero((axis_t != base_t).any(axis=0))
+        if cols.size:
+            X[:, cols] = axis_t[np.ix_(grid_idx[axis], cols)]
+        if feature == "area":
+            area = np.asarray(values, dtype=float)[grid_idx[axis]]
+    transform_ms = (perf_counter() - start) * 1000.0
+
+    start = perf_counter()
+    pred = np.asarray(artifacts.model.predict(X), dtype=float).reshape(-1)
+    predict_ms = (perf_counter() - start) * 1000.0
+    return pred, area, {"transform_ms": transform_ms, "predict_ms": predict_ms}
+
+
+def find_comparables(artifacts: LoadedArtifacts, row: dict, k: int) -> list[dict]:
+    # Put the query through the same numeric pipeline (imputer, clipper) the index was
+    # built from; the index standardizes it before the tree lookup.
+    index = artifacts.comparables
+    num = artifacts.preprocessor.named_transformers_["num"]
+    query_t = to_dense(num.transform(frame_from_rows([row])[index.numeric_features]))
+    return index.query(query_t[0], row.get("district"), k)
+
+
+def build_explainer(artifacts: LoadedArtifacts) -> TreeExplainer:
+    groups, names = output_feature_groups(artifacts.preprocessor)
+    # Reuse the flattened forest the interval path may already have built
+    model = artifacts.forest if artifacts.forest is not None else artifacts.model
+    return build_tree_explainer(model, feature_groups=groups, group_names=names)
+
+
+def explain_frame(
+    artifacts: LoadedArtifacts, explainer: TreeExplainer, X_df: pd.DataFrame
+) -> tuple[np.ndarray, np.ndarray]:
+    # (per-feature contributions, predictions) in model target units
+    phi = explainer.shap_values(artifacts.preprocessor.transform(X_df))
+    return phi, explainer.base_value + phi.sum(axis=1)
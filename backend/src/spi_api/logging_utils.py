@@ -2,7 +2,16 @@ from __future__ import annotations
 
 import json
 import os
+import struct
+import threading
+import time
+from collections.abc import Iterator
 from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from spi_api.serialization import dumps
 
 
 def append_jsonl(log_path: str, payload: dict) -> None:
@@ -13,3 +22,304 @@ def append_jsonl(log_path: str, payload: dict) -> None:
     }
     with open(log_path, "a", encoding="utf-8") as f:
         f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class JsonlSink:
+    # One JSON object per line, same records as append_jsonl; the file is opened lazily
+    # and kept open between writes. fast=True encodes with orjson when it is installed.
+    def __init__(self, path: str, *, fast: bool = False) -> None:
+        self.path = path
+        self.fast = fast
+        self._f = None
+        self._lock = threading.Lock()
+
+    def write(self, payload: dict) -> None:
+        record = {"ts": datetime.now(timezone.utc).isoformat(), **payload}
+        if self.fast:
+            line = dumps(record)
+        else:
+            line = json.dumps(record, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            if self._f is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._f = open(self.path, "ab")
+            self._f.write(line + b"\n")
+            self._f.flush()
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        with self._lock:
+            if self._f is not None:
+                self._f.close()
+                self._f = None
+
+
+# Columnar log: a file magic followed by self-contained blocks. Each block is
+#   header  "<4sIQI": b"SPIB", n_rows, payload bytes, dictionary bytes
+#   dicts   for district and model_version: u4 count, then (u2 length, utf-8 bytes) each
+#   columns COLUMNS in order, n_rows fixed-width little-endian values each
+# Dictionary codes are local to the block, so blocks from concurrent writers can be
+# interleaved and any block can be decoded on its own.
+FILE_MAGIC = b"SPILOG1\n"
+_BLOCK = struct.Struct("<4sIQI")
+_BLOCK_MAGIC = b"SPIB"
+DICT_COLUMNS = ("district", "model_version")
+COLUMNS: list[tuple[str, str]] = [
+    ("ts", "<f8"),
+    ("area", "<f8"),
+    ("rooms", "<f8"),
+    ("district", "<u4"),
+    ("year_built", "<i4"),
+    ("monthly_fee", "<f8"),
+    ("transaction_year", "<i4"),
+    ("predicted_price_per_sqm", "<f8"),
+    ("predicted_total_price", "<f8"),
+    ("model_version", "<u2"),
+    ("inference_ms", "<f4"),
+    ("interval_level", "<f4"),
+    ("interval_lower_price_per_sqm", "<f8"),
+    ("interval_upper_price_per_sqm", "<f8"),
+]
+MISSING_INT = -1
+# Dictionary entries are stored with a u2 length; longer strings are cut to fit
+MAX_DICT_BYTES = 1024
+
+
+def _dict_value(value) -> str:
+    raw = str(value).encode("utf-8")
+    if len(raw) <= MAX_DICT_BYTES:
+        return str(value)
+    return raw[:MAX_DICT_BYTES].decode("utf-8", errors="ignore")
+
+
+def _columnar_row(payload: dict) -> tuple | None:
+    # Only single-prediction records have the fixed shape; None means "log elsewhere"
+    request = payload.get("request")
+    if "endpoint" in payload or not isinstance(request, dict):
+        return None
+    band = payload.get("prediction_interval") or {}
+    year = request.get("transaction_year")
+    return (
+        time.time(),
+        float(request["area"]),
+        float(request["rooms"]),
+        _dict_value(request["district"]),
+        int(request["year_built"]),
+        float(request["monthly_fee"]),
+        MISSING_INT if year is None else int(year),
+        float(payload["predicted_price_per_sqm"]),
+        float(payload["predicted_total_price"]),
+        _dict_value(payload["model_version"]),
+        float(payload["inference_ms"]),
+        float(band.get("level", np.nan)),
+        float(band.get("lower_price_per_sqm", np.nan)),
+        float(band.get("upper_price_per_sqm", np.nan)),
+    )
+
+
+def _encode_dict(values: list[str]) -> bytes:
+    parts = [struct.pack("<I", len(values))]
+    for v in values:
+        raw = v.encode("utf-8")
+        parts.append(struct.pack("<H", len(raw)) + raw)
+    return b"".join(parts)
+
+
+def encode_block(rows: list[tuple]) -> bytes:
+    columns = list(zip(*rows, strict=True))
+    dict_bytes = []
+    for i, (name, _) in enumerate(COLUMNS):
+        if name in DICT_COLUMNS:
+            values = list(dict.fromkeys(columns[i]))
+            codes = {v: j for j, v in enumerate(values)}
+            columns[i] = [codes[v] for v in columns[i]]
+            dict_bytes.append(_encode_dict(values))
+    dicts = b"".join(dict_bytes)
+    body = dicts + b"".join(
+        np.asarray(columns[i], dtype=dtype).tobytes() for i, (_, dtype) in enumerate(COLUMNS)
+    )
+    return _BLOCK.pack(_BLOCK_MAGIC, len(rows), len(body), len(dicts)) + body
+
+
+def _valid_length(path: str) -> int:
+    # Byte length up to the last complete block (a crash can leave a partial one)
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        if f.read(len(FILE_MAGIC)) != FILE_MAGIC:
+            raise ValueError(f"{path} is not a columnar prediction log")
+        pos = len(FILE_MAGIC)
+        while pos + _BLOCK.size <= size:
+            f.seek(pos)
+            magic, _, n_bytes, _ = _BLOCK.unpack(f.read(_BLOCK.size))
+            if magic != _BLOCK_MAGIC or pos + _BLOCK.size + n_bytes > size:
+                break
+            pos += _BLOCK.size + n_bytes
+    return pos
+
+
+class ColumnarSink:
+    # Buffers single-prediction records and appends them as one columnar block per
+    # batch_rows records, or once flush_interval_s has passed: a background thread flushes
+    # the buffer when traffic stops. Other record shapes (trend, sensitivity, bulk) go to
+    # the fallback JSONL sink.
+    def __init__(
+        self,
+        path: str,
+        *,
+        fallback: JsonlSink,
+        batch_rows: int = 256,
+        flush_interval_s: float = 5.0,
+    ) -> None:
+        self.path = path
+        self.fallback = fallback
+        self.batch_rows = batch_rows
+        self.flush_interval_s = flush_interval_s
+        self._rows: list[tuple] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._checked = False
+        self._closed = threading.Event()
+        self._timer: threading.Thread | None = None
+
+    def write(self, payload: dict) -> None:
+        row = _columnar_row(payload)
+        if row is None:
+            self.fallback.write(payload)
+            return
+        with self._lock:
+            if self._timer is None and self.flush_interval_s > 0 and not self._closed.is_set():
+                self._timer = threading.Thread(
+                    target=self._flush_periodically, name="columnar-log-flush", daemon=True
+                )
+                self._timer.start()
+            self._rows.append(row)
+            due = time.monotonic() - self._last_flush >= self.flush_interval_s
+            if len(self._rows) >= self.batch_rows or due:
+                self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._rows:
+            return
+        # Take the rows out before encoding, so a block that fails to encode is lost on
+        # its own instead of failing every later flush
+        rows, self._rows = self._rows, []
+        block = encode_block(rows)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if not self._checked:
+            if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                valid = _valid_length(self.path)
+                if valid < os.path.getsize(self.path):
+                    os.truncate(self.path, valid)
+            self._checked = True
+        # One write per block in append mode keeps blocks whole even with several writers
+        with open(self.path, "ab") as f:
+            f.write(block if f.tell() > 0 else FILE_MAGIC + block)
+
+    def _flush_periodically(self) -> None:
+        while not self._closed.wait(self.flush_interval_s):
+            with self._lock:
+                if time.monotonic() - self._last_flush < self.flush_interval_s:
+                    continue
+                try:
+                    self._flush_locked()
+                except Exception:
+                    # The rows are dropped with the failed block; keep flushing later ones
+                    pass
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._timer is not None:
+            self._timer.join()
+            self._timer = None
+        self.flush()
+        self.fallback.close()
+
+
+def _read_dict(buf: bytes, pos: int) -> tuple[list[str], int]:
+    (count,) = struct.unpack_from("<I", buf, pos)
+    pos += 4
+    values = []
+    for _ in range(count):
+        (n,) = struct.unpack_from("<H", buf, pos)
+        values.append(buf[pos + 2 : pos + 2 + n].decode("utf-8"))
+        pos += 2 + n
+    return values, pos
+
+
+def iter_columnar_blocks(
+    path: str | Path, columns: list[str] | None = None
+) -> Iterator[dict[str, np.ndarray]]:
+    # Yields one {column: array} per block, reading only the projected columns;
+    # dictionary columns come back decoded as object arrays of strings.
+    wanted = [name for name, _ in COLUMNS] if columns is None else list(columns)
+    unknown = set(wanted) - {name for name, _ in COLUMNS}
+    if unknown:
+        raise ValueError(f"Unknown log columns: {sorted(unknown)}")
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        if f.read(len(FILE_MAGIC)) != FILE_MAGIC:
+            raise ValueError(f"{path} is not a columnar prediction log")
+        pos = len(FILE_MAGIC)
+        while pos + _BLOCK.size <= size:
+            f.seek(pos)
+            magic, n_rows, n_bytes, dict_bytes = _BLOCK.unpack(f.read(_BLOCK.size))
+            if magic != _BLOCK_MAGIC or pos + _BLOCK.size + n_bytes > size:
+                break
+            pos += _BLOCK.size
+            raw = f.read(dict_bytes)
+            dicts: dict[str, list[str]] = {}
+            dpos = 0
+            for name in DICT_COLUMNS:
+                dicts[name], dpos = _read_dict(raw, dpos)
+            col_pos = pos + dict_bytes
+            block: dict[str, np.ndarray] = {}
+            for name, dtype in COLUMNS:
+                width = np.dtype(dtype).itemsize * n_rows
+                if name in wanted:
+                    f.seek(col_pos)
+                    values = np.frombuffer(f.read(width), dtype=dtype)
+                    if name in dicts:
+                        values = np.asarray(dicts[name], dtype=object)[values]
+                    block[name] = values
+                col_pos += width
+            yield {name: block[name] for name in wanted}
+            pos += n_bytes
+
+
+def read_columnar_log(path: str | Path, columns: list[str] | None = None) -> dict[str, np.ndarray]:
+    blocks = list(iter_columnar_blocks(path, columns))
+    names = [name for name, _ in COLUMNS] if columns is None else list(columns)
+    if not blocks:
+        return {
+            name: np.empty(0, dtype=object if name in DICT_COLUMNS else dict(COLUMNS)[name])
+            for name in names
+        }
+    return {name: np.concatenate([b[name] for b in blocks]) for name in names}
+
+
+def columnar_log_path(jsonl_path: str) -> str:
+    return str(Path(jsonl_path).with_suffix(".spilog"))
+
+
+def make_log_sink(*, fast: bool = False) -> JsonlSink | ColumnarSink:
+    # PREDICTION_LOG_FORMAT=columnar writes /predict records to <log path>.spilog and
+    # keeps the JSONL file for every other record shape.
+    path = os.getenv("PREDICTION_LOG_PATH", "logs/predictions.jsonl")
+    fmt = os.getenv("PREDICTION_LOG_FORMAT", "jsonl").strip().lower()
+    if fmt == "jsonl":
+        return JsonlSink(path, fast=fast)
+    if fmt == "columnar":
+        return ColumnarSink(
+            columnar_log_path(path),
+            fallback=JsonlSink(path, fast=fast),
+            batch_rows=int(os.getenv("PREDICTION_LOG_BATCH_ROWS", "256")),
+            flush_interval_s=float(os.getenv("PREDICTION_LOG_FLUSH_S", "5")),
+        )
+    raise ValueError(f"Unknown PREDICTION_LOG_FORMAT: {fmt!r} (expected jsonl or columnar)")
@@ -2,32 +2,89 @@ from __future__ import annotations
 
 import json
 import os
+import threading
 from contextlib import asynccontextmanager
 from time import perf_counter
+from typing import Annotated
 
 import numpy as np
-import pandas as pd
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
 
-from spi_api.logging_utils import append_jsonl
+from spi_api.admission import (
+    AdmissionMiddleware,
+    admission_paths_from_env,
+    controller_from_env,
+    report_inference_ms,
+)
+from spi_api.bulk import (
+    UploadStreamingResponse,
+    detect_format,
+    iter_lines,
+    iter_records,
+    score_records,
+)
+from spi_api.executor import InferenceExecutor, executor_from_env
+from spi_api.http_cache import (
+    Snapshot,
+    canonical_predict_query,
+    etag_matches,
+    file_signature,
+    strong_etag,
+)
+from spi_api.inference import (
+    build_explainer,
+    explain_frame,
+    find_comparables,
+    frame_from_rows,
+    get_target_mode,
+    predict_frame,
+    predict_grid,
+    predict_with_interval,
+    price_outputs,
+    row_from_request,
+)
+from spi_api.logging_utils import make_log_sink
 from spi_api.model_loader import LoadedArtifacts, load_artifacts
-from spi_api.schemas import ModelInfoResponse, ModelMetrics, PredictRequest, PredictResponse
-
-
-def _row_from_request(req: PredictRequest) -> dict:
-    return {
-        "area": float(req.area),
-        "rooms": float(req.rooms),
-        "district": req.district,
-        "year_built": int(req.year_built),
-        "monthly_fee": float(req.monthly_fee),
-        "transaction_year": int(req.transaction_year) if req.transaction_year is not None else None,
-    }
+from spi_api.schemas import (
+    INTEGER_FEATURES,
+    MAX_COMPARABLES,
+    ComparablesResponse,
+    ExplainBatchRequest,
+    ExplainBatchResponse,
+    ExplainResponse,
+    ModelInfoResponse,
+    ModelMetrics,
+    PredictQuery,
+    PredictRequest,
+    PredictResponse,
+    SensitivityRequest,
+    SensitivityResponse,
+    TrendRequest,
+    TrendResponse,
+)
+from spi_api.serialization import (
+    FastJSONResponse,
+    dumps,
+    fast_serialization_enabled,
+    respond,
+)
+from spi_api.shadow import ShadowScorer, shadow_from_env
+from spi_train.treeshap import TreeExplainer
 
 
 def create_app() -> FastAPI:
     artifacts: LoadedArtifacts | None = None
+    executor: InferenceExecutor | None = None
+    shadow: ShadowScorer | None = None
+    fast_json = fast_serialization_enabled()
+    predict_max_age = int(os.getenv("PREDICT_CACHE_MAX_AGE", "3600"))
+    log_sink = make_log_sink(fast=fast_json)
+    # Built on first use and keyed by the artifacts it was built from
+    explainer: tuple[LoadedArtifacts, TreeExplainer] | None = None
+    explainer_lock = threading.Lock()
 
     def _load_metrics(path: str) -> ModelMetrics | None:
         try:
@@ -46,13 +103,38 @@ def create_app() -> FastAPI:
         except Exception:
             return None
 
+    def _predict(X_df) -> np.ndarray:
+        if executor is not None:
+            return executor.predict(X_df)
+        return predict_frame(artifacts, X_df)
+
     @asynccontextmanager
     async def lifespan(_: FastAPI):
-        nonlocal artifacts
+        nonlocal artifacts, executor, shadow
         artifacts = load_artifacts()
-        yield
+        executor = executor_from_env()
+        if executor is not None:
+            await run_in_threadpool(executor.start)
+        shadow = shadow_from_env(artifacts, fast=fast_json)
+        if shadow is not None:
+            shadow.start()
+        try:
+            yield
+        finally:
+            if shadow is not None:
+                shadow.close()
+                shadow = None
+            if executor is not None:
+                executor.shutdown()
+                executor = None
+            log_sink.close()
 
-    app = FastAPI(title="Stockholm Price Intelligence", version="0.1.0", lifespan=lifespan)
+    app = FastAPI(
+        title="Stockholm Price Intelligence",
+        version="0.1.0",
+        lifespan=lifespan,
+        **({"default_response_class": FastJSONResponse} if fast_json else {}),
+    )
 
     raw_cors = os.getenv("CORS_ALLOW_ORIGIN", "*").strip()
     if raw_cors == "*":
@@ -60,6 +142,13 @@ def create_app() -> FastAPI:
     else:
         allow_origins = [o.strip() for o in raw_cors.split(",") if o.strip()]
 
+    # Added before CORS so that 503 responses still carry CORS headers
+    admission = controller_from_env()
+    if admission is not None:
+        app.add_middleware(
+            AdmissionMiddleware, controller=admission, paths=admission_paths_from_env()
+        )
+
     app.add_middleware(
         CORSMiddleware,
         allow_origins=allow_origins,
@@ -76,69 +165,430 @@ def create_app() -> FastAPI:
                 "health": "/health",
                 "model_info": "/model-info",
                 "predict": "/predict",
+                "predict_trend": "/predict/trend",
+                "predict_bulk": "/predict/bulk",
+                "sensitivity": "/sensitivity",
+                "comparables": "/comparables",
+                "explain": "/explain",
+                "explain_batch": "/explain/batch",
+                "shadow": "/shadow",
             },
         }
 
+    # async so it runs on the event loop and never waits for a threadpool slot
     @app.get("/health")
-    def health() -> dict:
+    async def health() -> dict:
         return {"ok": True}
 
+    @app.get("/shadow")
+    def shadow_stats() -> dict:
+        if shadow is None:
+            return {"enabled": False}
+        return {"enabled": True, **shadow.stats()}
+
+    def _model_info_body() -> bytes:
+        metrics_path = os.getenv("METRICS_PATH")
+        metrics = _load_metrics(metrics_path) if metrics_path else None
+        return (
+            ModelInfoResponse(
+                model_version=artifacts.model_version,
+                target_mode=get_target_mode(),
+                metrics_path=metrics_path,
+                metrics=metrics,
+            )
+            .model_dump_json()
+            .encode("utf-8")
+        )
+
+    model_info_snapshot = Snapshot(_model_info_body)
+
     @app.get("/model-info", response_model=ModelInfoResponse)
-    def model_info() -> ModelInfoResponse:
+    def model_info(request: Request) -> Response:
         if artifacts is None:
             raise RuntimeError("Model artifacts not loaded")
 
-        target_mode = os.getenv("TARGET_MODE", "price_per_sqm").strip().lower()
+        # Re-read metrics only when the metrics or artifact files change on disk
         metrics_path = os.getenv("METRICS_PATH")
-        metrics = _load_metrics(metrics_path) if metrics_path else None
+        signature = file_signature(
+            [metrics_path, os.getenv("MODEL_PATH"), os.getenv("PREPROCESSOR_PATH")]
+        ) + (artifacts.model_version, get_target_mode())
+        body, etag = model_info_snapshot.get(signature)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
 
-        return ModelInfoResponse(
-            model_version=artifacts.model_version,
-            target_mode=target_mode,
-            metrics_path=metrics_path,
-            metrics=metrics,
+    def _predict_result(req: PredictRequest, interval: float | None) -> dict:
+        start = perf_counter()
+        row = row_from_request(req)
+        X_df = frame_from_rows([row])
+        area = np.array([row["area"]])
+        target_mode = get_target_mode()
+
+        prediction_interval = None
+        banded = predict_with_interval(artifacts, X_df, interval) if interval else None
+        if banded is not None:
+            pred, lower, upper, level = banded
+            lower_sqm, lower_total = price_outputs(lower, area, target_mode=target_mode)
+            upper_sqm, upper_total = price_outputs(upper, area, target_mode=target_mode)
+            prediction_interval = {
+                "level": level,
+                "lower_price_per_sqm": float(lower_sqm[0]),
+                "upper_price_per_sqm": float(upper_sqm[0]),
+                "lower_total_price": float(lower_total[0]),
+                "upper_total_price": float(upper_total[0]),
+            }
+        else:
+            pred = _predict(X_df)
+        price_per_sqm, total_price = price_outputs(pred, area, target_mode=target_mode)
+        predicted_price_per_sqm = float(price_per_sqm[0])
+        predicted_total_price = float(total_price[0])
+
+        inference_ms = (perf_counter() - start) * 1000.0
+
+        result = {
+            "predicted_price_per_sqm": predicted_price_per_sqm,
+            "predicted_total_price": predicted_total_price,
+            "model_version": artifacts.model_version,
+            "inference_ms": inference_ms,
+            "prediction_interval": prediction_interval,
+        }
+        log_sink.write(
+            {
+                "request": row,
+                **{k: v for k, v in result.items() if v is not None},
+            },
         )
+        if shadow is not None:
+            # Only enqueues; candidates are scored on the shadow worker thread
+            shadow.submit(row, float(pred[0]), artifacts.model_version)
+        return result
 
     @app.post("/predict", response_model=PredictResponse)
-    def predict(req: PredictRequest) -> PredictResponse:
+    def predict(
+        request: Request,
+        req: PredictRequest,
+        interval: float | None = Query(
+            default=None, gt=0, lt=1, description="Prediction interval level, e.g. 0.8"
+        ),
+    ) -> PredictResponse | Response:
         if artifacts is None:
             raise RuntimeError("Model artifacts not loaded")
+        result = _predict_result(req, interval)
+        report_inference_ms(request, result["inference_ms"])
+        return respond(PredictResponse, result, fast=fast_json)
 
-        start = perf_counter()
-        row = _row_from_request(req)
+    @app.get("/predict", response_model=PredictResponse)
+    def predict_get(request: Request, query: Annotated[PredictQuery, Query()]) -> Response:
+        # Cacheable variant of POST /predict: the ETag depends only on the canonical
+        # inputs, the model version and the target mode, so a match skips inference.
+        if artifacts is None:
+            raise RuntimeError("Model artifacts not loaded")
 
-        X_df = pd.DataFrame([row])
-        X = artifacts.preprocessor.transform(X_df)
-        y_pred = artifacts.model.predict(X)
-        pred = float(np.asarray(y_pred).reshape(-1)[0])
+        req = PredictRequest(**query.model_dump(exclude={"interval"}))
+        interval = query.interval
+        canonical = canonical_predict_query(req, interval)
+        etag = strong_etag(canonical, artifacts.model_version, get_target_mode())
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={predict_max_age}",
+            "Content-Location": f"/predict?{canonical}",
+        }
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        result = _predict_result(req, interval)
+        report_inference_ms(request, result["inference_ms"])
+        return Response(content=dumps(result), media_type="application/json", headers=headers)
 
-        target_mode = os.getenv("TARGET_MODE", "price_per_sqm").strip().lower()
-        if target_mode == "total_price":
-            predicted_total_price = pred
-            predicted_price_per_sqm = float(predicted_total_price / float(req.area))
-        else:
-            predicted_price_per_sqm = pred
-            predicted_total_price = float(predicted_price_per_sqm * float(req.area))
+    @app.post("/predict/bulk")
+    async def predict_bulk(
+        request: Request,
+        format: str | None = Query(default=None, pattern="^(csv|ndjson)$"),
+    ) -> UploadStreamingResponse:
+        if artifacts is None:
+            raise RuntimeError("Model artifacts not loaded")
+
+        fmt = format or detect_format(request.headers.get("content-type"))
+        if fmt is None:
+            raise HTTPException(
+                status_code=415,
+                detail="Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson",
+            )
+        chunk_rows = max(1, int(os.getenv("BULK_CHUNK_ROWS", "1000")))
+        target_mode = get_target_mode()
+        loaded = artifacts
+
+        async def results():
+            # Reads, scores and emits one chunk at a time so memory stays bounded by
+            # chunk_rows regardless of upload size; rows come back in input order.
+            start = perf_counter()
+            n_rows = 0
+            n_errors = 0
+            chunk: list = []
+
+            async def flush():
+                nonlocal n_rows, n_errors
+                out = await run_in_threadpool(
+                    score_records, loaded, chunk, target_mode=target_mode, predict=_predict
+                )
+                n_rows += len(out)
+                n_errors += sum(1 for o in out if "error" in o)
+                chunk.clear()
+                return b"".join(dumps(o) + b"\n" for o in out)
+
+            done = False
+            try:
+                async for item in iter_records(iter_lines(request.stream()), fmt):
+                    chunk.append(item)
+                    if len(chunk) >= chunk_rows:
+                        yield await flush()
+                if chunk:
+                    yield await flush()
+
+                done = True
+                yield (
+                    dumps(
+                        {
+                            "done": True,
+                            "rows": n_rows,
+                            "errors": n_errors,
+                            "model_version": loaded.model_version,
+                            "inference_ms": (perf_counter() - start) * 1000.0,
+                        }
+                    )
+                    + b"\n"
+                )
+            finally:
+                # Logged even when the client disconnects partway through the upload
+                log_sink.write(
+                    {
+                        "endpoint": "predict/bulk",
+                        "format": fmt,
+                        "rows": n_rows,
+                        "errors": n_errors,
+                        "completed": done,
+                        "model_version": loaded.model_version,
+                        "inference_ms": (perf_counter() - start) * 1000.0,
+                    },
+                )
+
+        return UploadStreamingResponse(results(), media_type="application/x-ndjson")
+
+    @app.post("/predict/trend", response_model=TrendResponse)
+    def predict_trend(request: Request, req: TrendRequest) -> TrendResponse | Response:
+        if artifacts is None:
+            raise RuntimeError("Model artifacts not loaded")
+
+        start = perf_counter()
+        row = row_from_request(req.request)
+        values = req.start + np.arange(req.num_points()) * req.step
+        if req.feature in INTEGER_FEATURES:
+            values = np.rint(values).astype(int)
+
+        # One row per sweep value, predicted in a single call
+        X_df = frame_from_rows([row] * len(values))
+        X_df[req.feature] = values
+        pred = _predict(X_df)
+        price_per_sqm, total_price = price_outputs(
+            pred, X_df["area"].to_numpy(dtype=float), target_mode=get_target_mode()
+        )
 
         inference_ms = (perf_counter() - start) * 1000.0
+        report_inference_ms(request, inference_ms)
 
-        log_path = os.getenv("PREDICTION_LOG_PATH", "logs/predictions.jsonl")
-        append_jsonl(
-            log_path,
+        log_sink.write(
             {
+                "endpoint": "predict/trend",
                 "request": row,
-                "predicted_price_per_sqm": predicted_price_per_sqm,
-                "predicted_total_price": predicted_total_price,
+                "sweep": {"feature": req.feature, "values": values.tolist()},
+                "predicted_price_per_sqm": price_per_sqm.tolist(),
+                "predicted_total_price": total_price.tolist(),
+                "model_version": artifacts.model_version,
+                "inference_ms": inference_ms,
+            },
+        )
+
+        return respond(
+            TrendResponse,
+            {
+                "feature": req.feature,
+                "points": [
+                    {"value": v, "predicted_price_per_sqm": p, "predicted_total_price": t}
+                    for v, p, t in zip(
+                        values.astype(float).tolist(),
+                        price_per_sqm.tolist(),
+                        total_price.tolist(),
+                        strict=True,
+                    )
+                ],
                 "model_version": artifacts.model_version,
                 "inference_ms": inference_ms,
             },
+            fast=fast_json,
+        )
+
+    @app.post("/sensitivity", response_model=SensitivityResponse)
+    def sensitivity(request: Request, req: SensitivityRequest) -> SensitivityResponse | Response:
+        if artifacts is None:
+            raise RuntimeError("Model artifacts not loaded")
+
+        shape = req.shape()
+        n_cells = int(np.prod(shape))
+        max_cells = int(os.getenv("SENSITIVITY_MAX_CELLS", "2500"))
+        if n_cells > max_cells:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Grid has {n_cells} cells; the limit is {max_cells}",
+            )
+
+        start = perf_counter()
+        row = row_from_request(req.request)
+        pred, area, timing = predict_grid(
+            artifacts, row, [(axis.feature, axis.values) for axis in req.axes]
+        )
+        price_per_sqm, total_price = price_outputs(pred, area, target_mode=get_target_mode())
+        total_ms = (perf_counter() - start) * 1000.0
+        report_inference_ms(request, total_ms)
+
+        log_sink.write(
+            {
+                "endpoint": "sensitivity",
+                "request": row,
+                "features": [axis.feature for axis in req.axes],
+                "shape": shape,
+                "model_version": artifacts.model_version,
+                "inference_ms": total_ms,
+            },
         )
 
-        return PredictResponse(
-            predicted_price_per_sqm=predicted_price_per_sqm,
-            predicted_total_price=predicted_total_price,
-            model_version=artifacts.model_version,
-            inference_ms=inference_ms,
+        return respond(
+            SensitivityResponse,
+            {
+                "features": [axis.feature for axis in req.axes],
+                "values": [axis.values for axis in req.axes],
+                "shape": shape,
+                "predicted_price_per_sqm": price_per_sqm.tolist(),
+                "predicted_total_price": total_price.tolist(),
+                "model_version": artifacts.model_version,
+                "timing": {**timing, "total_ms": total_ms},
+            },
+            fast=fast_json,
+        )
+
+    @app.post("/comparables", response_model=ComparablesResponse)
+    def comparables(
+        request: Request,
+        req: PredictRequest,
+        k: int = Query(default=5, ge=1, le=MAX_COMPARABLES),
+    ) -> ComparablesResponse | Response:
+        if artifacts is None:
+            raise RuntimeError("Model artifacts not loaded")
+        if artifacts.comparables is None:
+            raise HTTPException(status_code=404, detail="Comparables index not configured")
+
+        start = perf_counter()
+        row = row_from_request(req)
+        found = find_comparables(artifacts, row, k)
+        query_ms = (perf_counter() - start) * 1000.0
+        report_inference_ms(request, query_ms)
+
+        log_sink.write(
+            {
+                "endpoint": "comparables",
+                "request": row,
+                "k": k,
+                "model_version": artifacts.model_version,
+                "inference_ms": query_ms,
+            },
+        )
+
+        return respond(
+            ComparablesResponse,
+            {
+                "target_col": artifacts.comparables.target_col,
+                "comparables": found,
+                "model_version": artifacts.model_version,
+                "query_ms": query_ms,
+            },
+            fast=fast_json,
+        )
+
+    def _explainer() -> TreeExplainer:
+        nonlocal explainer
+        with explainer_lock:
+            if explainer is None or explainer[0] is not artifacts:
+                try:
+                    explainer = (artifacts, build_explainer(artifacts))
+                except (TypeError, ValueError) as exc:
+                    raise HTTPException(status_code=501, detail=str(exc)) from exc
+            return explainer[1]
+
+    def _explanations(rows: list[dict]) -> tuple[list[dict], float]:
+        start = perf_counter()
+        tree_explainer = _explainer()
+        phi, pred = explain_frame(artifacts, tree_explainer, frame_from_rows(rows))
+        names = tree_explainer.group_names
+        items = [
+            {
+                "base_value": tree_explainer.base_value,
+                "prediction": float(p),
+                "contributions": dict(zip(names, contrib, strict=True)),
+            }
+            for p, contrib in zip(pred.tolist(), phi.tolist(), strict=True)
+        ]
+        return items, (perf_counter() - start) * 1000.0
+
+    @app.post("/explain", response_model=ExplainResponse)
+    def explain(request: Request, req: PredictRequest) -> ExplainResponse | Response:
+        if artifacts is None:
+            raise RuntimeError("Model artifacts not loaded")
+
+        row = row_from_request(req)
+        (item,), explain_ms = _explanations([row])
+        report_inference_ms(request, explain_ms)
+        log_sink.write(
+            {
+                "endpoint": "explain",
+                "request": row,
+                "model_version": artifacts.model_version,
+                "inference_ms": explain_ms,
+            },
+        )
+        return respond(
+            ExplainResponse,
+            {
+                **item,
+                "target_mode": get_target_mode(),
+                "model_version": artifacts.model_version,
+                "explain_ms": explain_ms,
+            },
+            fast=fast_json,
+        )
+
+    @app.post("/explain/batch", response_model=ExplainBatchResponse)
+    def explain_batch(req: ExplainBatchRequest) -> ExplainBatchResponse | Response:
+        if artifacts is None:
+            raise RuntimeError("Model artifacts not loaded")
+
+        rows = [row_from_request(r) for r in req.requests]
+        items, explain_ms = _explanations(rows)
+        log_sink.write(
+            {
+                "endpoint": "explain/batch",
+                "rows": len(rows),
+                "model_version": artifacts.model_version,
+                "inference_ms": explain_ms,
+            },
+        )
+        return respond(
+            ExplainBatchResponse,
+            {
+                "explanations": items,
+                "target_mode": get_target_mode(),
+                "model_version": artifacts.model_version,
+                "explain_ms": explain_ms,
+            },
+            fast=fast_json,
         )
 
     return app
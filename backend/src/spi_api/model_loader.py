@@ -2,15 +2,30 @@ from __future__ import annotations
 
 import os
 from dataclasses import dataclass
+from functools import cached_property
 
 import joblib
 
+from spi_train.comparables import ComparablesIndex
+from spi_train.tree_arrays import FlatForest, as_flat_forest
+
 
 @dataclass(frozen=True)
 class LoadedArtifacts:
     preprocessor: object
     model: object
     model_version: str
+    # Optional {"level", "lower", "upper"} quantile-model pair exported by training, for
+    # prediction intervals
+    interval_model: dict | None = None
+    # Nearest-neighbour index over the training sales, for /comparables
+    comparables: ComparablesIndex | None = None
+
+    @cached_property
+    def forest(self) -> FlatForest | None:
+        # Flattened view of forest models for per-tree intervals and TreeSHAP. It copies
+        # every node, so it is only built on the first request that needs it.
+        return as_flat_forest(self.model)
 
 
 def load_artifacts() -> LoadedArtifacts:
@@ -30,4 +45,24 @@ def load_artifacts() -> LoadedArtifacts:
     model = joblib.load(model_path)
     preprocessor = joblib.load(preprocessor_path)
 
-    return LoadedArtifacts(preprocessor=preprocessor, model=model, model_version=model_version)
+    interval_model = None
+    interval_path = os.getenv("INTERVAL_MODEL_PATH")
+    if interval_path:
+        if not os.path.exists(interval_path):
+            raise FileNotFoundError(f"Interval artifact not found at '{interval_path}'.")
+        interval_model = joblib.load(interval_path)
+
+    comparables = None
+    comparables_path = os.getenv("COMPARABLES_PATH")
+    if comparables_path:
+        if not os.path.exists(comparables_path):
+            raise FileNotFoundError(f"Comparables index not found at '{comparables_path}'.")
+        comparables = joblib.load(comparables_path)
+
+    return LoadedArtifacts(
+        preprocessor=preprocessor,
+        model=model,
+        model_version=model_version,
+        interval_model=interval_model,
+        comparables=comparables,
+    )
@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import json
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from spi_api.logging_utils import FILE_MAGIC, MISSING_INT, iter_columnar_blocks
+from spi_train.sketches import (
+    Histogram,
+    HyperLogLog,
+    QuantileSketch,
+    hash64,
+    latency_edges_ms,
+    psi,
+)
+
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+_FLUSH_EVERY = 10_000
+
+
+class LogSummary:
+    # One pass over prediction log records into mergeable sketches. Summaries of separate
+    # segments (or files) merge into the same result as a single pass over all of them.
+    def __init__(self, profile: dict | None = None) -> None:
+        self.records = 0
+        self.bad_lines = 0
+        self.bulk_rows = 0
+        self.first_ts: str | None = None
+        self.last_ts: str | None = None
+        self.endpoints: Counter[str] = Counter()
+        self.model_versions: Counter[str] = Counter()
+        self.districts: Counter[str] = Counter()
+        self.latency = QuantileSketch()
+        self.latency_hist = Histogram(latency_edges_ms())
+        self.endpoint_latency: dict[str, QuantileSketch] = {}
+        self.predictions = QuantileSketch()
+        self.distinct_requests = HyperLogLog()
+        profile = profile or {}
+        self.numeric = {
+            col: Histogram(ref["edges"]) for col, ref in profile.get("numeric", {}).items()
+        }
+        self.categorical: dict[str, Counter[str]] = {
+            col: Counter() for col in profile.get("categorical", {})
+        }
+        self._buf: dict[str, list] = {}
+
+    def _push(self, key: str, value) -> None:
+        self._buf.setdefault(key, []).append(value)
+
+    def add(self, record: dict) -> None:
+        # Serving features come from the base `request` of every record shape; sweep and
+        # grid values are synthetic what-ifs and are not counted as traffic.
+        self.records += 1
+        endpoint = str(record.get("endpoint", "predict"))
+        self.endpoints[endpoint] += 1
+        if record.get("model_version") is not None:
+            self.model_versions[str(record["model_version"])] += 1
+        ts = record.get("ts")
+        if isinstance(ts, str):
+            self.first_ts = ts if self.first_ts is None else min(self.first_ts, ts)
+            self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+        latency = record.get("inference_ms")
+        if isinstance(latency, int | float):
+            self._push("latency", latency)
+            self._push(f"latency:{endpoint}", latency)
+        if endpoint == "predict/bulk":
+            self.bulk_rows += int(record.get("rows") or 0)
+        pred = record.get("predicted_price_per_sqm")
+        if isinstance(pred, int | float):
+            self._push("prediction", pred)
+
+        request = record.get("request")
+        if isinstance(request, dict):
+            self._push("request", json.dumps(request, sort_keys=True, ensure_ascii=False))
+            district = request.get("district")
+            if district is not None:
+                self.districts[str(district)] += 1
+            for col in self.numeric:
+                value = request.get(col)
+                self._push(f"num:{col}", value if isinstance(value, int | float) else np.nan)
+            for col, counts in self.categorical.items():
+                counts[str(request.get(col) if request.get(col) is not None else "Unknown")] += 1
+
+        if self.records % _FLUSH_EVERY == 0:
+            self.flush()
+
+    def flush(self) -> None:
+        for key, values in self._buf.items():
+            if not values:
+                continue
+            if key == "latency":
+                self.latency.add_many(values)
+                self.latency_hist.add_many(values)
+            elif key.startswith("latency:"):
+                self.endpoint_latency.setdefault(key[8:], QuantileSketch()).add_many(values)
+            elif key == "prediction":
+                self.predictions.add_many(values)
+            elif key == "request":
+                self.distinct_requests.add_hashes(hash64(values))
+            elif key.startswith("num:"):
+                self.numeric[key[4:]].add_many(values)
+        self._buf = {}
+
+    def merge(self, other: LogSummary) -> None:
+        self.flush()
+        other.flush()
+        self.records += other.records
+        self.bad_lines += other.bad_lines
+        self.bulk_rows += other.bulk_rows
+        for ts in (other.first_ts, other.last_ts):
+            if ts is not None:
+                self.first_ts = ts if self.first_ts is None else min(self.first_ts, ts)
+                self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+        self.endpoints.update(other.endpoints)
+        self.model_versions.update(other.model_versions)
+        self.districts.update(other.districts)
+        self.latency.merge(other.latency)
+        self.latency_hist.merge(other.latency_hist)
+        for endpoint, sketch in other.endpoint_latency.items():
+            self.endpoint_latency.setdefault(endpoint, QuantileSketch()).merge(sketch)
+        self.predictions.merge(other.predictions)
+        self.distinct_requests.merge(other.distinct_requests)
+        for col, hist in other.numeric.items():
+            self.numeric[col].merge(hist)
+        for col, counts in other.categorical.items():
+            self.categorical[col].update(counts)
+
+    def to_dict(self) -> dict:
+        self.flush()
+
+        def _q(sketch: QuantileSketch) -> dict:
+            values = sketch.quantiles(QUANTILES)
+            return {f"p{round(q * 100)}": v for q, v in zip(QUANTILES, values, strict=True)}
+
+        return {
+            "records": self.records,
+            "bad_lines": self.bad_lines,
+            "bulk_rows": self.bulk_rows,
+            "first_ts": self.first_ts,
+            "last_ts": self.last_ts,
+            "endpoints": dict(self.endpoints.most_common()),
+            "model_versions": dict(self.model_versions.most_common()),
+            "districts": dict(self.districts.most_common()),
+            "distinct_requests": round(self.distinct_requests.estimate()),
+            "latency_ms": _q(self.latency),
+            "latency_ms_by_endpoint": {e: _q(s) for e, s in sorted(self.endpoint_latency.items())},
+            "latency_histogram_ms": self.latency_hist.to_dict(),
+            "predicted_price_per_sqm": _q(self.predictions),
+        }
+
+
+def log_segments(path: Path, n: int) -> list[tuple[int, int]]:
+    size = os.path.getsize(path)
+    n = max(1, min(n, size // (1024 * 1024) or 1))
+    bounds = [size * i // n for i in range(n + 1)]
+    return list(zip(bounds[:-1], bounds[1:], strict=True))
+
+
+def summarize_segment(
+    path: str | Path, start: int = 0, end: int | None = None, profile: dict | None = None
+) -> LogSummary:
+    # A line belongs to the segment its first byte falls in, so adjacent byte ranges
+    # split at arbitrary offsets cover every line exactly once.
+    summary = LogSummary(profile)
+    end = os.path.getsize(path) if end is None else end
+    with open(path, "rb") as f:
+        if start > 0:
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                summary.bad_lines += 1
+                continue
+            if isinstance(record, dict):
+                summary.add(record)
+            else:
+                summary.bad_lines += 1
+    summary.flush()
+    return summary
+
+
+def summarize_columnar(path: str | Path, profile: dict | None = None) -> LogSummary:
+    # Columnar logs hold /predict records only; rebuild the same record shape per row
+    summary = LogSummary(profile)
+    features = ["area", "rooms", "district", "year_built", "monthly_fee", "transaction_year"]
+    for block in iter_columnar_blocks(path):
+        ts = [datetime.fromtimestamp(t, timezone.utc).isoformat() for t in block["ts"].tolist()]
+        columns = {name: block[name].tolist() for name in features}
+        for i in range(len(ts)):
+            request = {name: columns[name][i] for name in features}
+            if request["transaction_year"] == MISSING_INT:
+                request["transaction_year"] = None
+            summary.add(
+                {
+                    "ts": ts[i],
+                    "request": request,
+                    "predicted_price_per_sqm": float(block["predicted_price_per_sqm"][i]),
+                    "model_version": block["model_version"][i],
+                    "inference_ms": float(block["inference_ms"][i]),
+                }
+            )
+    summary.flush()
+    return summary
+
+
+def _is_columnar(path: str | Path) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(FILE_MAGIC)) == FILE_MAGIC
+
+
+def _summarize_task(task: tuple[str, int, int | None, dict | None]) -> LogSummary:
+    path, start, end, profile = task
+    if _is_columnar(path):
+        return summarize_columnar(path, profile)
+    return summarize_segment(path, start, end, profile)
+
+
+def summarize_logs(
+    paths: list[Path], *, profile: dict | None = None, workers: int = 1
+) -> LogSummary:
+    # JSONL files split into byte ranges; a columnar file is read whole by one task
+    tasks = []
+    for p in paths:
+        if _is_columnar(p):
+            tasks.append((str(p), 0, None, profile))
+        else:
+            tasks += [(str(p), start, end, profile) for start, end in log_segments(p, workers)]
+    total = LogSummary(profile)
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            for part in ex.map(_summarize_task, tasks):
+                total.merge(part)
+    else:
+        for task in tasks:
+            total.merge(_summarize_task(task))
+    return total
+
+
+def _status(score: float) -> str:
+    # Common PSI rule of thumb
+    if not np.isfinite(score):
+        return "no_data"
+    if score < 0.1:
+        return "stable"
+    if score < 0.25:
+        return "moderate"
+    return "drift"
+
+
+def drift_report(summary: LogSummary, profile: dict) -> dict:
+    summary.flush()
+    report: dict[str, dict] = {}
+    for col, ref in profile.get("numeric", {}).items():
+        hist = summary.numeric.get(col)
+        if hist is None:
+            continue
+        score = psi(ref["counts"], hist.counts)
+        report[col] = {"psi": score, "status": _status(score), "missing": hist.missing}
+    for col, ref in profile.get("categorical", {}).items():
+        counts = summary.categorical.get(col)
+        if counts is None:
+            continue
+        # Categories never seen in training share one bucket with expected count zero
+        categories = list(ref)
+        unseen = sum(v for k, v in counts.items() if k not in ref)
+        score = psi(
+            [ref[c] for c in categories] + [0], [counts.get(c, 0) for c in categories] + [unseen]
+        )
+        report[col] = {"psi": score, "status": _status(score), "unseen": unseen}
+    return report
+
+
+def load_feature_profile(run_json: str | Path) -> dict:
+    payload = json.loads(Path(run_json).read_text(encoding="utf-8"))
+    profile = payload.get("feature_profile") if isinstance(payload, dict) else None
+    if not isinstance(profile, dict):
+        raise ValueError(f"{run_json} has no feature_profile; retrain to record one")
+    return profile
@@ -1,22 +1,40 @@
 from __future__ import annotations
 
-from pydantic import BaseModel, Field
+import math
+from typing import Literal
+
+from pydantic import BaseModel, Field, model_validator
+
+MAX_DISTRICT_LENGTH = 100
 
 
 class PredictRequest(BaseModel):
     area: float = Field(gt=0)
     rooms: float = Field(gt=0)
-    district: str = Field(min_length=1)
+    district: str = Field(min_length=1, max_length=MAX_DISTRICT_LENGTH)
     year_built: int = Field(ge=1800, le=2100)
     monthly_fee: float = Field(ge=0)
     transaction_year: int | None = Field(default=None, ge=1990, le=2100)
 
 
+class PredictQuery(PredictRequest):
+    interval: float | None = Field(default=None, gt=0, lt=1)
+
+
+class PredictionInterval(BaseModel):
+    level: float
+    lower_price_per_sqm: float
+    upper_price_per_sqm: float
+    lower_total_price: float
+    upper_total_price: float
+
+
 class PredictResponse(BaseModel):
     predicted_price_per_sqm: float
     predicted_total_price: float
     model_version: str
     inference_ms: float
+    prediction_interval: PredictionInterval | None = None
 
 
 class ModelMetrics(BaseModel):
@@ -30,3 +48,154 @@ class ModelInfoResponse(BaseModel):
     target_mode: str
     metrics_path: str | None = None
     metrics: ModelMetrics | None = None
+
+
+SweepFeature = Literal["transaction_year", "area", "monthly_fee", "rooms", "year_built"]
+INTEGER_FEATURES = frozenset({"transaction_year", "year_built"})
+MAX_TREND_POINTS = 500
+
+
+class TrendRequest(BaseModel):
+    request: PredictRequest
+    feature: SweepFeature = "transaction_year"
+    start: float
+    stop: float
+    step: float = Field(default=1, gt=0)
+
+    @model_validator(mode="after")
+    def _check_range(self) -> TrendRequest:
+        if self.stop < self.start:
+            raise ValueError("stop must be >= start")
+        if self.feature in INTEGER_FEATURES and not all(
+            float(v).is_integer() for v in (self.start, self.stop, self.step)
+        ):
+            raise ValueError(f"{self.feature} sweeps need integer start/stop/step")
+        if self.num_points() > MAX_TREND_POINTS:
+            raise ValueError(f"sweep has more than {MAX_TREND_POINTS} points")
+        # Field constraints are ranges, so checking both ends covers every point
+        base = self.request.model_dump()
+        for value in (self.start, self.stop):
+            PredictRequest.model_validate({**base, self.feature: value})
+        return self
+
+    def num_points(self) -> int:
+        return int(math.floor((self.stop - self.start) / self.step + 1e-9)) + 1
+
+
+class TrendPoint(BaseModel):
+    value: float
+    predicted_price_per_sqm: float
+    predicted_total_price: float
+
+
+class TrendResponse(BaseModel):
+    feature: str
+    points: list[TrendPoint]
+    model_version: str
+    inference_ms: float
+
+
+SensitivityFeature = Literal[
+    "area", "rooms", "year_built", "monthly_fee", "transaction_year", "district"
+]
+MAX_SENSITIVITY_AXIS_VALUES = 200
+
+
+class SensitivityAxis(BaseModel):
+    feature: SensitivityFeature
+    values: list[float | str] = Field(min_length=1, max_length=MAX_SENSITIVITY_AXIS_VALUES)
+
+
+class SensitivityRequest(BaseModel):
+    request: PredictRequest
+    axes: list[SensitivityAxis] = Field(min_length=1, max_length=2)
+
+    @model_validator(mode="after")
+    def _check_axes(self) -> SensitivityRequest:
+        features = [a.feature for a in self.axes]
+        if len(set(features)) != len(features):
+            raise ValueError("each feature can only be varied on one axis")
+        base = self.request.model_dump()
+        for axis in self.axes:
+            if axis.feature == "district":
+                axis.values = [str(v) for v in axis.values]
+            else:
+                axis.values = [float(v) for v in axis.values]
+                if axis.feature in INTEGER_FEATURES:
+                    if not all(float(v).is_integer() for v in axis.values):
+                        raise ValueError(f"{axis.feature} values must be integers")
+                    axis.values = [int(v) for v in axis.values]
+            # Numeric constraints are ranges, so the extremes cover every value; district
+            # lengths are checked one by one
+            if axis.feature == "district":
+                checked = axis.values
+            else:
+                checked = [min(axis.values), max(axis.values)]
+            for value in checked:
+                PredictRequest.model_validate({**base, axis.feature: value})
+        return self
+
+    def shape(self) -> list[int]:
+        return [len(a.values) for a in self.axes]
+
+
+class SensitivityTiming(BaseModel):
+    transform_ms: float
+    predict_ms: float
+    total_ms: float
+
+
+class SensitivityResponse(BaseModel):
+    features: list[str]
+    values: list[list[float | str]]
+    shape: list[int]
+    # Row-major over axes: index = i0 * shape[1] + i1
+    predicted_price_per_sqm: list[float]
+    predicted_total_price: list[float]
+    model_version: str
+    timing: SensitivityTiming
+
+
+MAX_COMPARABLES = 50
+
+
+class ComparableSale(BaseModel):
+    district: str | None
+    distance: float
+    features: dict[str, float | None]
+    target: float
+
+
+class ComparablesResponse(BaseModel):
+    target_col: str
+    comparables: list[ComparableSale]
+    model_version: str
+    query_ms: float
+
+
+MAX_EXPLAIN_ROWS = 1000
+
+
+class Explanation(BaseModel):
+    # Contributions are in model target units (see target_mode) and sum with base_value
+    # to the model output
+    base_value: float
+    prediction: float
+    contributions: dict[str, float]
+
+
+class ExplainResponse(Explanation):
+    target_mode: str
+    model_version: str
+    explain_ms: float
+
+
+class ExplainBatchRequest(BaseModel):
+    requests: list[PredictRequest] = Field(min_length=1, max_length=MAX_EXPLAIN_ROWS)
+
+
+class ExplainBatchResponse(BaseModel):
+    explanations: list[Explanation]
+    target_mode: str
+    model_version: str
+    explain_ms: float
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import json
+import os
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional: pip install -e ".[fast]"
+    orjson = None
+
+
+def fast_serialization_enabled() -> bool:
+    return os.getenv("SPI_FAST_SERIALIZATION", "0").strip().lower() in {"1", "true", "yes"}
+
+
+def dumps(obj) -> bytes:
+    # UTF-8 JSON bytes; orjson when installed (also handles numpy scalars and arrays)
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def respond(model: type[BaseModel], payload: dict, *, fast: bool) -> BaseModel | Response:
+    # The fast path encodes the handler's own dict directly. Returning a Response makes
+    # FastAPI skip validating and re-serializing it against response_model, which only
+    # documents the schema in that mode.
+    if fast:
+        return Response(content=dumps(payload), media_type="application/json")
+    return model(**payload)
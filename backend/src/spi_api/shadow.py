@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import os
+import queue
+import random
+import threading
+from time import monotonic, perf_counter
+
+import joblib
+import numpy as np
+
+from spi_api.inference import frame_from_rows, predict_frame
+from spi_api.logging_utils import JsonlSink
+from spi_api.model_loader import LoadedArtifacts
+
+_STOP = object()
+
+
+def parse_shadow_models(raw: str) -> list[tuple[str, str, str | None]]:
+    # "v2=models/model_v2.pkl|models/preprocessor_v2.pkl,v3=models/model_v3.pkl" ->
+    # [(version, model_path, preprocessor_path or None)]; without a preprocessor the
+    # candidate shares the primary model's
+    entries = []
+    for item in raw.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        version, sep, paths = item.partition("=")
+        if not sep or not version.strip() or not paths.strip():
+            raise ValueError(f"Bad SHADOW_MODELS entry {item!r} (expected version=model_path)")
+        model_path, _, preprocessor_path = paths.partition("|")
+        entries.append((version.strip(), model_path.strip(), preprocessor_path.strip() or None))
+    return entries
+
+
+def load_candidates(raw: str, primary: LoadedArtifacts) -> dict[str, LoadedArtifacts]:
+    candidates = {}
+    for version, model_path, preprocessor_path in parse_shadow_models(raw):
+        for path in (model_path, preprocessor_path):
+            if path and not os.path.exists(path):
+                raise FileNotFoundError(f"Shadow artifact for '{version}' not found at '{path}'.")
+        model = joblib.load(model_path)
+        # The worker shares the CPU with request handling; keep candidates single-threaded
+        if hasattr(model, "n_jobs"):
+            model.n_jobs = 1
+        preprocessor = joblib.load(preprocessor_path) if preprocessor_path else None
+        candidates[version] = LoadedArtifacts(
+            preprocessor=preprocessor or primary.preprocessor,
+            model=model,
+            model_version=version,
+        )
+    return candidates
+
+
+class ShadowScorer:
+    # Scores a sample of live requests with candidate models on a background thread and
+    # logs how far they are from the primary prediction. submit() never blocks: when the
+    # bounded queue is full the row is dropped and counted instead.
+    def __init__(
+        self,
+        candidates: dict[str, LoadedArtifacts],
+        sink: JsonlSink,
+        *,
+        sample_rate: float = 1.0,
+        max_queue: int = 10000,
+        batch_rows: int = 256,
+        flush_s: float = 1.0,
+        seed: int | None = None,
+    ) -> None:
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError(f"SHADOW_SAMPLE_RATE must be within [0, 1], got {sample_rate}")
+        self.candidates = candidates
+        self.sink = sink
+        self.sample_rate = sample_rate
+        self.batch_rows = max(1, batch_rows)
+        self.flush_s = flush_s
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, max_queue))
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._closing = threading.Event()
+        self._counts = {"submitted": 0, "dropped": 0, "scored": 0, "errors": 0}
+        self._diff = {
+            v: {"n": 0, "sum_abs": 0.0, "sum_rel": 0.0, "max_abs": 0.0} for v in candidates
+        }
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+        self._thread.start()
+
+    def submit(self, row: dict, prediction: float, model_version: str) -> bool:
+        if self.sample_rate < 1.0 and self._rng.random() >= self.sample_rate:
+            return False
+        try:
+            self._queue.put_nowait((row, prediction, model_version))
+        except queue.Full:
+            with self._lock:
+                self._counts["dropped"] += 1
+            return False
+        with self._lock:
+            self._counts["submitted"] += 1
+        return True
+
+    def close(self, timeout: float = 10.0) -> None:
+        # Score what is already queued, then stop the worker. With a full queue the stop
+        # marker may not fit; the worker also exits once it finds the queue empty.
+        self._closing.set()
+        if self._thread is not None:
+            try:
+                self._queue.put(_STOP, timeout=min(timeout, 1.0))
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+            self._thread = None
+        self.sink.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            candidates = {
+                version: {
+                    "n": d["n"],
+                    "mean_abs_diff": d["sum_abs"] / d["n"] if d["n"] else None,
+                    "mean_rel_diff": d["sum_rel"] / d["n"] if d["n"] else None,
+                    "max_abs_diff": d["max_abs"] if d["n"] else None,
+                }
+                for version, d in self._diff.items()
+            }
+            return {
+                **self._counts,
+                "queued": self._queue.qsize(),
+                "sample_rate": self.sample_rate,
+                "candidates": candidates,
+            }
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_s)
+            except queue.Empty:
+                if self._closing.is_set():
+                    return
+                continue
+            deadline = monotonic() + self.flush_s
+            # Collect up to batch_rows rows, waiting at most flush_s after the first one
+            while True:
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_rows:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self._score(batch)
+                except Exception as e:
+                    # A bad batch is counted and skipped; the worker keeps draining the queue
+                    with self._lock:
+                        self._counts["errors"] += 1
+                    try:
+                        self.sink.write({"endpoint": "shadow", "error": repr(e)})
+                    except Exception:
+                        pass
+
+    def _score(self, batch: list[tuple[dict, float, str]]) -> None:
+        X_df = frame_from_rows([row for row, _, _ in batch])
+        primary = np.array([pred for _, pred, _ in batch], dtype=float)
+        shadow: dict[str, np.ndarray] = {}
+        score_ms: dict[str, float] = {}
+        for version, candidate in self.candidates.items():
+            start = perf_counter()
+            try:
+                shadow[version] = predict_frame(candidate, X_df)
+            except Exception as e:
+                with self._lock:
+                    self._counts["errors"] += 1
+                self.sink.write({"endpoint": "shadow", "candidate": version, "error": repr(e)})
+                continue
+            score_ms[version] = (perf_counter() - start) * 1000.0
+
+        with self._lock:
+            self._counts["scored"] += len(batch)
+            for version, pred in shadow.items():
+                abs_diff = np.abs(pred - primary)
+                d = self._diff[version]
+                d["n"] += len(batch)
+                d["sum_abs"] += float(abs_diff.sum())
+                d["sum_rel"] += float((abs_diff / np.maximum(np.abs(primary), 1e-9)).sum())
+                d["max_abs"] = max(d["max_abs"], float(abs_diff.max()))
+
+        for i, (row, pred, model_version) in enumerate(batch):
+            self.sink.write(
+                {
+                    "request": row,
+                    "model_version": model_version,
+                    "prediction": pred,
+                    "shadow": {
+                        version: {
+                            "prediction": float(p[i]),
+                            "diff": float(p[i] - pred),
+                            "batch_rows": len(batch),
+                            "batch_ms": score_ms[version],
+                        }
+                        for version, p in shadow.items()
+                    },
+                }
+            )
+
+
+def shadow_from_env(primary: LoadedArtifacts, *, fast: bool = False) -> ShadowScorer | None:
+    raw = os.getenv("SHADOW_MODELS", "").strip()
+    if not raw:
+        return None
+    return ShadowScorer(
+        load_candidates(raw, primary),
+        JsonlSink(os.getenv("SHADOW_LOG_PATH", "logs/shadow.jsonl"), fast=fast),
+        sample_rate=float(os.getenv("SHADOW_SAMPLE_RATE", "1.0")),
+        max_queue=int(os.getenv("SHADOW_QUEUE_ROWS", "10000")),
+        batch_rows=int(os.getenv("SHADOW_BATCH_ROWS", "256")),
+        flush_s=float(os.getenv("SHADOW_FLUSH_S", "1.0")),
+    )
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DISTRICTS = (
+    "Södermalm",
+    "Kungsholmen",
+    "Vasastan",
+    "Östermalm",
+    "Norrmalm",
+    "Bromma",
+    "Hägersten-Liljeholmen",
+    "Enskede-Årsta-Vantör",
+    "Farsta",
+    "Skärholmen",
+    "Spånga-Tensta",
+    "Rinkeby-Kista",
+    "Älvsjö",
+    "Skarpnäck",
+    "Stockholm",
+    "Solna",
+    "Sundbyberg",
+    "Nacka",
+    "Lidingö",
+    "Täby",
+    "Danderyd",
+    "Järfälla",
+    "Sollentuna",
+    "Upplands Väsby",
+    "Vallentuna",
+    "Värmdö",
+    "Tyresö",
+    "Haninge",
+    "Huddinge",
+    "Botkyrka",
+    "Salem",
+    "Ekerö",
+    "Sigtuna",
+    "Nynäshamn",
+    "Vaxholm",
+    "Österåker",
+    "Unknown",
+)
+
+DISTRICT_PREMIUM = {
+    "Östermalm": 35000,
+    "Södermalm": 20000,
+    "Vasastan": 18000,
+    "Kungsholmen": 15000,
+    "Unknown": 0,
+}
+
+
+@dataclass(frozen=True)
+class DistrictTable:
+    # District names with their price premium and sampling probability, indexed by code
+    names: np.ndarray
+    premium: np.ndarray
+    probs: np.ndarray
+
+
+def district_table(n_districts: int = len(DISTRICTS), *, skew: float = 0.0) -> DistrictTable:
+    # The Stockholm districts first, then numbered synthetic ones with random premiums.
+    # skew > 0 draws district k (0-based) with probability proportional to 1 / (k + 1)**skew,
+    # so a few districts dominate and a long tail stays rare.
+    names = list(DISTRICTS[:n_districts])
+    names += [f"District {i:05d}" for i in range(len(names), n_districts)]
+    premium = np.array([DISTRICT_PREMIUM.get(name, 0) for name in names], dtype=float)
+    extra = np.arange(len(DISTRICTS), n_districts)
+    premium[extra] = np.random.default_rng(0).integers(-10, 31, size=extra.size) * 1000.0
+    weights = 1.0 / np.arange(1, n_districts + 1, dtype=float) ** skew
+    return DistrictTable(
+        names=np.array(names, dtype=object), premium=premium, probs=weights / weights.sum()
+    )
+
+
+def generate_chunk(n: int, *, seed: int, chunk: int, districts: DistrictTable) -> pd.DataFrame:
+    # Each chunk has its own stream derived from (seed, chunk): output depends only on the
+    # seed and chunk size, not on how many processes generated it
+    rng = np.random.default_rng([seed, chunk])
+    area = rng.uniform(20, 300, size=n)
+    rooms = np.clip(rng.normal(2.6, 1.2, size=n), 1, 10)
+    year_built = rng.integers(1850, 2025, size=n)
+    monthly_fee = np.clip(rng.normal(3500, 1600, size=n), 0, 20000)
+    transaction_year = rng.integers(2000, 2025, size=n)
+    codes = rng.choice(districts.names.size, size=n, p=districts.probs)
+
+    base = 45000
+    premium = districts.premium[codes]
+    age_penalty = np.clip((2026 - year_built) * 70, 0, 12000)
+    fee_penalty = (monthly_fee - 2500) * 1.2
+    year_trend = (transaction_year - 2015) * 900
+    noise = rng.normal(0, 4000, size=n)
+
+    size_effect = np.clip((area - 60) * -18, -3500, 2500)
+    room_effect = np.clip((rooms - 2.5) * 650, -2500, 4500)
+    price_per_sqm = (
+        base + premium + year_trend + size_effect + room_effect - age_penalty - fee_penalty + noise
+    )
+    price_per_sqm = np.clip(price_per_sqm, 25000, 140000)
+
+    return pd.DataFrame(
+        {
+            "area": area,
+            "rooms": rooms,
+            "district": pd.Categorical.from_codes(codes, categories=districts.names),
+            "year_built": year_built,
+            "monthly_fee": monthly_fee,
+            "transaction_year": transaction_year,
+            "price_per_sqm": price_per_sqm,
+            "total_price": price_per_sqm * area,
+        }
+    )
+
+
+def _write_part(path: str, n: int, seed: int, chunk: int, districts: DistrictTable) -> int:
+    df = generate_chunk(n, seed=seed, chunk=chunk, districts=districts)
+    tmp = f"{path}.tmp"
+    if path.endswith(".parquet"):
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_csv(tmp, index=False, float_format="%.2f")
+    os.replace(tmp, path)
+    return len(df)
+
+
+def write_partitions(
+    out_dir: Path,
+    n_rows: int,
+    *,
+    chunk_rows: int = 1_000_000,
+    seed: int = 42,
+    districts: DistrictTable | None = None,
+    fmt: str = "csv",
+    workers: int = 1,
+) -> list[Path]:
+    # One part file per chunk, written by the worker that generated it, so no process
+    # holds more than one chunk in memory
+    if fmt not in ("csv", "parquet"):
+        raise ValueError(f"Unknown format: {fmt}")
+    districts = districts or district_table()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    sizes = [min(chunk_rows, n_rows - start) for start in range(0, n_rows, chunk_rows)]
+    paths = [out_dir / f"part_{i:06d}.{fmt}" for i in range(len(sizes))]
+    jobs = [
+        (str(p), n, seed, i, districts) for i, (p, n) in enumerate(zip(paths, sizes, strict=True))
+    ]
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            _write_part(*job)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            list(ex.map(_write_part, *zip(*jobs, strict=True)))
+    return paths
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+_CHUNK = 1024 * 1024
+
+
+@lru_cache(maxsize=1)
+def code_version() -> str:
+    # Any edit to the training package (or a library upgrade) invalidates cached stages
+    h = hashlib.sha256()
+    for path in sorted(Path(__file__).resolve().parent.glob("*.py")):
+        h.update(path.name.encode("utf-8"))
+        h.update(path.read_bytes())
+    for version in (sklearn.__version__, np.__version__, pd.__version__):
+        h.update(version.encode("utf-8"))
+    return h.hexdigest()
+
+
+_file_digests: dict[tuple[str, int, int], str] = {}
+
+
+def file_digest(path: str | Path) -> str:
+    p = Path(path).resolve()
+    st = p.stat()
+    memo_key = (str(p), st.st_size, st.st_mtime_ns)
+    if memo_key not in _file_digests:
+        h = hashlib.sha256()
+        with open(p, "rb") as f:
+            while chunk := f.read(_CHUNK):
+                h.update(chunk)
+        _file_digests[memo_key] = h.hexdigest()
+    return _file_digests[memo_key]
+
+
+def make_key(*parts) -> str:
+    blob = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class StageCache:
+    def __init__(self, root: str | Path, *, max_bytes: int = 2 * 1024**3):
+        self.root = Path(root)
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.joblib"
+
+    def get(self, key: str) -> tuple[bool, object]:
+        path = self._path(key)
+        try:
+            value = joblib.load(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return False, None
+        except Exception:
+            # Truncated or stale entry: treat as a miss and let put() overwrite it
+            self.misses += 1
+            return False, None
+        # Touch for LRU eviction
+        os.utime(path)
+        self.hits += 1
+        return True, value
+
+    def put(self, key: str, value: object) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".tmp{os.getpid()}")
+        joblib.dump(value, tmp)
+        os.replace(tmp, path)
+
+    def get_or_compute(self, key: str, fn, *args):
+        found, value = self.get(key)
+        if found:
+            return value
+        value = fn(*args)
+        self.put(key, value)
+        return value
+
+    def size_bytes(self) -> int:
+        return sum(p.stat().st_size for p in self.root.glob("*/*.joblib"))
+
+    def evict(self) -> int:
+        # Scans the whole cache directory, so callers run it once per training run
+        entries = []
+        for p in self.root.glob("*/*.joblib"):
+            st = p.stat()
+            entries.append((st.st_mtime, st.st_size, p))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, p in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def stats(self) -> dict:
+        return {
+            "dir": str(self.root),
+            "hits": self.hits,
+            "misses": self.misses,
+            "max_bytes": self.max_bytes,
+        }
+
+
+def cached(cache: StageCache | None, key: str, fn, *args):
+    if cache is None:
+        return fn(*args)
+    return cache.get_or_compute(key, fn, *args)
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+
+ALL_DISTRICTS = "*"
+
+
+@dataclass(frozen=True)
+class ComparablesIndex:
+    # One KD-tree per district over the standardized, preprocessed numeric features, plus
+    # the raw feature values and target of every indexed sale (float32) to return as
+    # comparables.
+    numeric_features: list[str]
+    target_col: str
+    center: np.ndarray
+    scale: np.ndarray
+    trees: dict[str, KDTree]
+    values: dict[str, np.ndarray]
+
+    @property
+    def n_rows(self) -> int:
+        return sum(v.shape[0] for v in self.values.values())
+
+    def query(self, numeric_t: np.ndarray, district: str | None, k: int) -> list[dict]:
+        # numeric_t: one row of the preprocessor's numeric output. Unknown districts are
+        # searched across all partitions and the overall k nearest are kept.
+        z = ((np.asarray(numeric_t, dtype=float) - self.center) / self.scale).reshape(1, -1)
+        if district in self.trees:
+            partitions = [district]
+        elif ALL_DISTRICTS in self.trees:
+            partitions = [ALL_DISTRICTS]
+        else:
+            partitions = list(self.trees)
+
+        hits: list[tuple[float, str, int]] = []
+        for name in partitions:
+            tree = self.trees[name]
+            kk = min(k, self.values[name].shape[0])
+            dist, idx = tree.query(z, k=kk)
+            hits.extend(zip(dist[0].tolist(), [name] * kk, idx[0].tolist(), strict=True))
+        hits.sort(key=lambda h: h[0])
+
+        out = []
+        for dist, name, i in hits[:k]:
+            row = self.values[name][i]
+            out.append(
+                {
+                    "district": None if name == ALL_DISTRICTS else name,
+                    "distance": float(dist),
+                    "features": {
+                        f: (None if np.isnan(v) else float(v))
+                        for f, v in zip(self.numeric_features, row[:-1].tolist(), strict=True)
+                    },
+                    "target": float(row[-1]),
+                }
+            )
+        return out
+
+
+def build_comparables_index(
+    numeric_t: np.ndarray,
+    raw_numeric: pd.DataFrame,
+    y: pd.Series,
+    *,
+    districts: pd.Series | None,
+    target_col: str,
+    leaf_size: int = 40,
+) -> ComparablesIndex:
+    numeric_t = np.asarray(numeric_t, dtype=float)
+    center = numeric_t.mean(axis=0)
+    scale = numeric_t.std(axis=0)
+    scale[~np.isfinite(scale) | (scale == 0)] = 1.0
+    z = (numeric_t - center) / scale
+    values = np.column_stack([raw_numeric.to_numpy(dtype=float), y.to_numpy(dtype=float)]).astype(
+        np.float32
+    )
+
+    if districts is None:
+        groups = {ALL_DISTRICTS: np.arange(len(z))}
+    else:
+        codes, names = pd.factorize(districts.fillna("Unknown").astype(str), sort=True)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+        groups = {str(name): order[bounds[i] : bounds[i + 1]] for i, name in enumerate(names)}
+
+    return ComparablesIndex(
+        numeric_features=list(raw_numeric.columns),
+        target_col=target_col,
+        center=center,
+        scale=scale,
+        trees={name: KDTree(z[idx], leaf_size=leaf_size) for name, idx in groups.items()},
+        values={name: values[idx] for name, idx in groups.items()},
+    )
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+from time import perf_counter
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from spi_train.config import CompressionConfig
+from spi_train.metrics import mae, rmse
+from spi_train.tree_arrays import FlatForest, build_flat_forest, to_dense, tree_arrays_from_sklearn
+
+THRESHOLD_DTYPES = {"float64": np.float64, "float32": np.float32}
+LEAF_DTYPES = {"float64": np.float64, "float32": np.float32, "float16": np.float16}
+
+
+def prune_tree(tree: dict, impurity: np.ndarray, min_gain: float) -> tuple[dict, int]:
+    # Collapses splits bottom-up while both children are leaves and the split's weighted
+    # impurity decrease, relative to the root's, is below min_gain. Returns the compacted
+    # tree and the number of removed nodes.
+    left, right = np.array(tree["left"]), np.array(tree["right"])
+    w = np.asarray(tree["cover"], dtype=float)
+    wi = w * impurity
+    internal = left >= 0
+    gain = np.where(internal, wi - wi[left] - wi[right], np.inf) / max(wi[0], 1e-300)
+    while True:
+        is_leaf = left < 0
+        children_are_leaves = (
+            is_leaf[np.where(internal, left, 0)] & is_leaf[np.where(internal, right, 0)]
+        )
+        collapse = internal & (gain < min_gain) & children_are_leaves
+        if not collapse.any():
+            break
+        left[collapse] = right[collapse] = -1
+        internal = left >= 0
+
+    # Renumber the nodes still reachable from the root, parents before children
+    order = [0]
+    frontier = np.zeros(1, dtype=np.int64)
+    while (inner := frontier[left[frontier] >= 0]).size:
+        frontier = np.concatenate([left[inner], right[inner]])
+        order.extend(frontier.tolist())
+    keep = np.sort(np.asarray(order))
+    new_index = np.full(left.shape[0], -1, dtype=np.int64)
+    new_index[keep] = np.arange(keep.size)
+    pruned = {key: np.asarray(tree[key])[keep] for key in tree}
+    pruned["left"] = np.where(left[keep] >= 0, new_index[left[keep]], -1)
+    pruned["right"] = np.where(right[keep] >= 0, new_index[right[keep]], -1)
+    return pruned, int(left.shape[0] - keep.size)
+
+
+def select_trees(per_tree: np.ndarray, max_loss: float) -> np.ndarray:
+    # Greedy forward selection: repeatedly add the tree that brings the subset mean closest
+    # to the full ensemble, until the RMSE between them is within max_loss times the spread
+    # of the ensemble's predictions
+    full = per_tree.mean(axis=0)
+    tolerance = max_loss * max(float(full.std()), 1e-12)
+    chosen: list[int] = []
+    remaining = np.ones(per_tree.shape[0], dtype=bool)
+    total = np.zeros_like(full)
+    while remaining.any():
+        k = len(chosen) + 1
+        err = ((total + per_tree) / k - full) ** 2
+        score = np.where(remaining, err.mean(axis=1), np.inf)
+        best = int(np.argmin(score))
+        chosen.append(best)
+        remaining[best] = False
+        total += per_tree[best]
+        if np.sqrt(score[best]) <= tolerance:
+            break
+    return np.sort(np.asarray(chosen))
+
+
+def _round_down_float32(threshold: np.ndarray) -> np.ndarray:
+    # The largest float32 <= threshold: float32 inputs compare against it exactly as they
+    # do against the float64 threshold, so routing is unchanged
+    t32 = threshold.astype(np.float32)
+    too_high = t32.astype(np.float64) > threshold
+    return np.where(too_high, np.nextafter(t32, np.float32(-np.inf)), t32)
+
+
+def compress_forest(
+    model: RandomForestRegressor, X_sample, cfg: CompressionConfig
+) -> tuple[FlatForest, dict]:
+    trees, pruned_nodes = [], 0
+    for est in model.estimators_:
+        tree = tree_arrays_from_sklearn(est)
+        if cfg.prune_min_gain > 0:
+            tree, removed = prune_tree(tree, est.tree_.impurity, cfg.prune_min_gain)
+            pruned_nodes += removed
+        trees.append(tree)
+
+    kept = np.arange(len(trees))
+    if cfg.max_fidelity_loss is not None:
+        per_tree = build_flat_forest(trees).predict_per_tree(X_sample)
+        kept = select_trees(per_tree, cfg.max_fidelity_loss)
+        trees = [trees[i] for i in kept]
+
+    if cfg.threshold_dtype not in THRESHOLD_DTYPES:
+        raise ValueError(f"Unknown threshold dtype: {cfg.threshold_dtype}")
+    if cfg.leaf_dtype not in LEAF_DTYPES:
+        raise ValueError(f"Unknown leaf dtype: {cfg.leaf_dtype}")
+    if cfg.threshold_dtype == "float32":
+        for tree in trees:
+            tree["threshold"] = _round_down_float32(np.asarray(tree["threshold"], dtype=float))
+
+    offset, scale = 0.0, 1.0
+    if cfg.leaf_dtype == "float16":
+        # float16 tops out at 65504 and keeps ~3 significant digits; store standardized
+        # values so prices fit and the rounding error scales with the spread, not the level
+        values = np.concatenate([t["value"] for t in trees])
+        offset = float(values.mean())
+        scale = max(float(values.std()), float(np.abs(values - offset).max()) / 60000.0, 1e-12)
+
+    n_nodes = sum(t["left"].shape[0] for t in trees)
+    forest = build_flat_forest(
+        trees,
+        threshold_dtype=THRESHOLD_DTYPES[cfg.threshold_dtype],
+        value_dtype=LEAF_DTYPES[cfg.leaf_dtype],
+        index_dtype=np.int32 if n_nodes < 2**31 else np.int64,
+        cover_dtype=np.float32,
+        leaf_offset=offset,
+        leaf_scale=scale,
+    )
+    info = {
+        "n_trees": {"original": len(model.estimators_), "compressed": len(trees)},
+        "kept_trees": kept.tolist(),
+        "pruned_nodes": pruned_nodes,
+        "nodes": n_nodes,
+        "threshold_dtype": cfg.threshold_dtype,
+        "leaf_dtype": cfg.leaf_dtype,
+    }
+    return forest, info
+
+
+def _latency_ms(model, X, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        model.predict(X)
+        timings.append((perf_counter() - start) * 1000.0)
+    return float(np.median(timings))
+
+
+def compare_models(
+    original, compressed, X_sample, y_sample, labels: tuple[str, str] = ("original", "compressed")
+) -> dict:
+    # Accuracy is measured in-sample on the evaluation rows; fidelity is the difference
+    # between the two models' predictions on them
+    X_sample = to_dense(X_sample)
+    y_sample = np.asarray(y_sample, dtype=float)
+    report = {}
+    preds = {}
+    for name, model in zip(labels, (original, compressed), strict=True):
+        preds[name] = np.asarray(model.predict(X_sample), dtype=float)
+        report[name] = {
+            "predict_ms_1_row": _latency_ms(model, X_sample[:1]),
+            "predict_ms_batch": _latency_ms(model, X_sample),
+            "mae": mae(y_sample, preds[name]),
+            "rmse": rmse(y_sample, preds[name]),
+        }
+    diff = preds[labels[1]] - preds[labels[0]]
+    report["fidelity"] = {
+        "max_abs_diff": float(np.abs(diff).max()) if diff.size else 0.0,
+        f"rmse_vs_{labels[0]}": float(np.sqrt(np.mean(diff**2))) if diff.size else 0.0,
+        "batch_rows": int(X_sample.shape[0]),
+    }
+    return report
@@ -12,6 +12,12 @@ class OutlierConfig:
     k: float
 
 
+@dataclass(frozen=True)
+class EncodingConfig:
+    method: str
+    max_categories: int | None
+
+
 @dataclass(frozen=True)
 class DataConfig:
     train_csv: str
@@ -19,12 +25,17 @@ class DataConfig:
     numeric_features: list[str]
     categorical_features: list[str]
     outliers: OutlierConfig
+    encoding: EncodingConfig
 
 
 @dataclass(frozen=True)
 class TrainConfig:
     random_state: int
     cv_folds: int
+    bootstrap_samples: int
+    interval_level: float | None
+    build_comparables: bool
+    collapse_duplicates: bool
 
 
 @dataclass(frozen=True)
@@ -32,6 +43,18 @@ class ArtifactsConfig:
     dir: str
     model_prefix: str
     preprocessor_prefix: str
+    interval_prefix: str
+    comparables_prefix: str
+
+
+@dataclass(frozen=True)
+class CompressionConfig:
+    enabled: bool
+    prune_min_gain: float
+    threshold_dtype: str
+    leaf_dtype: str
+    max_fidelity_loss: float | None
+    sample_rows: int
 
 
 @dataclass(frozen=True)
@@ -45,6 +68,29 @@ class ModelSpec:
     params: dict
 
 
+@dataclass(frozen=True)
+class DistillationConfig:
+    enabled: bool
+    n_synthetic: int
+    swap_prob: float
+    jitter: float
+    student: ModelSpec
+
+
+@dataclass(frozen=True)
+class SearchConfig:
+    n_candidates: int
+    eta: int
+    n_rungs: int
+    min_rows: int
+    early_stop_folds: int
+    early_stop_margin: float
+    metric: str
+    n_jobs: int
+    # Per model type: param name -> list of choices or {"low", "high", "log", "int"}
+    distributions: dict[str, dict]
+
+
 @dataclass(frozen=True)
 class Params:
     data: DataConfig
@@ -52,6 +98,9 @@ class Params:
     models: dict[str, ModelSpec]
     artifacts: ArtifactsConfig
     reports: ReportsConfig
+    compression: CompressionConfig
+    distillation: DistillationConfig
+    search: SearchConfig
 
 
 def load_params(params_path: str | Path) -> Params:
@@ -59,6 +108,9 @@ def load_params(params_path: str | Path) -> Params:
     raw = json.loads(p.read_text(encoding="utf-8"))
 
     out = raw.get("data", {}).get("outliers", {})
+    enc = raw.get("data", {}).get("encoding", {})
+    max_categories = enc.get("max_categories")
+    interval_level = raw.get("train", {}).get("interval_level")
     data_cfg = DataConfig(
         train_csv=raw["data"]["train_csv"],
         target_col=raw["data"]["target_col"],
@@ -69,11 +121,19 @@ def load_params(params_path: str | Path) -> Params:
             method=str(out.get("method", "iqr_clip")),
             k=float(out.get("k", 1.5)),
         ),
+        encoding=EncodingConfig(
+            method=str(enc.get("method", "onehot")),
+            max_categories=int(max_categories) if max_categories is not None else None,
+        ),
     )
 
     train_cfg = TrainConfig(
         random_state=int(raw.get("train", {}).get("random_state", 42)),
         cv_folds=int(raw.get("train", {}).get("cv_folds", 5)),
+        bootstrap_samples=int(raw.get("train", {}).get("bootstrap_samples", 0)),
+        interval_level=float(interval_level) if interval_level is not None else None,
+        build_comparables=bool(raw.get("train", {}).get("build_comparables", False)),
+        collapse_duplicates=bool(raw.get("train", {}).get("collapse_duplicates", False)),
     )
 
     artifacts_cfg = ArtifactsConfig(
@@ -82,11 +142,24 @@ def load_params(params_path: str | Path) -> Params:
         preprocessor_prefix=str(
             raw.get("artifacts", {}).get("preprocessor_prefix", "preprocessor_")
         ),
+        interval_prefix=str(raw.get("artifacts", {}).get("interval_prefix", "interval_")),
+        comparables_prefix=str(raw.get("artifacts", {}).get("comparables_prefix", "comparables_")),
     )
     reports_cfg = ReportsConfig(
         dir=str(raw.get("reports", {}).get("dir", "backend/reports/metrics"))
     )
 
+    comp = raw.get("compression", {})
+    max_fidelity_loss = comp.get("max_fidelity_loss")
+    compression_cfg = CompressionConfig(
+        enabled=bool(comp.get("enabled", False)),
+        prune_min_gain=float(comp.get("prune_min_gain", 0.0)),
+        threshold_dtype=str(comp.get("threshold_dtype", "float32")),
+        leaf_dtype=str(comp.get("leaf_dtype", "float32")),
+        max_fidelity_loss=float(max_fidelity_loss) if max_fidelity_loss is not None else None,
+        sample_rows=int(comp.get("sample_rows", 5000)),
+    )
+
     models: dict[str, ModelSpec] = {}
     for name, spec in raw.get("models", {}).items():
         models[name] = ModelSpec(
@@ -94,10 +167,39 @@ def load_params(params_path: str | Path) -> Params:
             params={k: v for k, v in spec.items() if k != "type"},
         )
 
+    dist = raw.get("distillation", {})
+    student = dist.get("student", {"type": "hist_gradient_boosting", "max_depth": 4})
+    distillation_cfg = DistillationConfig(
+        enabled=bool(dist.get("enabled", False)),
+        n_synthetic=int(dist.get("n_synthetic", 100000)),
+        swap_prob=float(dist.get("swap_prob", 0.3)),
+        jitter=float(dist.get("jitter", 0.05)),
+        student=ModelSpec(
+            type=str(student.get("type")),
+            params={k: v for k, v in student.items() if k != "type"},
+        ),
+    )
+
+    search = raw.get("search", {})
+    search_cfg = SearchConfig(
+        n_candidates=int(search.get("n_candidates", 27)),
+        eta=int(search.get("eta", 3)),
+        n_rungs=int(search.get("n_rungs", 3)),
+        min_rows=int(search.get("min_rows", 500)),
+        early_stop_folds=int(search.get("early_stop_folds", 1)),
+        early_stop_margin=float(search.get("early_stop_margin", 0.1)),
+        metric=str(search.get("metric", "rmse")),
+        n_jobs=int(search.get("n_jobs", -1)),
+        distributions=dict(search.get("distributions", {})),
+    )
+
     return Params(
         data=data_cfg,
         train=train_cfg,
         models=models,
         artifacts=artifacts_cfg,
         reports=reports_cfg,
+        compression=compression_cfg,
+        distillation=distillation_cfg,
+        search=search_cfg,
     )
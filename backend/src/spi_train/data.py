@@ -1,19 +1,29 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 from spi_train.config import DataConfig
 
 
-def load_training_frame(data_cfg: DataConfig, repo_root: Path) -> pd.DataFrame:
-    csv_path = (repo_root / data_cfg.train_csv).resolve()
+def training_csv_path(data_cfg: DataConfig, repo_root: Path) -> Path:
+    return (repo_root / data_cfg.train_csv).resolve()
+
+
+def require_training_csv(data_cfg: DataConfig, repo_root: Path) -> Path:
+    csv_path = training_csv_path(data_cfg, repo_root)
     if not csv_path.exists():
         raise FileNotFoundError(
             f"Training CSV not found at '{csv_path}'. Put a processed CSV there, or update params.json."  # noqa: E501
         )
-    return pd.read_csv(csv_path)
+    return csv_path
+
+
+def load_training_frame(data_cfg: DataConfig, repo_root: Path) -> pd.DataFrame:
+    return pd.read_csv(require_training_csv(data_cfg, repo_root))
 
 
 def split_xy(df: pd.DataFrame, *, feature_cols: list[str], target_col: str):
@@ -23,3 +33,30 @@ def split_xy(df: pd.DataFrame, *, feature_cols: list[str], target_col: str):
     X = df[feature_cols].copy()
     y = df[target_col].astype(float)
     return X, y
+
+
+@dataclass(frozen=True)
+class CollapsedRows:
+    # Unique rows with their multiplicity as sample weight; group maps every original row
+    # to its unique row, so per-row predictions are unique_pred[group]
+    X: pd.DataFrame
+    y: pd.Series
+    weight: np.ndarray
+    group: np.ndarray
+
+
+def collapse_duplicates(X: pd.DataFrame, y: pd.Series, *, by_target: bool) -> CollapsedRows:
+    # by_target=False merges rows with identical features and averages their targets, which
+    # leaves a squared-error fit unchanged; by_target=True only merges exact duplicates,
+    # which is valid for any loss
+    keys = X.assign(__target=y.to_numpy()) if by_target else X
+    group = keys.groupby(list(keys.columns), dropna=False, sort=False).ngroup().to_numpy()
+    _, first = np.unique(group, return_index=True)
+    weight = np.bincount(group).astype(float)
+    target = np.bincount(group, weights=y.to_numpy(dtype=float)) / weight
+    return CollapsedRows(
+        X=X.iloc[first].reset_index(drop=True),
+        y=pd.Series(target, name=y.name),
+        weight=weight,
+        group=group,
+    )
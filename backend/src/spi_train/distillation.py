@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from spi_train.config import DistillationConfig
+from spi_train.models import build_model
+from spi_train.tree_arrays import to_dense
+
+
+def synthetic_frame(
+    X: pd.DataFrame,
+    n: int,
+    *,
+    numeric_features: list[str],
+    swap_prob: float,
+    jitter: float,
+    random_state: int,
+    weights: np.ndarray | None = None,
+) -> pd.DataFrame:
+    # Rows drawn around the training distribution: bootstrap real rows, replace each value
+    # with probability swap_prob by the same column of another random row (keeps every
+    # marginal, loosens the joint), and jitter numeric values by jitter * the column's std,
+    # clipped to its observed range. Missing values stay missing. Rows are drawn in
+    # proportion to weights, if given.
+    rng = np.random.default_rng(random_state)
+    p = weights / weights.sum() if weights is not None else None
+    base = rng.choice(len(X), size=n, p=p)
+    out = {}
+    for col in X.columns:
+        values = X[col].to_numpy()
+        swap = rng.random(n) < swap_prob
+        v = values[np.where(swap, rng.choice(len(X), size=n, p=p), base)]
+        if col in numeric_features:
+            v = v.astype(float)
+            observed = values.astype(float)
+            observed = observed[np.isfinite(observed)]
+            if observed.size and jitter > 0:
+                noise = rng.normal(0.0, jitter * observed.std(), size=n)
+                v = np.clip(v + noise, observed.min(), observed.max())
+        out[col] = v
+    return pd.DataFrame(out, columns=X.columns)
+
+
+def fit_student(
+    teacher,
+    pre,
+    X: pd.DataFrame,
+    X_t,
+    cfg: DistillationConfig,
+    *,
+    numeric_features: list[str],
+    random_state: int,
+    categorical_features: list[int] | None = None,
+    sample_weight: np.ndarray | None = None,
+):
+    # The student learns the teacher's predictions, not the targets, on the real rows plus
+    # n_synthetic rows sampled from them, so it sees the teacher's function everywhere the
+    # data is dense instead of only at the training points
+    synthetic = synthetic_frame(
+        X,
+        cfg.n_synthetic,
+        numeric_features=numeric_features,
+        swap_prob=cfg.swap_prob,
+        jitter=cfg.jitter,
+        random_state=random_state,
+        weights=sample_weight,
+    )
+    # Dense, since a sparse one-hot output would rule out HistGradientBoosting students
+    X_student = np.vstack([to_dense(X_t), to_dense(pre.transform(synthetic))])
+    y_student = np.asarray(teacher.predict(X_student), dtype=float)
+    student = build_model(
+        cfg.student, random_state=random_state, categorical_features=categorical_features
+    )
+    weight = None
+    if sample_weight is not None:
+        weight = np.concatenate([sample_weight, np.ones(cfg.n_synthetic)])
+    student.fit(X_student, y_student, sample_weight=weight)
+    return student
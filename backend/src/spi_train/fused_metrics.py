@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import numpy as np
+
+# Metrics here take stacked predictions: y_pred has shape (n_models, n_rows) and shares one
+# y_true vector. Residuals are formed once and every metric is a reduction over them.
+
+
+def _as_inputs(y_true, y_pred) -> tuple[np.ndarray, np.ndarray]:
+    yt = np.asarray(y_true, dtype=float).reshape(-1)
+    yp = np.asarray(y_pred, dtype=float)
+    if yp.ndim == 1:
+        yp = yp[None, :]
+    if yp.shape[-1] != yt.shape[0]:
+        raise ValueError(f"y_pred has {yp.shape[-1]} rows per model, y_true has {yt.shape[0]}")
+    return yt, yp
+
+
+def _segment_sums(values: np.ndarray, segments: np.ndarray, n_segments: int) -> np.ndarray:
+    # (n_models, n_rows) -> (n_models, n_segments) with a single bincount
+    m = values.shape[0]
+    idx = (np.arange(m)[:, None] * n_segments + segments[None, :]).ravel()
+    sums = np.bincount(idx, weights=values.ravel(), minlength=m * n_segments)
+    return sums.reshape(m, n_segments)
+
+
+def _ss_tol(count, mean) -> np.ndarray:
+    # Rounding left in a centred sum of squares when every value equals the mean: a few
+    # ulps of the mean per row
+    return count * (4 * np.finfo(float).eps * np.abs(mean)) ** 2
+
+
+def _r2_from_sums(ss_res: np.ndarray, ss_tot: np.ndarray, tol=0.0) -> np.ndarray:
+    # Same convention as spi_train.metrics.r2: a constant target scores 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = 1.0 - ss_res / ss_tot
+    return np.where(ss_tot <= tol, 0.0, out)
+
+
+def fused_regression_metrics(
+    y_true,
+    y_pred,
+    *,
+    segments=None,
+    quantiles: tuple[float, ...] = (0.5, 0.9, 0.95),
+) -> dict[str, np.ndarray]:
+    yt, yp = _as_inputs(y_true, y_pred)
+    if segments is None:
+        seg = np.zeros(yt.shape[0], dtype=np.intp)
+        n_seg = 1
+    else:
+        seg = np.asarray(segments, dtype=np.intp).reshape(-1)
+        n_seg = int(seg.max()) + 1 if seg.size else 0
+
+    residual = yp - yt
+    abs_r = np.abs(residual)
+    sq_r = residual * residual
+    nonzero = yt != 0
+    ape = np.where(nonzero, abs_r / np.where(nonzero, np.abs(yt), 1.0), 0.0)
+
+    count = np.bincount(seg, minlength=n_seg).astype(float)
+    count_nonzero = np.bincount(seg, weights=nonzero.astype(float), minlength=n_seg)
+    sum_y = np.bincount(seg, weights=yt, minlength=n_seg)
+    mean_y = np.divide(sum_y, count, out=np.zeros_like(sum_y), where=count > 0)
+    # Second pass over centred values: sum(y^2) - sum(y)^2/n cancels badly for targets
+    # with a large mean and little spread
+    centred = yt - mean_y[seg]
+    # One correction step removes the rounding accumulated in sum_y
+    mean_y += np.divide(
+        np.bincount(seg, weights=centred, minlength=n_seg),
+        count,
+        out=np.zeros_like(sum_y),
+        where=count > 0,
+    )
+    centred = yt - mean_y[seg]
+    ss_tot = np.bincount(seg, weights=centred * centred, minlength=n_seg)
+
+    sum_abs = _segment_sums(abs_r, seg, n_seg)
+    sum_sq = _segment_sums(sq_r, seg, n_seg)
+    sum_ape = _segment_sums(ape, seg, n_seg)
+    sum_res = _segment_sums(residual, seg, n_seg)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = {
+            "count": count,
+            "mae": sum_abs / count,
+            "rmse": np.sqrt(sum_sq / count),
+            "r2": _r2_from_sums(sum_sq, ss_tot, _ss_tol(count, mean_y)),
+            "mape": sum_ape / count_nonzero,
+            "bias": sum_res / count,
+        }
+    if quantiles:
+        # (n_models, n_quantiles) over all rows
+        out["abs_error_quantiles"] = np.quantile(abs_r, quantiles, axis=1).T
+    return out
+
+
+def group_breakdown(y_true, y_pred, groups) -> dict[str, dict[str, list[float]]]:
+    codes, inverse = np.unique(np.asarray(groups).astype(str), return_inverse=True)
+    m = fused_regression_metrics(y_true, y_pred, segments=inverse, quantiles=())
+    return {
+        str(code): {
+            "count": int(m["count"][i]),
+            "mae": m["mae"][:, i].tolist(),
+            "rmse": m["rmse"][:, i].tolist(),
+            "bias": m["bias"][:, i].tolist(),
+        }
+        for i, code in enumerate(codes)
+    }
+
+
+def bootstrap_ci(
+    y_true,
+    y_pred,
+    *,
+    n_boot: int = 1000,
+    level: float = 0.95,
+    random_state: int = 0,
+    batch_size: int = 100,
+) -> dict[str, np.ndarray]:
+    yt, yp = _as_inputs(y_true, y_pred)
+    n = yt.shape[0]
+    residual = yp - yt
+    stacked = np.vstack([np.abs(residual), residual * residual]).T  # (n, 2 * n_models)
+    # Moments of the target shifted by its mean, so ss_tot does not cancel catastrophically
+    y_mean = float(yt.mean()) if n else 0.0
+    y_shifted = yt - y_mean
+    y_moments = np.column_stack([y_shifted, y_shifted * y_shifted])  # (n, 2)
+    tol = _ss_tol(n, y_mean)
+    m = yp.shape[0]
+
+    rng = np.random.default_rng(random_state)
+    maes, rmses, r2s = [], [], []
+    for start in range(0, n_boot, batch_size):
+        b = min(batch_size, n_boot - start)
+        # Resample counts per row; each replicate is then a weighted sum (one matmul per batch)
+        idx = rng.integers(0, n, size=(b, n)) + (np.arange(b) * n)[:, None]
+        weights = np.bincount(idx.ravel(), minlength=b * n).reshape(b, n).astype(float)
+        sums = weights @ stacked  # (b, 2 * n_models)
+        moments = weights @ y_moments  # (b, 2)
+        ss_res = sums[:, m:]
+        ss_tot = moments[:, 1:2] - moments[:, 0:1] ** 2 / n
+        maes.append(sums[:, :m] / n)
+        rmses.append(np.sqrt(ss_res / n))
+        r2s.append(_r2_from_sums(ss_res, ss_tot, tol))
+
+    alpha = (1.0 - level) / 2.0
+    q = [alpha, 1.0 - alpha]
+    # (n_models, 2) lower/upper bounds
+    return {
+        "mae": np.quantile(np.vstack(maes), q, axis=0).T,
+        "rmse": np.quantile(np.vstack(rmses), q, axis=0).T,
+        "r2": np.quantile(np.vstack(r2s), q, axis=0).T,
+    }
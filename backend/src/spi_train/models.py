@@ -6,7 +6,9 @@ from sklearn.linear_model import LinearRegression
 from spi_train.config import ModelSpec
 
 
-def build_model(spec: ModelSpec, *, random_state: int):
+def build_model(
+    spec: ModelSpec, *, random_state: int, categorical_features: list[int] | None = None
+):
     t = spec.type
     p = dict(spec.params)
 
@@ -16,6 +18,46 @@ def build_model(spec: ModelSpec, *, random_state: int):
         return RandomForestRegressor(random_state=random_state, **p)
     if t == "hist_gradient_boosting":
         # HistGradientBoostingRegressor uses random_state
+        if categorical_features is not None:
+            p.setdefault("categorical_features", categorical_features)
         return HistGradientBoostingRegressor(random_state=random_state, **p)
 
     raise ValueError(f"Unknown model type: {t}")
+
+
+def fits_mean_target(spec: ModelSpec) -> bool:
+    # Squared-error losses: duplicate feature rows can be replaced by their mean target,
+    # weighted by count, without changing what the model minimizes
+    if spec.type == "linear":
+        return True
+    if spec.type == "random_forest":
+        return spec.params.get("criterion", "squared_error") in ("squared_error", "friedman_mse")
+    if spec.type == "hist_gradient_boosting":
+        return spec.params.get("loss", "squared_error") == "squared_error"
+    return False
+
+
+def needs_dense_input(spec: ModelSpec) -> bool:
+    # HistGradientBoosting rejects sparse matrices, e.g. one-hot output over many districts
+    return spec.type == "hist_gradient_boosting"
+
+
+def build_quantile_pair(
+    spec: ModelSpec,
+    *,
+    level: float,
+    random_state: int,
+    categorical_features: list[int] | None = None,
+):
+    # Lower/upper quantile-loss models sharing the point model's hyperparameters
+    if spec.type != "hist_gradient_boosting":
+        raise ValueError(f"Quantile intervals need hist_gradient_boosting, got {spec.type}")
+    alpha = (1.0 - level) / 2.0
+    pair = []
+    for q in (alpha, 1.0 - alpha):
+        p = dict(spec.params)
+        p.update(loss="quantile", quantile=q)
+        if categorical_features is not None:
+            p.setdefault("categorical_features", categorical_features)
+        pair.append(HistGradientBoostingRegressor(random_state=random_state, **p))
+    return pair[0], pair[1]
@@ -1,21 +1,74 @@
 from __future__ import annotations
 
+import warnings
+
 import numpy as np
 import pandas as pd
+import sklearn
+from sklearn.base import BaseEstimator, OneToOneFeatureMixin, TransformerMixin
 from sklearn.compose import ColumnTransformer
 from sklearn.impute import SimpleImputer
+from sklearn.model_selection import KFold
 from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import OneHotEncoder
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, TargetEncoder
+from sklearn.utils.fixes import parse_version
+
+# encoding method -> pipeline step name
+ENCODING_METHODS = {"onehot": "ohe", "ordinal": "ordinal", "target": "target"}
+
+# HistGradientBoosting requires native categorical codes below max_bins (255 by default)
+_ORDINAL_MAX_CATEGORIES = 255
+
+
+def _target_encoder(random_state: int | None) -> TargetEncoder:
+    # Seeded so the internal cross-fitting folds are the same on every run. scikit-learn
+    # 1.9 deprecates random_state in favour of passing the shuffled splitter as `cv`.
+    if parse_version(sklearn.__version__) >= parse_version("1.9"):
+        return TargetEncoder(
+            target_type="continuous", cv=KFold(5, shuffle=True, random_state=random_state)
+        )
+    return TargetEncoder(target_type="continuous", random_state=random_state)
+
+
+def _build_encoder(method: str, max_categories: int | None, random_state: int | None = None):
+    if method == "onehot":
+        return OneHotEncoder(handle_unknown="ignore", max_categories=max_categories)
+    if method == "ordinal":
+        # Negative codes are treated as missing by HistGradientBoosting's native categorical
+        # support, so unknown districts fall back to the missing-value branch.
+        return OrdinalEncoder(
+            handle_unknown="use_encoded_value",
+            unknown_value=-1,
+            encoded_missing_value=-1,
+            max_categories=max_categories or _ORDINAL_MAX_CATEGORIES,
+        )
+    if method == "target":
+        return _target_encoder(random_state)
+    raise ValueError(f"Unknown categorical encoding: {method}. Available: {list(ENCODING_METHODS)}")
 
 
 def build_preprocessor(
-    *, numeric_features: list[str], categorical_features: list[str]
+    *,
+    numeric_features: list[str],
+    categorical_features: list[str],
+    encoding: str = "onehot",
+    max_categories: int | None = None,
+    clip_k: float | None = None,
+    dense: bool = False,
+    random_state: int | None = None,
 ) -> ColumnTransformer:
-    num_pipe = Pipeline(steps=[("imputer", SimpleImputer(strategy="median"))])
+    num_steps = [("imputer", SimpleImputer(strategy="median"))]
+    if clip_k is not None:
+        # Bounds are fitted per training split and travel with the saved preprocessor
+        num_steps.insert(0, ("clip", IQRClipper(k=clip_k)))
+    num_pipe = Pipeline(steps=num_steps)
     cat_pipe = Pipeline(
         steps=[
             ("imputer", SimpleImputer(strategy="constant", fill_value="Unknown")),
-            ("ohe", OneHotEncoder(handle_unknown="ignore")),
+            (
+                ENCODING_METHODS.get(encoding, encoding),
+                _build_encoder(encoding, max_categories, random_state),
+            ),
         ]
     )
     return ColumnTransformer(
@@ -24,24 +77,87 @@ def build_preprocessor(
             ("cat", cat_pipe, categorical_features),
         ],
         remainder="drop",
+        # dense=True always returns an array, for models that cannot take sparse input
+        sparse_threshold=0.0 if dense else 0.3,
         verbose_feature_names_out=False,
     )
 
 
+def native_categorical_indices(
+    *, numeric_features: list[str], categorical_features: list[str], encoding: str
+) -> list[int] | None:
+    # ColumnTransformer emits the numeric block first, then one column per categorical
+    # feature for ordinal encoding.
+    if encoding != "ordinal" or not categorical_features:
+        return None
+    start = len(numeric_features)
+    return list(range(start, start + len(categorical_features)))
+
+
+def iqr_bounds(values: np.ndarray, *, k: float = 1.5) -> tuple[np.ndarray, np.ndarray]:
+    # All columns' quartiles in one call; columns with no spread are left unbounded
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+        q1, q3 = np.nanpercentile(values, [25, 75], axis=0)
+    iqr = q3 - q1
+    valid = np.isfinite(iqr) & (iqr != 0)
+    lower = np.where(valid, q1 - k * iqr, -np.inf)
+    upper = np.where(valid, q3 + k * iqr, np.inf)
+    return lower, upper
+
+
+class IQRClipper(OneToOneFeatureMixin, TransformerMixin, BaseEstimator):
+    def __init__(self, k: float = 1.5, subsample: int | None = 200_000, random_state: int = 0):
+        self.k = k
+        self.subsample = subsample
+        self.random_state = random_state
+
+    def fit(self, X, y=None):
+        if hasattr(X, "columns"):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        values = np.asarray(X, dtype=float)
+        self.n_features_in_ = values.shape[1]
+        if self.subsample is not None and values.shape[0] > self.subsample:
+            # Approximate quartiles from a uniform row sample keep fit cost flat on large data
+            rng = np.random.default_rng(self.random_state)
+            values = values[rng.choice(values.shape[0], size=self.subsample, replace=False)]
+        self.lower_, self.upper_ = iqr_bounds(values, k=self.k)
+        return self
+
+    def transform(self, X):
+        return np.clip(np.asarray(X, dtype=float), self.lower_, self.upper_)
+
+
 def iqr_clip_frame(df: pd.DataFrame, numeric_cols: list[str], *, k: float = 1.5) -> pd.DataFrame:
-    if not numeric_cols:
+    cols = [c for c in numeric_cols if c in df.columns]
+    if not cols:
         return df
-    clipped = df.copy()
-    for col in numeric_cols:
-        if col not in clipped.columns:
-            continue
-        s = pd.to_numeric(clipped[col], errors="coerce")
-        q1 = np.nanpercentile(s, 25)
-        q3 = np.nanpercentile(s, 75)
-        iqr = q3 - q1
-        if not np.isfinite(iqr) or iqr == 0:
-            continue
-        lo = q1 - k * iqr
-        hi = q3 + k * iqr
-        clipped[col] = s.clip(lower=lo, upper=hi)
+    values = df[cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    lower, upper = iqr_bounds(values, k=k)
+    clipped_values = np.clip(values, lower, upper)
+    # Shallow copy: only the clipped columns are replaced, the rest share memory with df
+    clipped = df.copy(deep=False)
+    for i, col in enumerate(cols):
+        if np.isfinite(lower[i]):
+            clipped[col] = clipped_values[:, i]
     return clipped
+
+
+def output_feature_groups(pre: ColumnTransformer) -> tuple[np.ndarray, list[str]]:
+    # Maps every preprocessor output column to the input feature it came from, so the
+    # one-hot columns of `district` all map back to "district"
+    names: list[str] = []
+    groups = np.zeros(sum(s.stop - s.start for s in pre.output_indices_.values()), dtype=int)
+    for name, trans, cols in pre.transformers_:
+        out = pre.output_indices_[name]
+        if out.stop == out.start:
+            continue
+        cols = list(cols)
+        for i, out_name in enumerate(trans.get_feature_names_out(cols)):
+            source = max(
+                (c for c in cols if out_name == c or out_name.startswith(f"{c}_")), key=len
+            )
+            if source not in names:
+                names.append(source)
+            groups[out.start + i] = names.index(source)
+    return groups, names
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import sys
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from time import perf_counter, process_time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+@dataclass(frozen=True)
+class StageTiming:
+    stage: str
+    fold: int | None
+    wall_s: float
+    cpu_s: float
+    peak_tracemalloc_mb: float | None
+    max_rss_mb: float | None
+
+
+def max_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return float(rss / divisor)
+
+
+class StageProfiler:
+    def __init__(self, *, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.stages: list[StageTiming] = []
+        self._started_tracing = False
+
+    def __enter__(self) -> StageProfiler:
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name: str, *, fold: int | None = None):
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        cpu_start = process_time()
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            wall_s = perf_counter() - start
+            cpu_s = process_time() - cpu_start
+            peak_mb = None
+            if tracing:
+                peak_mb = float(tracemalloc.get_traced_memory()[1] / (1024 * 1024))
+            self.stages.append(
+                StageTiming(
+                    stage=name,
+                    fold=fold,
+                    wall_s=float(wall_s),
+                    cpu_s=float(cpu_s),
+                    peak_tracemalloc_mb=peak_mb,
+                    max_rss_mb=max_rss_mb(),
+                )
+            )
+
+    def totals(self) -> dict[str, dict]:
+        out: dict[str, dict] = {}
+        for s in self.stages:
+            t = out.setdefault(
+                s.stage, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_tracemalloc_mb": None}
+            )
+            t["calls"] += 1
+            t["wall_s"] += s.wall_s
+            t["cpu_s"] += s.cpu_s
+            if s.peak_tracemalloc_mb is not None:
+                t["peak_tracemalloc_mb"] = max(
+                    t["peak_tracemalloc_mb"] or 0.0, s.peak_tracemalloc_mb
+                )
+        return out
+
+    def to_dict(self) -> dict:
+        peaks = [s.peak_tracemalloc_mb for s in self.stages if s.peak_tracemalloc_mb is not None]
+        return {
+            "trace_memory": self.trace_memory,
+            "peak_tracemalloc_mb": max(peaks) if peaks else None,
+            "max_rss_mb": max_rss_mb(),
+            "totals": self.totals(),
+            "stages": [asdict(s) for s in self.stages],
+        }
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import json
+import math
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.model_selection import KFold
+
+from spi_train.config import ModelSpec, Params, SearchConfig
+from spi_train.data import load_training_frame, split_xy
+from spi_train.metrics import mae, rmse
+from spi_train.models import build_model
+from spi_train.preprocessing import iqr_clip_frame
+from spi_train.training import fit_preprocessor, native_categorical, utc_now
+from spi_train.tree_arrays import to_dense
+
+# The budget that grows with each rung besides the sample size
+RESOURCE_PARAM = {"random_forest": "n_estimators", "hist_gradient_boosting": "max_iter"}
+# sklearn's defaults, used when the base spec does not set the resource
+DEFAULT_RESOURCE = {"random_forest": 100, "hist_gradient_boosting": 100}
+
+DEFAULT_DISTRIBUTIONS = {
+    "random_forest": {
+        "max_depth": {"low": 4, "high": 24, "int": True},
+        "min_samples_split": {"low": 2, "high": 20, "int": True},
+        "min_samples_leaf": {"low": 1, "high": 10, "int": True},
+        "max_features": [1.0, 0.7, 0.5, "sqrt"],
+    },
+    "hist_gradient_boosting": {
+        "learning_rate": {"low": 0.01, "high": 0.3, "log": True},
+        "max_depth": [None, 4, 6, 8, 12],
+        "max_leaf_nodes": {"low": 15, "high": 127, "int": True},
+        "min_samples_leaf": {"low": 5, "high": 100, "int": True, "log": True},
+        "l2_regularization": {"low": 1e-4, "high": 10.0, "log": True},
+    },
+}
+
+METRICS = {"rmse": rmse, "mae": mae}
+
+
+def sample_params(distributions: dict, rng: np.random.Generator) -> dict:
+    out = {}
+    for name, dist in distributions.items():
+        if isinstance(dist, list):
+            out[name] = dist[int(rng.integers(len(dist)))]
+            continue
+        low, high = float(dist["low"]), float(dist["high"])
+        if dist.get("log"):
+            value = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+        else:
+            value = float(rng.uniform(low, high))
+        out[name] = int(round(value)) if dist.get("int") else value
+    return out
+
+
+def rung_schedule(n_rows: int, max_trees: int, cfg: SearchConfig) -> list[tuple[int, int]]:
+    # (rows, trees) per rung: both shrink by eta per rung below the last, which uses the
+    # full frame and the base spec's number of trees
+    schedule = []
+    for rung in range(cfg.n_rungs):
+        scale = float(cfg.eta) ** (rung - cfg.n_rungs + 1)
+        rows = min(n_rows, max(cfg.min_rows, int(n_rows * scale)))
+        schedule.append((rows, max(1, int(round(max_trees * scale)))))
+    return schedule
+
+
+def _fold_data(params: Params, X, y, rows: np.ndarray) -> list[tuple]:
+    # Preprocessed once per rung and shared by every candidate; dense, as
+    # HistGradientBoosting rejects a sparse one-hot output
+    Xs, ys = X.iloc[rows], y.iloc[rows]
+    cv = KFold(n_splits=params.train.cv_folds, shuffle=True, random_state=params.train.random_state)
+    folds = []
+    for train_idx, test_idx in cv.split(Xs):
+        _, X_train_t, X_test_t = fit_preprocessor(
+            params, Xs.iloc[train_idx], ys.iloc[train_idx], Xs.iloc[test_idx]
+        )
+        folds.append(
+            (
+                to_dense(X_train_t),
+                ys.iloc[train_idx].to_numpy(),
+                to_dense(X_test_t),
+                ys.iloc[test_idx].to_numpy(),
+            )
+        )
+    return folds
+
+
+def _score_folds(
+    spec: ModelSpec,
+    folds: list[tuple],
+    *,
+    metric: str,
+    random_state: int,
+    categorical_features: list[int] | None,
+) -> tuple[list[float], float]:
+    start = perf_counter()
+    scores = []
+    for X_train_t, y_train, X_test_t, y_test in folds:
+        model = build_model(
+            spec, random_state=random_state, categorical_features=categorical_features
+        )
+        model.fit(X_train_t, y_train)
+        scores.append(METRICS[metric](y_test, model.predict(X_test_t)))
+    return scores, perf_counter() - start
+
+
+def successive_halving(params: Params, model_name: str, X, y) -> dict:
+    # Every rung scores the surviving candidates on a larger nested sample with more trees
+    # and promotes the best 1/eta. Within a rung, candidates are first scored on their
+    # first early_stop_folds folds only; those already worse than the last promotable
+    # score by more than early_stop_margin are stopped before the remaining folds.
+    cfg = params.search
+    spec = params.models[model_name]
+    if spec.type not in RESOURCE_PARAM:
+        raise ValueError(f"Search supports {sorted(RESOURCE_PARAM)}, not {spec.type}")
+    if cfg.metric not in METRICS:
+        raise ValueError(f"Unknown search metric: {cfg.metric}")
+    resource = RESOURCE_PARAM[spec.type]
+    distributions = cfg.distributions.get(spec.type, DEFAULT_DISTRIBUTIONS[spec.type])
+    max_trees = int(spec.params.get(resource, DEFAULT_RESOURCE[spec.type]))
+    random_state = params.train.random_state
+    categorical_features = native_categorical(params)
+
+    rng = np.random.default_rng(random_state)
+    candidates = [
+        {**spec.params, **sample_params(distributions, rng)} for _ in range(cfg.n_candidates)
+    ]
+    order = rng.permutation(len(y))
+    schedule = rung_schedule(len(y), max_trees, cfg)
+    n_first = min(max(cfg.early_stop_folds, 1), params.train.cv_folds)
+
+    alive = list(range(len(candidates)))
+    trace: list[dict] = []
+    rungs: list[dict] = []
+    with Parallel(n_jobs=cfg.n_jobs) as parallel:
+
+        def run(ids: list[int], folds: list[tuple], n_trees: int) -> dict[int, tuple]:
+            results = parallel(
+                delayed(_score_folds)(
+                    ModelSpec(type=spec.type, params={**candidates[c], resource: n_trees}),
+                    folds,
+                    metric=cfg.metric,
+                    random_state=random_state,
+                    categorical_features=categorical_features,
+                )
+                for c in ids
+            )
+            return dict(zip(ids, results, strict=True))
+
+        for rung, (n_rows, n_trees) in enumerate(schedule):
+            rung_start = perf_counter()
+            last = rung == len(schedule) - 1
+            n_keep = 1 if last else max(1, math.ceil(len(alive) / cfg.eta))
+            folds = _fold_data(params, X, y, np.sort(order[:n_rows]))
+
+            first = run(alive, folds[:n_first], n_trees)
+            partial = {c: float(np.mean(first[c][0])) for c in alive}
+            cutoff = sorted(partial.values())[min(n_keep, len(alive)) - 1]
+            survivors = [c for c in alive if partial[c] <= cutoff * (1 + cfg.early_stop_margin)]
+            rest = run(survivors, folds[n_first:], n_trees) if n_first < len(folds) else {}
+
+            scores = {}
+            for c in alive:
+                fold_scores, seconds = first[c]
+                if c in rest:
+                    fold_scores = fold_scores + rest[c][0]
+                    seconds += rest[c][1]
+                scores[c] = (fold_scores, seconds)
+            ranked = sorted(survivors, key=lambda c: float(np.mean(scores[c][0])))
+            promoted = ranked[:n_keep]
+            for c in alive:
+                fold_scores, seconds = scores[c]
+                if c not in survivors:
+                    status = "stopped"
+                elif c in promoted:
+                    status = "winner" if last else "promoted"
+                else:
+                    status = "eliminated"
+                trace.append(
+                    {
+                        "candidate": c,
+                        "rung": rung,
+                        "rows": n_rows,
+                        resource: n_trees,
+                        "status": status,
+                        "fold_scores": fold_scores,
+                        "score": float(np.mean(fold_scores)),
+                        "fit_s": seconds,
+                    }
+                )
+            rungs.append(
+                {
+                    "rung": rung,
+                    "rows": n_rows,
+                    resource: n_trees,
+                    "candidates": len(alive),
+                    "stopped": len(alive) - len(survivors),
+                    "promoted": len(promoted),
+                    "wall_s": perf_counter() - rung_start,
+                }
+            )
+            alive = promoted
+
+    best = alive[0]
+    best_scores = next(t for t in trace if t["candidate"] == best and t["status"] == "winner")
+    return {
+        "model_name": model_name,
+        "model_type": spec.type,
+        "metric": cfg.metric,
+        "config": asdict(cfg),
+        "candidates": [{"candidate": i, "params": p} for i, p in enumerate(candidates)],
+        "rungs": rungs,
+        "trace": trace,
+        "winner": {
+            "candidate": best,
+            "spec": {"type": spec.type, **candidates[best], resource: max_trees},
+            "score": best_scores["score"],
+            "fold_scores": best_scores["fold_scores"],
+        },
+    }
+
+
+def run_search(*, params: Params, model_name: str, repo_root: Path) -> tuple[dict, Path]:
+    if model_name not in params.models:
+        raise ValueError(f"Unknown model '{model_name}'. Available: {list(params.models.keys())}")
+    started_at_utc = utc_now()
+    start = perf_counter()
+    df = load_training_frame(params.data, repo_root)
+    if params.data.outliers.enabled and params.data.outliers.method == "iqr_clip":
+        df = iqr_clip_frame(df, numeric_cols=params.data.numeric_features, k=params.data.outliers.k)
+    X, y = split_xy(
+        df,
+        feature_cols=params.data.numeric_features + params.data.categorical_features,
+        target_col=params.data.target_col,
+    )
+
+    report = successive_halving(params, model_name, X, y)
+    report["started_at_utc"] = started_at_utc
+    report["duration_s"] = float(perf_counter() - start)
+
+    reports_dir = (repo_root / params.reports.dir).resolve()
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    out_path = reports_dir / f"search_{run_id}_{model_name}.json"
+    out_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    return report, out_path
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import hashlib
+import math
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+
+class QuantileSketch:
+    # DDSketch-style log-bucketed counts: every quantile is within `relative_accuracy` of
+    # the true value, memory grows with log(max/min), and two sketches merge by adding
+    # their bucket counts.
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Counter[int] = Counter()
+        self.zero_count = 0
+        self.count = 0
+
+    def add_many(self, values) -> None:
+        v = np.asarray(values, dtype=float).reshape(-1)
+        v = v[np.isfinite(v) & (v >= 0)]
+        if v.size == 0:
+            return
+        positive = v[v > 0]
+        self.zero_count += int(v.size - positive.size)
+        self.count += int(v.size)
+        keys, counts = np.unique(
+            np.ceil(np.log(positive) / self._log_gamma).astype(np.int64), return_counts=True
+        )
+        self.buckets.update(dict(zip(keys.tolist(), counts.tolist(), strict=True)))
+
+    def merge(self, other: QuantileSketch) -> None:
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        self.buckets.update(other.buckets)
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantiles(self, qs) -> list[float | None]:
+        if self.count == 0:
+            return [None for _ in qs]
+        keys = np.array(sorted(self.buckets), dtype=np.int64)
+        cum = self.zero_count + np.cumsum([self.buckets[k] for k in keys.tolist()])
+        out: list[float | None] = []
+        for q in qs:
+            rank = q * (self.count - 1)
+            if rank < self.zero_count or keys.size == 0:
+                out.append(0.0)
+                continue
+            k = keys[min(int(np.searchsorted(cum, rank, side="right")), keys.size - 1)]
+            out.append(float(2 * self.gamma**k / (self.gamma + 1)))
+        return out
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "zero_count": self.zero_count,
+            "buckets": {str(k): v for k, v in sorted(self.buckets.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> QuantileSketch:
+        s = cls(payload["relative_accuracy"])
+        s.zero_count = int(payload["zero_count"])
+        s.buckets = Counter({int(k): int(v) for k, v in payload["buckets"].items()})
+        s.count = s.zero_count + sum(s.buckets.values())
+        return s
+
+
+def hash64(values) -> np.ndarray:
+    return np.array(
+        [
+            int.from_bytes(hashlib.blake2b(str(v).encode("utf-8"), digest_size=8).digest(), "big")
+            for v in values
+        ],
+        dtype=np.uint64,
+    )
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    # Exact vectorized bit length for uint64 (binary search over shift widths)
+    x = x.copy()
+    n = np.zeros(x.shape, dtype=np.int64)
+    for s in (32, 16, 8, 4, 2, 1):
+        big = x >= np.uint64(1 << s)
+        n[big] += s
+        x[big] >>= np.uint64(s)
+    return n + (x > 0)
+
+
+class HyperLogLog:
+    # Distinct counts in 2**precision one-byte registers (~1.6% standard error at p=12);
+    # merging is an elementwise max.
+    def __init__(self, precision: int = 12) -> None:
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        if hashes.size == 0:
+            return
+        p = self.precision
+        idx = (hashes >> np.uint64(64 - p)).astype(np.intp)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        rho = (64 - p) - _bit_length(rest) + 1
+        np.maximum.at(self.registers, idx, rho.astype(np.uint8))
+
+    def add_many(self, values) -> None:
+        self.add_hashes(hash64(values))
+
+    def merge(self, other: HyperLogLog) -> None:
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLogs with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> float:
+        m = self.registers.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / float(np.sum(np.exp2(-self.registers.astype(float))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)
+        return raw
+
+
+class Histogram:
+    # Counts over fixed cut points: bucket i holds edges[i-1] < x <= edges[i], with open
+    # first and last buckets, plus a separate missing count. Merges by addition.
+    def __init__(self, edges) -> None:
+        self.edges = np.asarray(edges, dtype=float)
+        self.counts = np.zeros(self.edges.size + 1, dtype=np.int64)
+        self.missing = 0
+
+    def add_many(self, values) -> None:
+        v = np.asarray(values, dtype=float).reshape(-1)
+        finite = np.isfinite(v)
+        self.missing += int(v.size - finite.sum())
+        idx = np.searchsorted(self.edges, v[finite], side="left")
+        self.counts += np.bincount(idx, minlength=self.counts.size)
+
+    def merge(self, other: Histogram) -> None:
+        self.counts += other.counts
+        self.missing += other.missing
+
+    def to_dict(self) -> dict:
+        return {
+            "edges": self.edges.tolist(),
+            "counts": self.counts.tolist(),
+            "missing": self.missing,
+        }
+
+
+def latency_edges_ms() -> np.ndarray:
+    # Log-spaced from 0.1 ms to 10 s, four buckets per doubling
+    return 0.1 * 2.0 ** (np.arange(0, 67) / 4.0)
+
+
+def feature_profile(
+    X: pd.DataFrame, *, numeric_features: list[str], categorical_features: list[str], bins: int = 10
+) -> dict:
+    # Training-time reference distributions for drift checks: quantile cut points and
+    # counts per numeric feature, value frequencies per categorical feature.
+    numeric: dict[str, dict] = {}
+    for col in numeric_features:
+        values = pd.to_numeric(X[col], errors="coerce").to_numpy(dtype=float)
+        finite = values[np.isfinite(values)]
+        edges = (
+            np.unique(np.quantile(finite, np.linspace(0, 1, bins + 1)[1:-1]))
+            if finite.size
+            else np.array([])
+        )
+        hist = Histogram(edges)
+        hist.add_many(values)
+        numeric[col] = hist.to_dict()
+    categorical = {
+        col: {str(k): int(v) for k, v in X[col].fillna("Unknown").value_counts().items()}
+        for col in categorical_features
+    }
+    return {"rows": int(len(X)), "numeric": numeric, "categorical": categorical}
+
+
+def psi(expected, actual, *, eps: float = 1e-4) -> float:
+    # Population stability index between two count vectors over the same buckets
+    e = np.asarray(expected, dtype=float)
+    a = np.asarray(actual, dtype=float)
+    if e.sum() == 0 or a.sum() == 0:
+        return float("nan")
+    e = np.clip(e / e.sum(), eps, None)
+    a = np.clip(a / a.sum(), eps, None)
+    return float(np.sum((a - e) * np.log(a / e)))
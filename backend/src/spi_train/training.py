@@ -9,13 +9,35 @@ from time import perf_counter
 
 import joblib
 import numpy as np
+import pandas as pd
 from sklearn.model_selection import KFold
 
+from spi_train.cache import StageCache, cached, code_version, file_digest, make_key
+from spi_train.comparables import build_comparables_index
+from spi_train.compression import compare_models, compress_forest
 from spi_train.config import Params
-from spi_train.data import load_training_frame, split_xy
-from spi_train.metrics import mae, r2, rmse
-from spi_train.models import build_model
-from spi_train.preprocessing import build_preprocessor, iqr_clip_frame
+from spi_train.data import (
+    collapse_duplicates,
+    load_training_frame,
+    require_training_csv,
+    split_xy,
+)
+from spi_train.distillation import fit_student
+from spi_train.fused_metrics import bootstrap_ci, fused_regression_metrics, group_breakdown
+from spi_train.models import (
+    build_model,
+    build_quantile_pair,
+    fits_mean_target,
+    needs_dense_input,
+)
+from spi_train.preprocessing import (
+    build_preprocessor,
+    iqr_clip_frame,
+    native_categorical_indices,
+)
+from spi_train.profiling import StageProfiler
+from spi_train.sketches import feature_profile
+from spi_train.tree_arrays import to_dense
 
 
 @dataclass(frozen=True)
@@ -39,82 +61,405 @@ class RunMetrics:
     mean_r2: float
 
 
-def _utc_now() -> str:
+def utc_now() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def _clip_in_preprocessor(params: Params) -> bool:
+    return params.data.outliers.enabled and params.data.outliers.method == "iqr_clip_fitted"
+
+
+def _new_preprocessor(params: Params, dense: bool = False):
+    return build_preprocessor(
+        numeric_features=params.data.numeric_features,
+        categorical_features=params.data.categorical_features,
+        encoding=params.data.encoding.method,
+        max_categories=params.data.encoding.max_categories,
+        clip_k=params.data.outliers.k if _clip_in_preprocessor(params) else None,
+        dense=dense,
+        random_state=params.train.random_state,
+    )
+
+
+def native_categorical(params: Params) -> list[int] | None:
+    return native_categorical_indices(
+        numeric_features=params.data.numeric_features,
+        categorical_features=params.data.categorical_features,
+        encoding=params.data.encoding.method,
+    )
+
+
+def _new_model(params: Params, model_name: str):
+    return build_model(
+        params.models[model_name],
+        random_state=params.train.random_state,
+        categorical_features=native_categorical(params),
+    )
+
+
+def fit_preprocessor(params: Params, X_train, y_train, X_test=None, dense: bool = False):
+    pre = _new_preprocessor(params, dense)
+    X_train_t = pre.fit_transform(X_train, y_train)
+    X_test_t = pre.transform(X_test) if X_test is not None else None
+    return pre, X_train_t, X_test_t
+
+
+def _distill(params: Params, teacher, pre, X, X_t, sample_weight=None):
+    return fit_student(
+        teacher,
+        pre,
+        X,
+        X_t,
+        params.distillation,
+        numeric_features=params.data.numeric_features,
+        random_state=params.train.random_state,
+        categorical_features=native_categorical(params),
+        sample_weight=sample_weight,
+    )
+
+
+def _mean_fold_metrics(fused: dict, n_folds: int) -> dict:
+    return {name: float(np.mean(fused[name][0, :n_folds])) for name in ("mae", "rmse", "r2")}
+
+
+def _extra_metrics(params: Params, X, y, oof_pred: np.ndarray, fused: dict) -> dict:
+    fold_mape = fused["mape"][0]
+    extra: dict = {
+        "mean_mape": float(np.nanmean(fold_mape)) if np.isfinite(fold_mape).any() else None,
+        "abs_error_quantiles": dict(
+            zip(["p50", "p90", "p95"], fused["abs_error_quantiles"][0].tolist(), strict=True)
+        ),
+        "by_feature": {
+            col: group_breakdown(y, oof_pred, X[col].fillna("Unknown"))
+            for col in params.data.categorical_features
+        },
+    }
+    if params.train.bootstrap_samples > 0:
+        ci = bootstrap_ci(
+            y,
+            oof_pred,
+            n_boot=params.train.bootstrap_samples,
+            random_state=params.train.random_state,
+        )
+        extra["bootstrap_ci_95"] = {name: bounds[0].tolist() for name, bounds in ci.items()}
+    return extra
+
+
 def train_and_evaluate(
     *,
     params: Params,
     model_name: str,
     repo_root: Path,
     version_tag: str,
+    profile_memory: bool = False,
+    cache: StageCache | None = None,
 ) -> tuple[RunMetrics, Path, Path]:
     if model_name not in params.models:
         raise ValueError(f"Unknown model '{model_name}'. Available: {list(params.models.keys())}")
 
+    started_at_utc = utc_now()
     start = perf_counter()
-    df = load_training_frame(params.data, repo_root)
-
+    spec = params.models[model_name]
     feature_cols = params.data.numeric_features + params.data.categorical_features
-    if params.data.outliers.enabled and params.data.outliers.method == "iqr_clip":
-        df = iqr_clip_frame(df, numeric_cols=params.data.numeric_features, k=params.data.outliers.k)
+    clip_outliers = params.data.outliers.enabled and params.data.outliers.method == "iqr_clip"
+    distill = params.distillation.enabled
+    # The exported preprocessor must produce what the exported model accepts at serving time
+    dense = needs_dense_input(spec) or (distill and needs_dense_input(params.distillation.student))
+
+    profiler = StageProfiler(trace_memory=profile_memory)
+    with profiler:
+        # Cache keys chain: every stage key includes the key of the stage it depends on
+        frame_key = ""
+        if cache is not None:
+            frame_key = make_key(
+                "frame",
+                code_version(),
+                file_digest(require_training_csv(params.data, repo_root)),
+                params.data.numeric_features,
+                asdict(params.data.outliers),
+            )
 
-    X, y = split_xy(df, feature_cols=feature_cols, target_col=params.data.target_col)
+        with profiler.stage("load_csv"):
+            found, df = cache.get(frame_key) if cache is not None else (False, None)
+            if not found:
+                df = load_training_frame(params.data, repo_root)
+        if not found:
+            if clip_outliers:
+                with profiler.stage("iqr_clip"):
+                    df = iqr_clip_frame(
+                        df, numeric_cols=params.data.numeric_features, k=params.data.outliers.k
+                    )
+            if cache is not None:
+                cache.put(frame_key, df)
 
-    cv = KFold(n_splits=params.train.cv_folds, shuffle=True, random_state=params.train.random_state)
-    fold_metrics: list[FoldMetrics] = []
+        with profiler.stage("split_xy"):
+            X, y = split_xy(df, feature_cols=feature_cols, target_col=params.data.target_col)
 
-    for fold_idx, (train_idx, test_idx) in enumerate(cv.split(X), start=1):
-        X_train = X.iloc[train_idx]
-        y_train = y.iloc[train_idx]
-        X_test = X.iloc[test_idx]
-        y_test = y.iloc[test_idx]
+        # Reference distributions for serving-time drift monitoring
+        with profiler.stage("feature_profile"):
+            reference_profile = feature_profile(
+                X,
+                numeric_features=params.data.numeric_features,
+                categorical_features=params.data.categorical_features,
+            )
 
-        pre = build_preprocessor(
-            numeric_features=params.data.numeric_features,
-            categorical_features=params.data.categorical_features,
+        # Optionally fit on unique feature rows weighted by their count. Folds are split over
+        # the unique rows, so duplicates never straddle train and test, and out-of-fold
+        # predictions are mapped back to every original row before scoring.
+        X_fit, y_fit, w_fit, group = X, y, None, None
+        collapse = None
+        if params.train.collapse_duplicates:
+            collapse = {"by_target": not fits_mean_target(spec)}
+            with profiler.stage("collapse_duplicates"):
+                collapsed = collapse_duplicates(X, y, by_target=collapse["by_target"])
+            X_fit, y_fit, w_fit, group = collapsed.X, collapsed.y, collapsed.weight, collapsed.group
+            collapse.update(rows=len(y), unique_rows=len(y_fit))
+
+        cv = KFold(
+            n_splits=params.train.cv_folds, shuffle=True, random_state=params.train.random_state
+        )
+        splits_key = make_key(
+            "splits", frame_key, params.train.cv_folds, params.train.random_state, collapse
         )
-        model = build_model(params.models[model_name], random_state=params.train.random_state)
-
-        X_train_t = pre.fit_transform(X_train)
-        model.fit(X_train_t, y_train)
-        y_pred = model.predict(pre.transform(X_test))
-
-        fold_metrics.append(
-            FoldMetrics(
-                fold=fold_idx,
-                mae=mae(y_test, y_pred),
-                rmse=rmse(y_test, y_pred),
-                r2=r2(y_test, y_pred),
+        splits = cached(cache, splits_key, lambda: list(cv.split(X_fit)))
+        # Out-of-fold predictions, scored together once all folds are done
+        oof_pred = np.empty(len(y_fit), dtype=float)
+        student_oof = np.empty(len(y_fit), dtype=float) if distill else None
+        fold_ids = np.empty(len(y_fit), dtype=np.intp)
+
+        for fold_idx, (train_idx, test_idx) in enumerate(splits, start=1):
+            X_train = X_fit.iloc[train_idx]
+            y_train = y_fit.iloc[train_idx]
+            w_train = w_fit[train_idx] if w_fit is not None else None
+            X_test = X_fit.iloc[test_idx]
+
+            pre_key = make_key(
+                "preprocess",
+                splits_key,
+                fold_idx,
+                feature_cols,
+                params.data.target_col,
+                asdict(params.data.encoding),
+                dense,
             )
+            with profiler.stage("preprocess", fold=fold_idx):
+                pre, X_train_t, X_test_t = cached(
+                    cache, pre_key, fit_preprocessor, params, X_train, y_train, X_test, dense
+                )
+
+            pred_key = make_key("predict", pre_key, spec.type, spec.params)
+            found, y_pred = cache.get(pred_key) if cache is not None else (False, None)
+            model = None
+            if not found:
+                model = _new_model(params, model_name)
+                with profiler.stage("fit", fold=fold_idx):
+                    model.fit(X_train_t, y_train, sample_weight=w_train)
+                with profiler.stage("predict", fold=fold_idx):
+                    y_pred = model.predict(X_test_t)
+                if cache is not None:
+                    cache.put(pred_key, y_pred)
+
+            if distill:
+                # Each fold's teacher is distilled on that fold's training rows only, so the
+                # student's out-of-fold metrics are as honest as the teacher's
+                student_key = make_key("distill_predict", pred_key, asdict(params.distillation))
+                found, y_student = cache.get(student_key) if cache is not None else (False, None)
+                if not found:
+                    if model is None:
+                        model = _new_model(params, model_name)
+                        with profiler.stage("fit", fold=fold_idx):
+                            model.fit(X_train_t, y_train, sample_weight=w_train)
+                    with profiler.stage("distill", fold=fold_idx):
+                        student = _distill(params, model, pre, X_train, X_train_t, w_train)
+                        y_student = student.predict(to_dense(X_test_t))
+                    if cache is not None:
+                        cache.put(student_key, y_student)
+                student_oof[test_idx] = y_student
+
+            oof_pred[test_idx] = y_pred
+            fold_ids[test_idx] = fold_idx - 1
+
+        if group is not None:
+            oof_pred, fold_ids = oof_pred[group], fold_ids[group]
+            student_oof = student_oof[group] if distill else None
+
+        with profiler.stage("metrics"):
+            fused = fused_regression_metrics(y.to_numpy(), oof_pred, segments=fold_ids)
+            fold_metrics = [
+                FoldMetrics(
+                    fold=i + 1,
+                    mae=float(fused["mae"][0, i]),
+                    rmse=float(fused["rmse"][0, i]),
+                    r2=float(fused["r2"][0, i]),
+                )
+                for i in range(len(splits))
+            ]
+            metrics_extra = _extra_metrics(params, X, y, oof_pred, fused)
+            if distill:
+                student_fused = fused_regression_metrics(
+                    y.to_numpy(), student_oof, segments=fold_ids
+                )
+
+        mean_mae = float(np.mean([m.mae for m in fold_metrics]))
+        mean_rmse = float(np.mean([m.rmse for m in fold_metrics]))
+        mean_r2 = float(np.mean([m.r2 for m in fold_metrics]))
+
+        # Fit on full data and export separate artifacts (preprocessor + model)
+        pre_full_key = make_key(
+            "preprocess_full",
+            frame_key,
+            feature_cols,
+            params.data.target_col,
+            asdict(params.data.encoding),
+            collapse,
+            dense,
+            params.train.random_state,
         )
+        with profiler.stage("full_preprocess"):
+            pre_full, X_full_t, _ = cached(
+                cache, pre_full_key, fit_preprocessor, params, X_fit, y_fit, None, dense
+            )
 
-    mean_mae = float(np.mean([m.mae for m in fold_metrics]))
-    mean_rmse = float(np.mean([m.rmse for m in fold_metrics]))
-    mean_r2 = float(np.mean([m.r2 for m in fold_metrics]))
+        def _fit_full():
+            model = _new_model(params, model_name)
+            model.fit(X_full_t, y_fit, sample_weight=w_fit)
+            return model
 
-    # Fit on full data and export separate artifacts (preprocessor + model)
-    pre_full = build_preprocessor(
-        numeric_features=params.data.numeric_features,
-        categorical_features=params.data.categorical_features,
-    )
-    model_full = build_model(params.models[model_name], random_state=params.train.random_state)
-    X_full_t = pre_full.fit_transform(X)
-    model_full.fit(X_full_t, y)
+        model_full_key = make_key(
+            "model_full", pre_full_key, spec.type, spec.params, params.train.random_state
+        )
+        with profiler.stage("full_fit"):
+            model_full = cached(cache, model_full_key, _fit_full)
+
+        exported, exported_type = model_full, spec.type
+        distillation = None
+        teacher_path = None
+        if distill:
+            with profiler.stage("distillation"):
+                student_full = cached(
+                    cache,
+                    make_key("distill_full", model_full_key, asdict(params.distillation)),
+                    _distill,
+                    params,
+                    model_full,
+                    pre_full,
+                    X_fit,
+                    X_full_t,
+                    w_fit,
+                )
+                rng = np.random.default_rng(params.train.random_state)
+                n_sample = min(params.compression.sample_rows, X_full_t.shape[0])
+                rows = np.sort(rng.choice(X_full_t.shape[0], size=n_sample, replace=False))
+                distillation = compare_models(
+                    model_full,
+                    student_full,
+                    X_full_t[rows],
+                    y_fit.to_numpy()[rows],
+                    labels=("teacher", "student"),
+                )
+            distillation["teacher"]["cv"] = _mean_fold_metrics(fused, len(splits))
+            distillation["student"]["cv"] = _mean_fold_metrics(student_fused, len(splits))
+            distillation["student"]["type"] = params.distillation.student.type
+            distillation["student"]["params"] = params.distillation.student.params
+            distillation["n_synthetic"] = params.distillation.n_synthetic
+            exported, exported_type = student_full, params.distillation.student.type
 
-    artifacts_dir = (repo_root / params.artifacts.dir).resolve()
-    artifacts_dir.mkdir(parents=True, exist_ok=True)
+        artifacts_dir = (repo_root / params.artifacts.dir).resolve()
+        artifacts_dir.mkdir(parents=True, exist_ok=True)
+
+        model_path = artifacts_dir / f"{params.artifacts.model_prefix}{version_tag}.pkl"
+        pre_path = artifacts_dir / f"{params.artifacts.preprocessor_prefix}{version_tag}.pkl"
+        with profiler.stage("export"):
+            joblib.dump(exported, model_path)
+            joblib.dump(pre_full, pre_path)
+            if distill:
+                # The student is served; the teacher is kept for comparison like an
+                # uncompressed forest
+                teacher_path = (
+                    artifacts_dir / f"{params.artifacts.model_prefix}{version_tag}_teacher.pkl"
+                )
+                joblib.dump(model_full, teacher_path)
+                distillation["teacher"]["file_bytes"] = teacher_path.stat().st_size
+                distillation["student"]["file_bytes"] = model_path.stat().st_size
+
+        compression = None
+        uncompressed_path = None
+        if params.compression.enabled and exported_type != "random_forest":
+            compression = {
+                "skipped": f"only random_forest models are compressed, not {exported_type}"
+            }
+        elif params.compression.enabled:
+            # The compressed forest becomes the exported model; the original is kept next to
+            # it for comparison and excluded from the Docker image
+            uncompressed_path = (
+                artifacts_dir / f"{params.artifacts.model_prefix}{version_tag}_uncompressed.pkl"
+            )
+            with profiler.stage("compression"):
+                rng = np.random.default_rng(params.train.random_state)
+                n_sample = min(params.compression.sample_rows, X_full_t.shape[0])
+                rows = np.sort(rng.choice(X_full_t.shape[0], size=n_sample, replace=False))
+                X_sample = X_full_t[rows]
+                compressed, compression = compress_forest(exported, X_sample, params.compression)
+                compression.update(
+                    compare_models(exported, compressed, X_sample, y_fit.to_numpy()[rows])
+                )
+                os.replace(model_path, uncompressed_path)
+                joblib.dump(compressed, model_path)
+                compression["original"]["file_bytes"] = uncompressed_path.stat().st_size
+                compression["compressed"]["file_bytes"] = model_path.stat().st_size
+
+        interval_path = None
+        if params.train.interval_level is not None and spec.type == "hist_gradient_boosting":
+            interval_path = artifacts_dir / f"{params.artifacts.interval_prefix}{version_tag}.pkl"
+            with profiler.stage("interval_fit"):
+                lower, upper = build_quantile_pair(
+                    spec,
+                    level=params.train.interval_level,
+                    random_state=params.train.random_state,
+                    categorical_features=native_categorical(params),
+                )
+                # Quantile losses cannot use averaged targets: collapse exact duplicates only
+                X_q_t, y_q, w_q = X_full_t, y_fit, w_fit
+                if collapse is not None and not collapse["by_target"]:
+                    exact = collapse_duplicates(X, y, by_target=True)
+                    X_q_t, y_q, w_q = pre_full.transform(exact.X), exact.y, exact.weight
+                lower.fit(X_q_t, y_q, sample_weight=w_q)
+                upper.fit(X_q_t, y_q, sample_weight=w_q)
+                joblib.dump(
+                    {"level": params.train.interval_level, "lower": lower, "upper": upper},
+                    interval_path,
+                )
+
+        comparables_path = None
+        if params.train.build_comparables and params.data.numeric_features:
+            comparables_path = (
+                artifacts_dir / f"{params.artifacts.comparables_prefix}{version_tag}.pkl"
+            )
+            with profiler.stage("comparables"):
+                numeric = params.data.numeric_features
+                raw_numeric = X[numeric]
+                if clip_outliers:
+                    # X holds clipped values; show the sales as they were recorded
+                    raw_numeric = load_training_frame(params.data, repo_root)[numeric].apply(
+                        pd.to_numeric, errors="coerce"
+                    )
+                index = build_comparables_index(
+                    pre_full.named_transformers_["num"].transform(X[numeric]),
+                    raw_numeric,
+                    y,
+                    districts=X["district"] if "district" in X.columns else None,
+                    target_col=params.data.target_col,
+                )
+                joblib.dump(index, comparables_path)
 
-    model_path = artifacts_dir / f"{params.artifacts.model_prefix}{version_tag}.pkl"
-    pre_path = artifacts_dir / f"{params.artifacts.preprocessor_prefix}{version_tag}.pkl"
-    joblib.dump(model_full, model_path)
-    joblib.dump(pre_full, pre_path)
+    if cache is not None:
+        # Enforce the size cap once per run rather than on every stage write
+        cache.evict()
 
     run = RunMetrics(
         model_name=model_name,
         model_type=params.models[model_name].type,
-        started_at_utc=_utc_now(),
+        started_at_utc=started_at_utc,
         duration_s=float(perf_counter() - start),
         cv_folds=params.train.cv_folds,
         fold_metrics=fold_metrics,
@@ -139,17 +484,45 @@ def train_and_evaluate(
                 "numeric_features": params.data.numeric_features,
                 "categorical_features": params.data.categorical_features,
                 "outliers": asdict(params.data.outliers),
+                "encoding": asdict(params.data.encoding),
             },
             "train": asdict(params.train),
         },
         "artifacts": {
             "model_path": str(model_path.relative_to(repo_root)).replace("\\", "/"),
             "preprocessor_path": str(pre_path.relative_to(repo_root)).replace("\\", "/"),
+            "interval_path": (
+                str(interval_path.relative_to(repo_root)).replace("\\", "/")
+                if interval_path is not None
+                else None
+            ),
+            "uncompressed_model_path": (
+                str(uncompressed_path.relative_to(repo_root)).replace("\\", "/")
+                if uncompressed_path is not None
+                else None
+            ),
+            "teacher_model_path": (
+                str(teacher_path.relative_to(repo_root)).replace("\\", "/")
+                if teacher_path is not None
+                else None
+            ),
+            "comparables_path": (
+                str(comparables_path.relative_to(repo_root)).replace("\\", "/")
+                if comparables_path is not None
+                else None
+            ),
             "version_tag": version_tag,
         },
         "env": {
             "model_version_env": os.getenv("MODEL_VERSION"),
         },
+        "metrics_extra": metrics_extra,
+        "feature_profile": reference_profile,
+        "collapse_duplicates": collapse,
+        "distillation": distillation,
+        "compression": compression,
+        "profile": profiler.to_dict(),
+        "cache": cache.stats() if cache is not None else None,
     }
     metrics_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
 
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+
+def to_dense(X) -> np.ndarray:
+    return X.toarray() if hasattr(X, "toarray") else np.asarray(X)
+
+
+@dataclass(frozen=True)
+class FlatForest:
+    # All trees' nodes concatenated into flat arrays. Child indices are global, and leaves
+    # point to themselves so every row can be advanced max_depth times without branching.
+    feature: np.ndarray
+    threshold: np.ndarray
+    left: np.ndarray
+    right: np.ndarray
+    missing_left: np.ndarray
+    value: np.ndarray
+    roots: np.ndarray
+    max_depth: int
+    # Training cover per node, for TreeSHAP; leaf values may be stored standardized in a
+    # narrow dtype and are mapped back as leaf_offset + leaf_scale * value
+    cover: np.ndarray | None = None
+    leaf_offset: float = 0.0
+    leaf_scale: float = 1.0
+
+    @property
+    def n_trees(self) -> int:
+        return int(self.roots.shape[0])
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self.feature, self.threshold, self.left, self.right, self.missing_left]
+        arrays += [self.value, self.roots] + ([self.cover] if self.cover is not None else [])
+        return sum(a.nbytes for a in arrays)
+
+    def trees(self) -> list[dict]:
+        # Per-tree arrays with local child indices and -1 children at leaves, the format
+        # tree_arrays_from_sklearn returns
+        bounds = np.append(self.roots, self.feature.shape[0])
+        out = []
+        for start, stop in zip(bounds[:-1], bounds[1:], strict=True):
+            idx = np.arange(start, stop)
+            leaf = self.left[start:stop] == idx
+            out.append(
+                {
+                    "feature": self.feature[start:stop].astype(np.int64),
+                    "threshold": self.threshold[start:stop].astype(float),
+                    "left": np.where(leaf, -1, self.left[start:stop] - start),
+                    "right": np.where(leaf, -1, self.right[start:stop] - start),
+                    "missing_left": self.missing_left[start:stop],
+                    "value": self.leaf_offset
+                    + self.leaf_scale * self.value[start:stop].astype(float),
+                    "cover": None if self.cover is None else self.cover[start:stop],
+                }
+            )
+        return out
+
+    def apply(self, X) -> np.ndarray:
+        # sklearn compares float32-cast inputs against the thresholds; do the same so leaf
+        # assignment matches estimator.predict exactly.
+        Xf = to_dense(X).astype(np.float32)
+        rows = np.arange(Xf.shape[0])[None, :]
+        node = np.repeat(self.roots[:, None], Xf.shape[0], axis=1)
+        for _ in range(self.max_depth):
+            x = Xf[rows, self.feature[node]]
+            go_left = (x <= self.threshold[node]) | (np.isnan(x) & self.missing_left[node])
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict_per_tree(self, X) -> np.ndarray:
+        # (n_trees, n_rows) in a single pass over all estimators
+        per_tree = self.value[self.apply(X)].astype(float)
+        if self.leaf_scale != 1.0 or self.leaf_offset != 0.0:
+            per_tree = self.leaf_offset + self.leaf_scale * per_tree
+        return per_tree
+
+    def predict(self, X) -> np.ndarray:
+        return self.predict_per_tree(X).mean(axis=0)
+
+
+def tree_arrays_from_sklearn(est) -> dict:
+    t = est.tree_
+    mgl = getattr(t, "missing_go_to_left", None)
+    return {
+        "feature": t.feature,
+        "threshold": t.threshold,
+        "left": t.children_left,
+        "right": t.children_right,
+        "missing_left": np.zeros(t.node_count, dtype=bool) if mgl is None else mgl,
+        "value": t.value[:, 0, 0],
+        "cover": t.weighted_n_node_samples,
+    }
+
+
+def _depth(left: np.ndarray, right: np.ndarray) -> int:
+    frontier = np.zeros(1, dtype=np.int64)
+    depth = 0
+    while (internal := frontier[left[frontier] >= 0]).size:
+        frontier = np.concatenate([left[internal], right[internal]])
+        depth += 1
+    return depth
+
+
+def build_flat_forest(
+    trees: list[dict],
+    *,
+    threshold_dtype=np.float64,
+    value_dtype=np.float64,
+    index_dtype=np.int64,
+    cover_dtype=np.float64,
+    leaf_offset: float = 0.0,
+    leaf_scale: float = 1.0,
+) -> FlatForest:
+    # Concatenates per-tree arrays (tree_arrays_from_sklearn format). Values are stored as
+    # (value - leaf_offset) / leaf_scale in value_dtype.
+    features, thresholds, lefts, rights, missing, values, covers, roots = ([] for _ in range(8))
+    offset = 0
+    max_depth = 0
+    for tree in trees:
+        left, right = np.asarray(tree["left"]), np.asarray(tree["right"])
+        n = left.shape[0]
+        is_leaf = left == -1
+        idx = np.arange(n) + offset
+        features.append(np.where(is_leaf, 0, tree["feature"]))
+        thresholds.append(tree["threshold"])
+        lefts.append(np.where(is_leaf, idx, left + offset))
+        rights.append(np.where(is_leaf, idx, right + offset))
+        missing.append(np.asarray(tree["missing_left"], dtype=bool))
+        values.append(tree["value"])
+        if tree.get("cover") is not None:
+            covers.append(tree["cover"])
+        roots.append(offset)
+        max_depth = max(max_depth, _depth(left, right))
+        offset += n
+    value = (np.concatenate(values) - leaf_offset) / leaf_scale
+    return FlatForest(
+        feature=np.concatenate(features).astype(np.int32),
+        threshold=np.concatenate(thresholds).astype(threshold_dtype),
+        left=np.concatenate(lefts).astype(index_dtype),
+        right=np.concatenate(rights).astype(index_dtype),
+        missing_left=np.concatenate(missing),
+        value=value.astype(value_dtype),
+        roots=np.asarray(roots, dtype=index_dtype),
+        max_depth=max_depth,
+        cover=np.concatenate(covers).astype(cover_dtype) if len(covers) == len(trees) else None,
+        leaf_offset=float(leaf_offset),
+        leaf_scale=float(leaf_scale),
+    )
+
+
+def flatten_forest(model: RandomForestRegressor) -> FlatForest:
+    return build_flat_forest([tree_arrays_from_sklearn(est) for est in model.estimators_])
+
+
+def as_flat_forest(model) -> FlatForest | None:
+    if isinstance(model, FlatForest):
+        return model
+    if isinstance(model, RandomForestRegressor):
+        return flatten_forest(model)
+    return None
+
+
+def quantile_interval(per_tree: np.ndarray, level: float) -> tuple[np.ndarray, np.ndarray]:
+    alpha = (1.0 - level) / 2.0
+    lower, upper = np.quantile(per_tree, [alpha, 1.0 - alpha], axis=0)
+    return lower, upper
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingRegressor
+
+from spi_train.tree_arrays import FlatForest, as_flat_forest, to_dense
+
+# Failed-edge masks are uint64 with one bit per feature group; leaves use the last bit
+_PAD_GROUP = 63
+
+# Elements per chunk: (rows, nodes) for routing, (groups, rows, leaves) for the SHAP sums,
+# small enough for the latter's temporaries to stay in cache
+_NODE_CHUNK = 1 << 20
+_LEAF_CHUNK = 1 << 16
+
+
+@dataclass(frozen=True)
+class TreeExplainer:
+    # Exact path-dependent TreeSHAP for a tree ensemble, over flat arrays precomputed once.
+    #
+    # Every model input column belongs to a feature group (one-hot district columns all map
+    # to "district"). Each leaf stores, per group, z = the product of the cover ratios of
+    # that group's edges on its root path (1 if none). With o = 1 if the row follows all of
+    # them, the SHAP value of group i from that leaf is
+    #     value * (o_i - z_i) * integral_0^1 prod_{j != i} ((1 - t) z_j + t o_j) dt
+    # a polynomial of degree < groups on the path, which Gauss-Legendre quadrature
+    # integrates exactly. Groups absent from a path have z = o = 1 and contribute nothing.
+    group_names: list[str]
+    base_value: float
+    # Nodes of all trees concatenated; parent is -1 for roots
+    feature: np.ndarray
+    threshold: np.ndarray
+    missing_left: np.ndarray
+    bitset: np.ndarray
+    bitsets: np.ndarray
+    group_bit: np.ndarray
+    parent: np.ndarray
+    is_left: np.ndarray
+    levels: list[np.ndarray]
+    float32_inputs: bool
+    # HistGradientBoosting with categorical features reorders and re-encodes its inputs first
+    input_encoder: object | None
+    # Leaves: weighted value and (n_groups, n_leaves) cover ratios
+    leaves: np.ndarray
+    leaf_value: np.ndarray
+    leaf_z: np.ndarray
+    quad_t: np.ndarray
+    quad_w: np.ndarray
+
+    @property
+    def n_nodes(self) -> int:
+        return int(self.feature.shape[0])
+
+    def _go_left(self, X: np.ndarray) -> np.ndarray:
+        x = X[:, self.feature]
+        left = np.where(np.isnan(x), self.missing_left, x <= self.threshold)
+        cat = np.flatnonzero(self.bitset >= 0)
+        if cat.size:
+            xc = x[:, cat]
+            code = np.where(np.isfinite(xc), xc, -1).astype(np.int64)
+            known = (code >= 0) & (code < 256)
+            code = np.where(known, code, 0)
+            words = self.bitsets[self.bitset[cat][None, :], code >> 5]
+            in_set = known & (((words >> (code & 31).astype(np.uint32)) & 1) == 1)
+            left[:, cat] = np.where(np.isnan(xc), self.missing_left[cat], in_set)
+        return left
+
+    def _failed_groups(self, X: np.ndarray) -> np.ndarray:
+        # Per row and leaf, a bitmask of the groups with at least one edge on the leaf's
+        # path that the row does not follow; built top-down one depth level at a time.
+        go_left = self._go_left(X)
+        failed = np.zeros((X.shape[0], self.n_nodes), dtype=np.uint64)
+        for nodes in self.levels:
+            par = self.parent[nodes]
+            miss = (go_left[:, par] != self.is_left[nodes]).astype(np.uint64)
+            failed[:, nodes] = failed[:, par] | (miss << self.group_bit[par])
+        return failed[:, self.leaves]
+
+    def shap_values(self, X) -> np.ndarray:
+        # (n_rows, n_groups); each row sums to prediction - base_value
+        X = to_dense(X)
+        if self.input_encoder is not None:
+            X = self.input_encoder.transform(X)
+        X = X.astype(np.float32 if self.float32_inputs else float).astype(float)
+        n_groups, n_leaves = self.leaf_z.shape
+        shifts = np.arange(n_groups, dtype=np.uint64)[:, None, None]
+        out = np.zeros((X.shape[0], n_groups))
+
+        row_chunk = max(1, _NODE_CHUNK // max(self.n_nodes, 1))
+        for r0 in range(0, X.shape[0], row_chunk):
+            failed = self._failed_groups(X[r0 : r0 + row_chunk])
+            n_rows = failed.shape[0]
+            leaf_chunk = max(1, _LEAF_CHUNK // (n_rows * n_groups))
+            for l0 in range(0, n_leaves, leaf_chunk):
+                sl = slice(l0, l0 + leaf_chunk)
+                # (n_groups, n_rows, n_leaves) so every step below runs over contiguous leaves
+                z = self.leaf_z[:, None, sl]
+                o = (((failed[None, :, sl] >> shifts) & np.uint64(1)) == 0).astype(float)
+                integral = np.zeros(o.shape)
+                for t, w in zip(self.quad_t.tolist(), self.quad_w.tolist(), strict=True):
+                    g = o * t
+                    g += z * (1.0 - t)
+                    prod = g[0].copy()
+                    for j in range(1, n_groups):
+                        prod *= g[j]
+                    integral += (w * prod) / g
+                contrib = (o - z) * integral
+                out[r0 : r0 + n_rows] += (contrib @ self.leaf_value[sl]).T
+        return out
+
+
+def _forest_nodes(forest: FlatForest) -> tuple[list[dict], np.ndarray]:
+    if forest.cover is None:
+        raise ValueError("TreeSHAP needs node covers, which this forest artifact does not store")
+    trees = forest.trees()
+    for tree in trees:
+        tree["value"] = tree["value"] / forest.n_trees
+        tree["bitset"] = np.full(tree["left"].shape[0], -1)
+    return trees, np.zeros((0, 8), dtype=np.uint32)
+
+
+def _hgb_nodes(model: HistGradientBoostingRegressor) -> tuple[list[dict], np.ndarray]:
+    trees, bitsets = [], []
+    n_bitsets = 0
+    for (predictor,) in model._predictors:
+        nodes = predictor.nodes
+        leaf = nodes["is_leaf"].astype(bool)
+        trees.append(
+            {
+                "feature": nodes["feature_idx"],
+                "threshold": nodes["num_threshold"],
+                "missing_left": nodes["missing_go_to_left"],
+                "left": np.where(leaf, -1, nodes["left"].astype(np.int64)),
+                "right": np.where(leaf, -1, nodes["right"].astype(np.int64)),
+                "value": nodes["value"],
+                "cover": nodes["count"].astype(float),
+                "bitset": np.where(
+                    nodes["is_categorical"].astype(bool),
+                    nodes["bitset_idx"].astype(np.int64) + n_bitsets,
+                    -1,
+                ),
+            }
+        )
+        bitsets.append(predictor.raw_left_cat_bitsets)
+        n_bitsets += predictor.raw_left_cat_bitsets.shape[0]
+    return trees, np.concatenate(bitsets).astype(np.uint32)
+
+
+def build_tree_explainer(
+    model, *, feature_groups: np.ndarray, group_names: list[str]
+) -> TreeExplainer:
+    # feature_groups[c] is the group index of model input column c
+    forest = as_flat_forest(model)
+    if forest is not None:
+        trees, bitsets = _forest_nodes(forest)
+        base_value = 0.0
+        float32_inputs = True
+        input_encoder = None
+    elif isinstance(model, HistGradientBoostingRegressor):
+        if model.loss != "squared_error":
+            raise ValueError(f"TreeSHAP needs squared_error loss, got {model.loss}")
+        trees, bitsets = _hgb_nodes(model)
+        base_value = float(np.ravel(model._baseline_prediction)[0])
+        float32_inputs = False
+        input_encoder = getattr(model, "_preprocessor", None)
+        if input_encoder is not None:
+            # Its output columns are the input columns regrouped per transformer
+            order = sorted(
+                input_encoder.transformers_, key=lambda t: input_encoder.output_indices_[t[0]].start
+            )
+            columns = np.concatenate([np.flatnonzero(cols) for _, _, cols in order])
+            feature_groups = np.asarray(feature_groups)[columns]
+    else:
+        raise TypeError(f"TreeSHAP is not supported for {type(model).__name__}")
+    if len(group_names) > _PAD_GROUP:
+        raise ValueError(f"At most {_PAD_GROUP} feature groups are supported")
+
+    feature_groups = np.asarray(feature_groups, dtype=np.int64)
+    parts: dict[str, list[np.ndarray]] = {k: [] for k in ("parent", "is_left")}
+    offset = 0
+    for tree in trees:
+        n = len(tree["left"])
+        internal = np.flatnonzero(tree["left"] >= 0)
+        parent = np.full(n, -1, dtype=np.int64)
+        is_left = np.zeros(n, dtype=bool)
+        parent[tree["left"][internal]] = internal + offset
+        parent[tree["right"][internal]] = internal + offset
+        is_left[tree["left"][internal]] = True
+        parts["parent"].append(parent)
+        parts["is_left"].append(is_left)
+        offset += n
+
+    def cat(key: str) -> np.ndarray:
+        return np.concatenate([np.asarray(t[key]) for t in trees])
+
+    feature = cat("feature").astype(np.int64)
+    left = cat("left")
+    is_leaf = left < 0
+    feature = np.where(is_leaf, 0, feature)
+    cover = cat("cover").astype(float)
+    value = cat("value").astype(float)
+    parent = np.concatenate(parts["parent"])
+    is_left = np.concatenate(parts["is_left"])
+    depth = np.zeros(parent.size, dtype=np.int64)
+    node = np.arange(parent.size)
+    while (active := parent[node] >= 0).any():
+        depth += active
+        node = np.where(active, parent[node], node)
+    group_bit = np.where(is_leaf, _PAD_GROUP, feature_groups[feature]).astype(np.uint64)
+
+    leaves = np.flatnonzero(is_leaf)
+    max_depth = int(depth.max())
+    # Walk every leaf up to its root, multiplying each group's cover ratios
+    leaf_z = np.ones((len(group_names), leaves.size))
+    on_path = np.zeros(leaf_z.shape, dtype=bool)
+    node = leaves.copy()
+    for _ in range(max_depth):
+        active = np.flatnonzero(parent[node] >= 0)
+        child = node[active]
+        par = parent[child]
+        g = group_bit[par].astype(np.int64)
+        leaf_z[g, active] *= cover[child] / cover[par]
+        on_path[g, active] = True
+        node[active] = par
+
+    # Expected value: leaf values weighted by the share of training cover reaching them
+    base_value += float((value[leaves] * leaf_z.prod(axis=0)).sum())
+    x, w = np.polynomial.legendre.leggauss((max(int(on_path.sum(axis=0).max()), 1) + 1) // 2)
+
+    return TreeExplainer(
+        group_names=list(group_names),
+        base_value=base_value,
+        feature=feature,
+        threshold=cat("threshold").astype(float),
+        missing_left=cat("missing_left").astype(bool),
+        bitset=cat("bitset").astype(np.int64),
+        bitsets=bitsets,
+        group_bit=group_bit,
+        parent=parent,
+        is_left=is_left,
+        levels=[np.flatnonzero(depth == d) for d in range(1, max_depth + 1)],
+        float32_inputs=float32_inputs,
+        input_encoder=input_encoder,
+        leaves=leaves,
+        leaf_value=value[leaves],
+        leaf_z=leaf_z,
+        quad_t=(x + 1.0) / 2.0,
+        quad_w=w / 2.0,
+    )
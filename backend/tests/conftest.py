@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Callable
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+TRAIN_DISTRICTS = ["Södermalm", "Kungsholmen", "Vasastan", "Östermalm", "Bromma", "Farsta"]
+
+
+@pytest.fixture()
+def artifacts_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    model_path = tmp_path / "model.pkl"
+    preprocessor_path = tmp_path / "preprocessor.pkl"
+
+    numeric_features = ["area", "rooms", "year_built", "monthly_fee"]
+    categorical_features = ["district"]
+
+    preprocessor = ColumnTransformer(
+        transformers=[
+            (
+                "num",
+                Pipeline(
+                    steps=[
+                        ("imputer", SimpleImputer(strategy="median")),
+                    ]
+                ),
+                numeric_features,
+            ),
+            (
+                "cat",
+                Pipeline(
+                    steps=[
+                        ("imputer", SimpleImputer(strategy="most_frequent")),
+                        ("ohe", OneHotEncoder(handle_unknown="ignore")),
+                    ]
+                ),
+                categorical_features,
+            ),
+        ]
+    )
+
+    # Fit on tiny synthetic data
+    X_train = pd.DataFrame(
+        [
+            {
+                "area": 50,
+                "rooms": 2,
+                "district": "Södermalm",
+                "year_built": 1990,
+                "monthly_fee": 3000,
+            },
+            {
+                "area": 80,
+                "rooms": 3,
+                "district": "Kungsholmen",
+                "year_built": 2005,
+                "monthly_fee": 4500,
+            },
+        ]
+    )
+    y_train = np.array([70000, 90000], dtype=float)
+
+    X_trans = preprocessor.fit_transform(X_train)
+    model = RandomForestRegressor(n_estimators=10, random_state=0)
+    model.fit(X_trans, y_train)
+
+    joblib.dump(preprocessor, preprocessor_path)
+    joblib.dump(model, model_path)
+
+    monkeypatch.setenv("MODEL_PATH", str(model_path))
+    monkeypatch.setenv("PREPROCESSOR_PATH", str(preprocessor_path))
+    monkeypatch.setenv("MODEL_VERSION", "test")
+    monkeypatch.setenv("PREDICTION_LOG_PATH", str(tmp_path / "predictions.jsonl"))
+    return tmp_path
+
+
+@pytest.fixture()
+def train_csv(tmp_path: Path) -> Path:
+    # Training data at <tmp_path>/data/train.csv, where write_params points
+    rng = np.random.default_rng(0)
+    n = 300
+    district = rng.choice(TRAIN_DISTRICTS, size=n)
+    area = rng.uniform(20, 150, size=n)
+    df = pd.DataFrame(
+        {
+            "area": area,
+            "rooms": rng.integers(1, 6, size=n),
+            "district": district,
+            "year_built": rng.integers(1900, 2024, size=n),
+            "monthly_fee": rng.normal(3500, 800, size=n),
+            "price_per_sqm": 50000 + (district == "Östermalm") * 30000 - area * 20,
+        }
+    )
+    path = tmp_path / "data" / "train.csv"
+    path.parent.mkdir(parents=True)
+    df.to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture()
+def write_params(tmp_path: Path) -> Callable[..., Path]:
+    # Writes <tmp_path>/params.json; each keyword updates (or adds) one top-level section
+    def write(**overrides) -> Path:
+        raw = {
+            "data": {
+                "train_csv": "data/train.csv",
+                "target_col": "price_per_sqm",
+                "numeric_features": ["area", "rooms", "year_built", "monthly_fee"],
+                "categorical_features": ["district"],
+                "outliers": {"enabled": True, "method": "iqr_clip", "k": 1.5},
+                "encoding": {"method": "onehot"},
+            },
+            "train": {"random_state": 0, "cv_folds": 3},
+            "models": {
+                "baseline": {"type": "linear"},
+                "rf": {"type": "random_forest", "n_estimators": 10, "max_depth": 5},
+                "hgb": {"type": "hist_gradient_boosting", "max_iter": 20},
+            },
+            "artifacts": {
+                "dir": "models",
+                "model_prefix": "model_",
+                "preprocessor_prefix": "pre_",
+            },
+            "reports": {"dir": "reports"},
+        }
+        for section, values in overrides.items():
+            raw.setdefault(section, {}).update(values)
+        params_path = tmp_path / "params.json"
+        params_path.write_text(json.dumps(raw), encoding="utf-8")
+        return params_path
+
+    return write
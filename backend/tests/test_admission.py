@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from spi_api.admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    admission_paths_from_env,
+    report_inference_ms,
+)
+
+
+def _scope(path: str) -> dict:
+    return {"type": "http", "method": "POST", "path": path, "headers": []}
+
+
+async def _call(app, path: str) -> tuple[int, dict]:
+    sent: list[dict] = []
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict) -> None:
+        sent.append(message)
+
+    await app(_scope(path), receive, send)
+    return sent[0]["status"], dict(sent[0].get("headers", []))
+
+
+def test_limit_queue_and_fast_shedding() -> None:
+    async def scenario() -> None:
+        gate = asyncio.Event()
+
+        async def slow_app(scope, receive, send) -> None:
+            if scope["path"] == "/predict":
+                await gate.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"{}"})
+
+        controller = AdmissionController(max_concurrency=2, max_queue=1, queue_timeout_s=5)
+        app = AdmissionMiddleware(slow_app, controller=controller, paths=frozenset({"/predict"}))
+
+        running = [asyncio.create_task(_call(app, "/predict")) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        assert controller.in_flight == 2 and controller.queued == 1
+
+        # Queue full: rejected immediately with Retry-After, health is never limited
+        status, headers = await _call(app, "/predict")
+        assert status == 503
+        assert headers[b"retry-after"] == b"5"
+        assert (await _call(app, "/health"))[0] == 200
+
+        gate.set()
+        assert [s for s, _ in await asyncio.gather(*running)] == [200, 200, 200]
+        assert controller.stats()["in_flight"] == 0
+        assert controller.stats()["shed"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_queued_request_times_out() -> None:
+    async def scenario() -> None:
+        controller = AdmissionController(max_concurrency=1, max_queue=4, queue_timeout_s=0.05)
+        assert await controller.acquire()
+        assert not await controller.acquire()
+        assert controller.queued == 0
+        controller.release()
+        assert await controller.acquire()
+
+    asyncio.run(scenario())
+
+
+def test_adaptive_limit_backs_off_and_recovers() -> None:
+    controller = AdmissionController(
+        max_concurrency=20, max_queue=0, queue_timeout_s=1, target_ms=50
+    )
+    for _ in range(200):
+        controller.observe(200.0)
+    assert controller.stats()["limit"] < 5
+    for _ in range(2000):
+        controller.observe(10.0)
+    assert controller.stats()["limit"] == 20
+
+
+def test_limit_follows_reported_inference_time_only() -> None:
+    async def scenario() -> None:
+        async def endpoint(scope, receive, send) -> None:
+            if scope["path"] == "/predict":
+                report_inference_ms(Request(scope), 500.0)
+            else:
+                # A long upload: slow overall but reports no per-request inference time
+                await asyncio.sleep(0.2)
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"{}"})
+
+        controller = AdmissionController(
+            max_concurrency=1, max_queue=0, queue_timeout_s=1, target_ms=50, min_concurrency=0
+        )
+        app = AdmissionMiddleware(
+            endpoint, controller=controller, paths=frozenset({"/predict", "/predict/bulk"})
+        )
+        assert (await _call(app, "/predict/bulk"))[0] == 200
+        assert controller.limit == 1.0
+        assert (await _call(app, "/predict"))[0] == 200
+        assert controller.limit == pytest.approx(0.9)
+
+    asyncio.run(scenario())
+
+
+def test_app_serves_through_admission_middleware(artifacts_dir: Path, monkeypatch) -> None:
+    from spi_api.main import create_app
+
+    monkeypatch.setenv("ADMISSION_MAX_CONCURRENCY", "2")
+    monkeypatch.setenv("ADMISSION_MAX_QUEUE", "0")
+    monkeypatch.setenv("ADMISSION_TARGET_MS", "0.000001")
+    app = create_app()
+    (controller,) = [m.kwargs["controller"] for m in app.user_middleware if m.kwargs.get("paths")]
+    payload = {
+        "area": 65,
+        "rooms": 2,
+        "district": "Södermalm",
+        "year_built": 1998,
+        "monthly_fee": 3200,
+    }
+    with TestClient(app) as client:
+        assert client.post("/predict", json=payload).status_code == 200
+        assert client.post("/predict", json=payload).status_code == 200
+        assert client.get("/health").json() == {"ok": True}
+    # Both requests reported an inference time above the target
+    assert controller.limit == pytest.approx(1.8)
+
+
+def test_default_paths_cover_every_model_endpoint(monkeypatch: pytest.MonkeyPatch) -> None:
+    from spi_api.main import create_app
+
+    monkeypatch.delenv("ADMISSION_PATHS", raising=False)
+    post_paths = {
+        route.path for route in create_app().routes if "POST" in getattr(route, "methods", ())
+    }
+    assert post_paths <= admission_paths_from_env()
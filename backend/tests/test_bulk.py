@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+ROW = {
+    "area": 65,
+    "rooms": 2,
+    "district": "Södermalm",
+    "year_built": 1998,
+    "monthly_fee": 3200,
+}
+
+
+def _lines(resp) -> list[dict]:
+    return [json.loads(line) for line in resp.text.splitlines() if line]
+
+
+def test_ndjson_upload_streams_ordered_results_with_inline_errors(
+    artifacts_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from spi_api.main import create_app
+
+    monkeypatch.setenv("BULK_CHUNK_ROWS", "2")
+    rows = [
+        ROW,
+        {**ROW, "area": 0},
+        "not json",
+        {**ROW, "area": 90, "district": "Kungsholmen"},
+        {**ROW, "area": 120},
+    ]
+    body = "\n".join(r if isinstance(r, str) else json.dumps(r) for r in rows) + "\n"
+
+    app = create_app()
+    with TestClient(app) as client:
+        resp = client.post(
+            "/predict/bulk", content=body, headers={"content-type": "application/x-ndjson"}
+        )
+        assert resp.status_code == 200
+        out = _lines(resp)
+        assert [o["row"] for o in out[:-1]] == [0, 1, 2, 3, 4]
+        assert "error" in out[1] and "error" in out[2]
+        assert out[-1]["done"] is True
+        assert out[-1]["rows"] == 5 and out[-1]["errors"] == 2
+
+        single = client.post("/predict", json=rows[3]).json()
+        assert out[3]["predicted_price_per_sqm"] == pytest.approx(single["predicted_price_per_sqm"])
+        assert out[3]["predicted_total_price"] == pytest.approx(single["predicted_total_price"])
+
+
+def test_csv_upload_matches_single_predictions(artifacts_dir: Path) -> None:
+    from spi_api.main import create_app
+
+    csv_body = (
+        "area,rooms,district,year_built,monthly_fee,transaction_year\r\n"
+        "65,2,Södermalm,1998,3200,\r\n"
+        "80,3,Kungsholmen,2005,4100,2023\r\n"
+        "80,3\r\n"
+    )
+    app = create_app()
+    with TestClient(app) as client:
+        resp = client.post(
+            "/predict/bulk", content=csv_body.encode(), headers={"content-type": "text/csv"}
+        )
+        out = _lines(resp)
+        assert len(out) == 4
+        single = client.post("/predict", json=ROW).json()
+        assert out[0]["predicted_price_per_sqm"] == pytest.approx(single["predicted_price_per_sqm"])
+        assert "error" in out[2]
+
+        assert client.post("/predict/bulk", content=b"x").status_code == 415
+
+
+def test_iter_lines_handles_split_and_overlong_lines() -> None:
+    import asyncio
+
+    from spi_api.bulk import _TOO_LONG, MAX_LINE_BYTES, iter_lines
+
+    data = b"\xef\xbb\xbfa\r\nbc\n" + b"x" * (3 * MAX_LINE_BYTES) + b"\nd\n\ne"
+
+    async def collect(size: int) -> list:
+        async def chunks():
+            for i in range(0, len(data), size):
+                yield data[i : i + size]
+
+        return [line async for line in iter_lines(chunks())]
+
+    for size in (1, 7, 4096, len(data)):
+        lines = asyncio.run(collect(size))
+        # A line arriving whole is passed on; one that outgrows the buffer is flagged
+        expected_long = [_TOO_LONG] if size < MAX_LINE_BYTES else ["x" * (3 * MAX_LINE_BYTES)]
+        assert lines == ["a", "bc", *expected_long, "d", "", "e"]
+
+
+def test_bulk_upload_is_logged(artifacts_dir: Path) -> None:
+    from spi_api.main import create_app
+
+    with TestClient(create_app()) as client:
+        client.post(
+            "/predict/bulk",
+            content=json.dumps(ROW) + "\n",
+            headers={"content-type": "application/x-ndjson"},
+        )
+    log = (artifacts_dir / "predictions.jsonl").read_text(encoding="utf-8").splitlines()
+    record = json.loads(log[-1])
+    assert record["endpoint"] == "predict/bulk"
+    assert record["rows"] == 1 and record["completed"] is True
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from spi_train.comparables import build_comparables_index
+
+DISTRICTS = ["Södermalm", "Kungsholmen", "Vasastan"]
+NUMERIC = ["area", "rooms", "year_built", "monthly_fee"]
+
+
+def _sales(n: int = 400) -> tuple[pd.DataFrame, pd.Series]:
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(
+        {
+            "area": rng.uniform(20, 150, n),
+            "rooms": rng.integers(1, 6, n).astype(float),
+            "district": rng.choice(DISTRICTS, n),
+            "year_built": rng.integers(1900, 2024, n).astype(float),
+            "monthly_fee": rng.uniform(1500, 7000, n),
+        }
+    )
+    return X, pd.Series(60000 + X["area"] * 10, name="price_per_sqm")
+
+
+def test_index_matches_brute_force_within_district_and_across_for_unknown() -> None:
+    X, y = _sales()
+    values = X[NUMERIC].to_numpy()
+    index = build_comparables_index(
+        values, X[NUMERIC], y, districts=X["district"], target_col="price_per_sqm"
+    )
+    z = (values - values.mean(axis=0)) / values.std(axis=0)
+    query = np.array([65.0, 2.0, 1998.0, 3200.0])
+    zq = (query - values.mean(axis=0)) / values.std(axis=0)
+    dist = np.sqrt(((z - zq) ** 2).sum(axis=1))
+
+    found = index.query(query, "Vasastan", 5)
+    in_district = np.where(X["district"] == "Vasastan", dist, np.inf)
+    assert [c["distance"] for c in found] == pytest.approx(np.sort(in_district)[:5])
+    assert {c["district"] for c in found} == {"Vasastan"}
+    assert found[0]["target"] == pytest.approx(60000 + found[0]["features"]["area"] * 10, rel=1e-6)
+
+    anywhere = index.query(query, "Atlantis", 5)
+    assert [c["distance"] for c in anywhere] == pytest.approx(np.sort(dist)[:5])
+
+
+def test_comparables_endpoint(artifacts_dir: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    from spi_api.main import create_app
+
+    payload = {
+        "area": 65,
+        "rooms": 2,
+        "district": "Södermalm",
+        "year_built": 1998,
+        "monthly_fee": 3200,
+    }
+    with TestClient(create_app()) as client:
+        assert client.post("/comparables", json=payload).status_code == 404
+
+    X, y = _sales()
+    pre = joblib.load(artifacts_dir / "preprocessor.pkl")
+    index = build_comparables_index(
+        pre.named_transformers_["num"].transform(X[NUMERIC]),
+        X[NUMERIC],
+        y,
+        districts=X["district"],
+        target_col="price_per_sqm",
+    )
+    joblib.dump(index, artifacts_dir / "comparables.pkl")
+    monkeypatch.setenv("COMPARABLES_PATH", str(artifacts_dir / "comparables.pkl"))
+
+    with TestClient(create_app()) as client:
+        resp = client.post("/comparables?k=3", json=payload)
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["target_col"] == "price_per_sqm"
+        assert len(body["comparables"]) == 3
+        distances = [c["distance"] for c in body["comparables"]]
+        assert distances == sorted(distances)
+        assert all(c["district"] == "Södermalm" for c in body["comparables"])
+        assert body["query_ms"] >= 0
+        assert client.post("/comparables?k=0", json=payload).status_code == 422
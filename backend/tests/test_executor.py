@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+PAYLOAD = {
+    "area": 65,
+    "rooms": 2,
+    "district": "Södermalm",
+    "year_built": 1998,
+    "monthly_fee": 3200,
+}
+
+
+def test_process_executor_matches_in_process_predictions(
+    artifacts_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from spi_api.main import create_app
+
+    trend = {"request": PAYLOAD, "feature": "transaction_year", "start": 2015, "stop": 2020}
+    with TestClient(create_app()) as client:
+        expected = client.post("/predict", json=PAYLOAD).json()
+        expected_trend = client.post("/predict/trend", json=trend).json()
+
+    monkeypatch.setenv("INFERENCE_EXECUTOR", "process")
+    monkeypatch.setenv("INFERENCE_WORKERS", "1")
+    with TestClient(create_app()) as client:
+        got = client.post("/predict", json=PAYLOAD).json()
+        got_trend = client.post("/predict/trend", json=trend).json()
+
+    assert got["predicted_price_per_sqm"] == pytest.approx(expected["predicted_price_per_sqm"])
+    assert [p["predicted_total_price"] for p in got_trend["points"]] == pytest.approx(
+        [p["predicted_total_price"] for p in expected_trend["points"]]
+    )
+
+
+def test_process_executor_recovers_from_a_killed_worker(artifacts_dir: Path) -> None:
+    import os
+    import signal
+
+    from spi_api.executor import InferenceExecutor
+    from spi_api.inference import frame_from_rows
+
+    X_df = frame_from_rows([{**PAYLOAD, "transaction_year": None}])
+    executor = InferenceExecutor(1)
+    try:
+        executor.start()
+        expected = executor.predict(X_df)
+        for pid in list(executor._pool._processes):
+            os.kill(pid, signal.SIGKILL)
+
+        assert executor.predict(X_df) == pytest.approx(expected)
+        assert executor.restarts == 1
+    finally:
+        executor.shutdown()
+
+
+def test_process_executor_starts_every_worker(artifacts_dir: Path) -> None:
+    from spi_api.executor import InferenceExecutor
+
+    executor = InferenceExecutor(3)
+    try:
+        executor.start()
+        processes = dict(executor._pool._processes)
+        assert len(processes) == 3
+        assert all(p.is_alive() for p in processes.values())
+    finally:
+        executor.shutdown()
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import itertools
+import math
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+
+from spi_train.preprocessing import build_preprocessor, output_feature_groups
+from spi_train.treeshap import build_tree_explainer
+
+PAYLOAD = {
+    "area": 65,
+    "rooms": 2,
+    "district": "Södermalm",
+    "year_built": 1998,
+    "monthly_fee": 3200,
+}
+
+
+def _frame(n: int = 300) -> tuple[pd.DataFrame, np.ndarray]:
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(
+        {
+            "area": rng.uniform(20, 150, n),
+            "rooms": rng.integers(1, 6, n).astype(float),
+            "district": rng.choice(["Södermalm", "Vasastan", "Bromma", "Farsta"], n),
+        }
+    )
+    y = 50000 + X["area"] * 100 * np.where(X["district"] == "Bromma", 0.5, 1.0) + X["rooms"] * 900
+    return X, y.to_numpy()
+
+
+def _expected_value(tree, x: np.ndarray, columns: set[int], node: int = 0) -> float:
+    # E[f(x) | x_S] for the columns in S, weighting unknown splits by training cover
+    t = tree.tree_
+    left, right = t.children_left[node], t.children_right[node]
+    if left == -1:
+        return float(t.value[node, 0, 0])
+    if t.feature[node] in columns:
+        child = left if np.float32(x[t.feature[node]]) <= t.threshold[node] else right
+        return _expected_value(tree, x, columns, child)
+    cover = t.weighted_n_node_samples
+    return (
+        cover[left] * _expected_value(tree, x, columns, left)
+        + cover[right] * _expected_value(tree, x, columns, right)
+    ) / cover[node]
+
+
+def _brute_force_shap(model, x: np.ndarray, groups: np.ndarray, n_groups: int) -> np.ndarray:
+    def value(subset: tuple[int, ...]) -> float:
+        columns = {c for c, g in enumerate(groups) if g in subset}
+        return float(np.mean([_expected_value(t, x, columns) for t in model.estimators_]))
+
+    phi = np.zeros(n_groups)
+    for i in range(n_groups):
+        others = [g for g in range(n_groups) if g != i]
+        for size in range(n_groups):
+            weight = math.factorial(size) * math.factorial(n_groups - size - 1)
+            weight /= math.factorial(n_groups)
+            for subset in itertools.combinations(others, size):
+                phi[i] += weight * (value((*subset, i)) - value(subset))
+    return phi
+
+
+def test_forest_shap_matches_brute_force_with_one_hot_folded_into_district() -> None:
+    X, y = _frame()
+    pre = build_preprocessor(numeric_features=["area", "rooms"], categorical_features=["district"])
+    Xt = pre.fit_transform(X)
+    model = RandomForestRegressor(n_estimators=4, max_depth=5, random_state=0).fit(Xt, y)
+    groups, names = output_feature_groups(pre)
+    assert names == ["area", "rooms", "district"]
+
+    explainer = build_tree_explainer(model, feature_groups=groups, group_names=names)
+    x = np.asarray(Xt[:3].toarray() if hasattr(Xt, "toarray") else Xt[:3])
+    phi = explainer.shap_values(x)
+
+    assert phi.sum(axis=1) + explainer.base_value == pytest.approx(model.predict(x))
+    for row in range(3):
+        expected = _brute_force_shap(model, x[row], groups, len(names))
+        assert phi[row] == pytest.approx(expected, rel=1e-9, abs=1e-6)
+
+
+def test_hgb_native_categorical_shap_is_additive() -> None:
+    X, y = _frame()
+    pre = build_preprocessor(
+        numeric_features=["area", "rooms"], categorical_features=["district"], encoding="ordinal"
+    )
+    Xt = pre.fit_transform(X)
+    model = HistGradientBoostingRegressor(max_iter=30, categorical_features=[2]).fit(Xt, y)
+    groups, names = output_feature_groups(pre)
+
+    explainer = build_tree_explainer(model, feature_groups=groups, group_names=names)
+    phi = explainer.shap_values(Xt[:20])
+
+    assert phi.sum(axis=1) + explainer.base_value == pytest.approx(model.predict(Xt[:20]))
+    assert np.abs(phi[:, names.index("district")]).max() > 0
+
+
+def test_explain_endpoints(artifacts_dir: Path) -> None:
+    from spi_api.main import create_app
+
+    other = {**PAYLOAD, "district": "Kungsholmen", "area": 90}
+    with TestClient(create_app()) as client:
+        predicted = client.post("/predict", json=PAYLOAD).json()
+        resp = client.post("/explain", json=PAYLOAD)
+        assert resp.status_code == 200
+        body = resp.json()
+        assert set(body["contributions"]) == {
+            "area",
+            "rooms",
+            "year_built",
+            "monthly_fee",
+            "district",
+        }
+        assert body["base_value"] + sum(body["contributions"].values()) == pytest.approx(
+            body["prediction"]
+        )
+        assert body["prediction"] == pytest.approx(predicted["predicted_price_per_sqm"])
+
+        batch = client.post("/explain/batch", json={"requests": [PAYLOAD, other]}).json()
+        assert len(batch["explanations"]) == 2
+        assert batch["explanations"][0]["contributions"] == pytest.approx(body["contributions"])
+        assert client.post("/explain/batch", json={"requests": []}).status_code == 422
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+QUERY = "area=65&rooms=2&district=S%C3%B6dermalm&year_built=1998&monthly_fee=3200"
+PAYLOAD = {
+    "area": 65,
+    "rooms": 2,
+    "district": "Södermalm",
+    "year_built": 1998,
+    "monthly_fee": 3200,
+}
+
+
+def test_model_info_etag_and_refresh_on_metrics_change(
+    artifacts_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from spi_api.main import create_app
+
+    metrics = artifacts_dir / "latest.json"
+    metrics.write_text(json.dumps({"run": {"mean_mae": 1.0}}), encoding="utf-8")
+    monkeypatch.setenv("METRICS_PATH", str(metrics))
+
+    with TestClient(create_app()) as client:
+        first = client.get("/model-info")
+        etag = first.headers["etag"]
+        assert first.json()["metrics"]["mean_mae"] == 1.0
+
+        cached = client.get("/model-info", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.headers["etag"] == etag
+
+        metrics.write_text(json.dumps({"run": {"mean_mae": 2.5}}), encoding="utf-8")
+        refreshed = client.get("/model-info", headers={"If-None-Match": etag})
+        assert refreshed.status_code == 200
+        assert refreshed.headers["etag"] != etag
+        assert refreshed.json()["metrics"]["mean_mae"] == 2.5
+
+
+def test_get_predict_is_cacheable_and_canonical(artifacts_dir: Path) -> None:
+    from spi_api.main import create_app
+
+    with TestClient(create_app()) as client:
+        posted = client.post("/predict", json=PAYLOAD).json()
+        resp = client.get(f"/predict?{QUERY}")
+        assert resp.status_code == 200
+        assert resp.json()["predicted_price_per_sqm"] == pytest.approx(
+            posted["predicted_price_per_sqm"]
+        )
+        assert resp.headers["cache-control"] == "public, max-age=3600"
+        assert resp.headers["content-location"].startswith("/predict?area=65.0&district=")
+
+        # Same inputs in another order and number format share the ETag
+        reordered = client.get(
+            "/predict?monthly_fee=3200.0&year_built=1998&district=S%C3%B6dermalm"
+            "&rooms=2.0&area=65.0"
+        )
+        assert reordered.headers["etag"] == resp.headers["etag"]
+        assert reordered.headers["content-location"] == resp.headers["content-location"]
+
+        cached = client.get(f"/predict?{QUERY}", headers={"If-None-Match": resp.headers["etag"]})
+        assert cached.status_code == 304
+        assert cached.content == b""
+
+        assert client.get(f"/predict?{QUERY}&interval=0.8").headers["etag"] != resp.headers["etag"]
+        assert client.get("/predict?area=65").status_code == 422
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.ensemble import RandomForestRegressor
+
+from spi_train.config import ModelSpec
+from spi_train.models import build_quantile_pair
+from spi_train.tree_arrays import flatten_forest
+
+PAYLOAD = {
+    "area": 65,
+    "rooms": 2,
+    "district": "Södermalm",
+    "year_built": 1998,
+    "monthly_fee": 3200,
+}
+
+
+def test_flat_forest_matches_sklearn_predictions() -> None:
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(500, 4))
+    X[::25, 1] = np.nan
+    y = X[:, 0] * 3 + rng.normal(size=500)
+    model = RandomForestRegressor(n_estimators=20, max_depth=8, random_state=0).fit(X, y)
+
+    forest = flatten_forest(model)
+    X_new = rng.normal(size=(100, 4))
+    X_new[::9, 1] = np.nan
+
+    per_tree = forest.predict_per_tree(X_new)
+    assert per_tree.shape == (20, 100)
+    np.testing.assert_allclose(per_tree[3], model.estimators_[3].predict(X_new))
+    np.testing.assert_allclose(forest.predict(X_new), model.predict(X_new))
+
+
+def test_predict_returns_forest_interval_on_request(artifacts_dir: Path) -> None:
+    from spi_api.main import create_app
+
+    app = create_app()
+    with TestClient(app) as client:
+        plain = client.post("/predict", json=PAYLOAD).json()
+        assert plain["prediction_interval"] is None
+
+        resp = client.post("/predict?interval=0.8", json=PAYLOAD)
+        assert resp.status_code == 200
+        body = resp.json()
+        band = body["prediction_interval"]
+        assert band["level"] == 0.8
+        assert band["lower_price_per_sqm"] <= band["upper_price_per_sqm"]
+        assert band["lower_total_price"] == pytest.approx(band["lower_price_per_sqm"] * 65)
+        assert body["predicted_price_per_sqm"] == pytest.approx(plain["predicted_price_per_sqm"])
+
+        assert client.post("/predict?interval=1.5", json=PAYLOAD).status_code == 422
+
+
+def test_flat_forest_is_built_on_first_use(artifacts_dir: Path) -> None:
+    from spi_api.model_loader import load_artifacts
+
+    artifacts = load_artifacts()
+    assert "forest" not in vars(artifacts)
+    assert artifacts.forest is artifacts.forest
+    assert artifacts.forest.n_trees == 10
+
+
+def test_predict_uses_quantile_pair_when_configured(
+    artifacts_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from spi_api.main import create_app
+
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(
+        {
+            "area": rng.uniform(30, 120, 200),
+            "rooms": rng.integers(1, 5, 200),
+            "district": rng.choice(["Södermalm", "Kungsholmen"], 200),
+            "year_built": rng.integers(1950, 2020, 200),
+            "monthly_fee": rng.uniform(2000, 5000, 200),
+        }
+    )
+    y = 60000 + rng.normal(0, 5000, 200)
+    pre = joblib.load(artifacts_dir / "preprocessor.pkl")
+    spec = ModelSpec(type="hist_gradient_boosting", params={"max_iter": 30})
+    lower, upper = build_quantile_pair(spec, level=0.9, random_state=0)
+    X_t = pre.transform(X)
+    interval_path = artifacts_dir / "interval.pkl"
+    joblib.dump(
+        {"level": 0.9, "lower": lower.fit(X_t, y), "upper": upper.fit(X_t, y)}, interval_path
+    )
+    monkeypatch.setenv("INTERVAL_MODEL_PATH", str(interval_path))
+
+    app = create_app()
+    with TestClient(app) as client:
+        band = client.post("/predict?interval=0.5", json=PAYLOAD).json()["prediction_interval"]
+        # The trained pair fixes the level
+        assert band["level"] == 0.9
+        assert band["lower_price_per_sqm"] < band["upper_price_per_sqm"]
+
+
+def test_float32_thresholds_keep_routing_exact() -> None:
+    from spi_train.compression import compress_forest
+    from spi_train.config import CompressionConfig
+
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(400, 4)).astype(np.float32).astype(float)
+    y = X[:, 0] * 3 + X[:, 1] ** 2
+    model = RandomForestRegressor(n_estimators=10, random_state=0).fit(X, y)
+    cfg = CompressionConfig(
+        enabled=True,
+        prune_min_gain=0.0,
+        threshold_dtype="float32",
+        leaf_dtype="float64",
+        max_fidelity_loss=None,
+        sample_rows=400,
+    )
+    forest, info = compress_forest(model, X, cfg)
+
+    # Training rows sit exactly next to split midpoints, the worst case for rounding
+    np.testing.assert_array_equal(forest.predict(X), model.predict(X))
+    assert info["n_trees"]["compressed"] == 10
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from spi_api.logging_utils import ColumnarSink, JsonlSink, read_columnar_log
+from spi_api.monitoring import summarize_logs
+
+PAYLOAD = {
+    "area": 65,
+    "rooms": 2,
+    "district": "Södermalm",
+    "year_built": 1998,
+    "monthly_fee": 3200,
+}
+
+
+def _record(i: int) -> dict:
+    return {
+        "request": {
+            "area": 40.0 + i,
+            "rooms": 2.0,
+            "district": ["Södermalm", "Bromma"][i % 2],
+            "year_built": 1990,
+            "monthly_fee": 3000.0,
+            "transaction_year": None if i % 3 else 2023,
+        },
+        "predicted_price_per_sqm": 60000.0 + i,
+        "predicted_total_price": (60000.0 + i) * (40 + i),
+        "model_version": "v1",
+        "inference_ms": 1.5,
+    }
+
+
+def test_columnar_sink_round_trips_with_projection(tmp_path: Path) -> None:
+    path = tmp_path / "logs" / "predictions.spilog"
+    fallback = tmp_path / "logs" / "predictions.jsonl"
+    sink = ColumnarSink(str(path), fallback=JsonlSink(str(fallback)), batch_rows=4)
+    for i in range(10):
+        sink.write(_record(i))
+    sink.write({"endpoint": "sensitivity", "request": _record(0)["request"], "shape": [2]})
+    sink.close()
+
+    cols = read_columnar_log(path, ["district", "predicted_price_per_sqm", "transaction_year"])
+    assert list(cols) == ["district", "predicted_price_per_sqm", "transaction_year"]
+    assert cols["district"].tolist() == [["Södermalm", "Bromma"][i % 2] for i in range(10)]
+    np.testing.assert_array_equal(cols["predicted_price_per_sqm"], 60000.0 + np.arange(10))
+    assert cols["transaction_year"].tolist()[:4] == [2023, -1, -1, 2023]
+    assert len(fallback.read_text(encoding="utf-8").splitlines()) == 1
+
+    # A partially written trailing block is dropped by readers and repaired on append
+    with open(path, "ab") as f:
+        f.write(b"SPIB\x05\x00")
+    assert len(read_columnar_log(path, ["ts"])["ts"]) == 10
+    sink = ColumnarSink(str(path), fallback=JsonlSink(str(fallback)), batch_rows=1)
+    sink.write(_record(10))
+    sink.close()
+    assert len(read_columnar_log(path, ["area"])["area"]) == 11
+
+    summary = summarize_logs([path]).to_dict()
+    assert summary["records"] == 11
+    assert summary["districts"] == {"Södermalm": 6, "Bromma": 5}
+
+
+def test_api_writes_columnar_log_when_configured(
+    artifacts_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from spi_api.main import create_app
+
+    monkeypatch.setenv("PREDICTION_LOG_FORMAT", "columnar")
+    app = create_app()
+    with TestClient(app) as client:
+        for _ in range(3):
+            assert client.post("/predict", json=PAYLOAD).status_code == 200
+        client.post(
+            "/predict/trend",
+            json={"request": PAYLOAD, "feature": "area", "start": 40, "stop": 60, "step": 10},
+        )
+
+    cols = read_columnar_log(artifacts_dir / "predictions.spilog", ["model_version", "area"])
+    assert cols["model_version"].tolist() == ["test"] * 3
+    assert cols["area"].tolist() == [65.0] * 3
+    other = (artifacts_dir / "predictions.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["endpoint"] for line in other] == ["predict/trend"]
+
+
+def test_columnar_log_is_counted_once_with_workers(tmp_path: Path) -> None:
+    # Large enough that a JSONL file of this size would be split across both workers
+    path = tmp_path / "predictions.spilog"
+    sink = ColumnarSink(str(path), fallback=JsonlSink(str(tmp_path / "p.jsonl")), batch_rows=4096)
+    n = 0
+    while n == 0 or path.stat().st_size < 2 * 1024 * 1024:
+        for i in range(4096):
+            sink.write(_record(i))
+        n += 4096
+    sink.close()
+
+    summary = summarize_logs([path], workers=2).to_dict()
+    assert summary["records"] == n
+
+
+def test_columnar_sink_survives_oversized_district(
+    tmp_path: Path, artifacts_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = tmp_path / "predictions.spilog"
+    sink = ColumnarSink(str(path), fallback=JsonlSink(str(tmp_path / "p.jsonl")), batch_rows=1)
+    record = _record(0)
+    sink.write({**record, "request": {**record["request"], "district": "Å" * 40000}})
+    sink.write(_record(1))
+    sink.close()
+    districts = read_columnar_log(path, ["district"])["district"].tolist()
+    assert len(districts[0].encode("utf-8")) <= 1024
+    assert districts[1] == "Bromma"
+
+    from spi_api.main import create_app
+
+    monkeypatch.setenv("PREDICTION_LOG_FORMAT", "columnar")
+    with TestClient(create_app()) as client:
+        resp = client.post("/predict", json={**PAYLOAD, "district": "x" * 70000})
+        assert resp.status_code == 422
+        assert client.post("/predict", json=PAYLOAD).status_code == 200
+
+
+def test_columnar_sink_flushes_on_a_timer_when_traffic_stops(tmp_path: Path) -> None:
+    path = tmp_path / "p.spilog"
+    sink = ColumnarSink(
+        str(path),
+        fallback=JsonlSink(str(tmp_path / "p.jsonl")),
+        batch_rows=100,
+        flush_interval_s=0.05,
+    )
+    for i in range(3):
+        sink.write(_record(i))
+    deadline = time.monotonic() + 5.0
+    while not (path.exists() and path.stat().st_size) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # Written by the timer, before close()
+    assert len(read_columnar_log(path, ["area"])["area"]) == 3
+    sink.close()
+    assert len(read_columnar_log(path, ["area"])["area"]) == 3
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from spi_api.monitoring import drift_report, summarize_segment
+from spi_train.sketches import HyperLogLog, QuantileSketch, feature_profile
+
+DISTRICTS = ["Södermalm", "Kungsholmen", "Bromma"]
+
+
+def test_quantile_sketch_is_accurate_and_mergeable() -> None:
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(3, 1, 50_000)
+    whole = QuantileSketch(0.01)
+    whole.add_many(values)
+    a, b = QuantileSketch(0.01), QuantileSketch(0.01)
+    a.add_many(values[:20_000])
+    b.add_many(values[20_000:])
+    a.merge(b)
+
+    qs = [0.5, 0.9, 0.99]
+    exact = np.quantile(values, qs)
+    np.testing.assert_allclose(whole.quantiles(qs), exact, rtol=0.02)
+    assert a.quantiles(qs) == whole.quantiles(qs)
+    assert QuantileSketch.from_dict(whole.to_dict()).quantiles(qs) == whole.quantiles(qs)
+
+
+def test_hyperloglog_estimates_distinct_count() -> None:
+    a, b = HyperLogLog(), HyperLogLog()
+    a.add_many(range(0, 30_000))
+    b.add_many(range(20_000, 50_000))
+    a.merge(b)
+    assert a.estimate() == pytest.approx(50_000, rel=0.05)
+
+
+def _write_log(path: Path, rng: np.random.Generator, n: int, area_mean: float) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            request = {
+                "area": float(rng.normal(area_mean, 10)),
+                "rooms": 2.0,
+                "district": DISTRICTS[i % 3],
+                "year_built": 1990,
+                "monthly_fee": 3000.0,
+                "transaction_year": None,
+            }
+            record = {"ts": f"2026-01-01T00:00:{i:06d}", "request": request, "inference_ms": 2.0}
+            if i % 50 == 0:
+                record.update(endpoint="predict/trend", sweep={"feature": "area", "values": [1]})
+            else:
+                record["predicted_price_per_sqm"] = 60000.0 + i
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.write("not json\n")
+        f.write(json.dumps({"endpoint": "predict/bulk", "rows": 1000, "errors": 2}) + "\n")
+
+
+def test_log_summary_segments_merge_and_drift(tmp_path: Path) -> None:
+    rng = np.random.default_rng(0)
+    train = pd.DataFrame(
+        {
+            "area": rng.normal(60, 10, 5000),
+            "district": rng.choice(DISTRICTS, 5000),
+        }
+    )
+    profile = feature_profile(train, numeric_features=["area"], categorical_features=["district"])
+
+    same = tmp_path / "same.jsonl"
+    shifted = tmp_path / "shifted.jsonl"
+    _write_log(same, rng, 3000, 60)
+    _write_log(shifted, rng, 3000, 90)
+
+    whole = summarize_segment(same, profile=profile)
+    size = same.stat().st_size
+    parts = summarize_segment(same, 0, 12345, profile)
+    parts.merge(summarize_segment(same, 12345, size // 2, profile))
+    parts.merge(summarize_segment(same, size // 2, size, profile))
+    assert parts.to_dict() == whole.to_dict()
+
+    summary = whole.to_dict()
+    assert summary["records"] == 3001
+    assert summary["bad_lines"] == 1
+    assert summary["bulk_rows"] == 1000
+    assert summary["endpoints"] == {"predict": 2940, "predict/trend": 60, "predict/bulk": 1}
+    assert summary["districts"]["Bromma"] == 1000
+
+    stable = drift_report(whole, profile)
+    assert stable["area"]["status"] == "stable"
+    assert stable["district"]["status"] == "stable"
+    drifted = drift_report(summarize_segment(shifted, profile=profile), profile)
+    assert drifted["area"]["status"] == "drift"
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import importlib.util
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+SCRIPT = Path(__file__).resolve().parents[1] / "scripts" / "score_file.py"
+
+
+def _load_script(monkeypatch: pytest.MonkeyPatch):
+    spec = importlib.util.spec_from_file_location("score_file", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    # Registered so worker processes can unpickle score_chunk by name
+    monkeypatch.setitem(sys.modules, "score_file", module)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _crash(*args) -> None:
+    raise KeyboardInterrupt
+
+
+def _run(module, monkeypatch: pytest.MonkeyPatch, *args: str) -> int:
+    monkeypatch.setattr(sys, "argv", ["score_file.py", *args])
+    return module.main()
+
+
+def test_resume_rescores_only_missing_chunks(
+    artifacts_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    score_file = _load_script(monkeypatch)
+    in_path = artifacts_dir / "stock.csv"
+    pd.DataFrame(
+        {
+            "area": [50, 65, 80, 95, 110],
+            "rooms": [2, 2, 3, 4, 4],
+            "district": ["Södermalm", "Kungsholmen", "Södermalm", "Bromma", "Södermalm"],
+            "year_built": [1990, 1998, 2005, 1960, 2010],
+            "monthly_fee": [3000, 3200, 4500, 5000, 5200],
+            'note, "quoted"': ["a", "b,c", "d", "e", "f"],
+        }
+    ).to_csv(in_path, index=False)
+    common = [str(in_path), "--chunk-rows", "2", "--workers", "1"]
+
+    full_path = artifacts_dir / "full.csv"
+    assert _run(score_file, monkeypatch, *common, "--output", str(full_path)) == 0
+    full = pd.read_csv(full_path)
+    assert list(full.columns)[-4:] == [
+        'note, "quoted"',
+        "predicted_price_per_sqm",
+        "predicted_total_price",
+        "error",
+    ]
+    assert full["error"].isna().all()
+    assert full['note, "quoted"'].tolist() == ["a", "b,c", "d", "e", "f"]
+
+    # Crash before the parts are concatenated, then lose the middle chunk's part
+    out_path = artifacts_dir / "resumed.csv"
+    with monkeypatch.context() as m:
+        m.setattr(score_file, "_concat_parts", _crash)
+        with pytest.raises(KeyboardInterrupt):
+            _run(score_file, monkeypatch, *common, "--output", str(out_path))
+    parts_dir = artifacts_dir / "resumed.csv.parts"
+    (parts_dir / "part_000001.csv").unlink()
+    first_part = (parts_dir / "part_000000.csv").read_bytes()
+
+    starts = []
+    iter_chunks = score_file.iter_chunks
+
+    def tracked(path, chunk_rows, start_chunk=0):
+        starts.append(start_chunk)
+        return iter_chunks(path, chunk_rows, start_chunk)
+
+    monkeypatch.setattr(score_file, "iter_chunks", tracked)
+    assert _run(score_file, monkeypatch, *common, "--output", str(out_path), "--resume") == 0
+    assert starts == [1]
+    pd.testing.assert_frame_equal(pd.read_csv(out_path), full)
+    assert out_path.read_bytes().count(first_part) == 1
+    assert not parts_dir.exists()
+
+
+def test_invalid_values_fail_their_row_only(
+    artifacts_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    score_file = _load_script(monkeypatch)
+    in_path = artifacts_dir / "stock.csv"
+    pd.DataFrame(
+        {
+            "area": ["50", "large", "80"],
+            "rooms": [2, 2, None],
+            "district": ["Södermalm", "Kungsholmen", "Bromma"],
+            "year_built": [1990, 1998, 2005],
+            "monthly_fee": [3000, 3200, 4500],
+        }
+    ).to_csv(in_path, index=False)
+    out_path = artifacts_dir / "scored.csv"
+
+    assert _run(score_file, monkeypatch, str(in_path), "--output", str(out_path)) == 0
+
+    out = pd.read_csv(out_path)
+    assert out["predicted_price_per_sqm"].isna().tolist() == [False, True, False]
+    assert out["error"].tolist()[1] == "non-numeric area"
+    assert out["error"].isna().tolist() == [True, False, True]
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from spi_train.config import load_params
+from spi_train.search import run_search, rung_schedule, sample_params
+
+RF_18 = {"rf": {"type": "random_forest", "n_estimators": 18}}
+
+
+def test_sample_params_respects_distributions() -> None:
+    rng = np.random.default_rng(0)
+    dists = {
+        "depth": {"low": 2, "high": 9, "int": True},
+        "lr": {"low": 0.01, "high": 1.0, "log": True},
+        "max_features": [None, "sqrt"],
+    }
+    for _ in range(50):
+        p = sample_params(dists, rng)
+        assert isinstance(p["depth"], int) and 2 <= p["depth"] <= 9
+        assert 0.01 <= p["lr"] <= 1.0
+        assert p["max_features"] in (None, "sqrt")
+
+
+def test_rung_schedule_grows_rows_and_trees_to_the_full_budget(
+    write_params: Callable[..., Path],
+) -> None:
+    params = load_params(write_params(search={"eta": 3, "n_rungs": 3, "min_rows": 100}))
+
+    assert rung_schedule(9000, 300, params.search) == [(1000, 33), (3000, 100), (9000, 300)]
+    assert rung_schedule(600, 300, params.search)[0] == (100, 33)
+
+
+def test_successive_halving_writes_trace_and_winner(
+    tmp_path: Path, train_csv: Path, write_params: Callable[..., Path]
+) -> None:
+    search = {
+        "n_candidates": 9,
+        "eta": 3,
+        "n_rungs": 2,
+        "min_rows": 150,
+        "early_stop_margin": 0.0,
+        "n_jobs": 1,
+        "distributions": {"random_forest": {"max_depth": [1, 2, 8]}},
+    }
+    params = load_params(write_params(models=RF_18, search=search))
+
+    before = datetime.now(timezone.utc)
+    report, out_path = run_search(params=params, model_name="rf", repo_root=tmp_path)
+    after = datetime.now(timezone.utc)
+
+    # started_at_utc is stamped before the search, so it plus the duration ends by `after`
+    started = datetime.fromisoformat(report["started_at_utc"])
+    assert before <= started
+    assert started + timedelta(seconds=report["duration_s"]) <= after + timedelta(seconds=0.05)
+    assert out_path.parent == tmp_path / "reports"
+    assert json.loads(out_path.read_text(encoding="utf-8"))["winner"] == report["winner"]
+    assert [r["candidates"] for r in report["rungs"]] == [9, 3]
+    # 300 / eta rows, raised to min_rows
+    assert report["rungs"][0]["rows"] == 150
+    statuses = {t["status"] for t in report["trace"]}
+    assert "stopped" in statuses and "winner" in statuses
+    # Stopped candidates were scored on their first fold only
+    assert all(len(t["fold_scores"]) == 1 for t in report["trace"] if t["status"] == "stopped")
+    assert report["winner"]["spec"] == {"type": "random_forest", "n_estimators": 18, "max_depth": 8}
+
+
+def test_search_rejects_models_without_a_tree_budget(
+    tmp_path: Path, train_csv: Path, write_params: Callable[..., Path]
+) -> None:
+    params = load_params(write_params())
+
+    with pytest.raises(ValueError, match="Search supports"):
+        run_search(params=params, model_name="baseline", repo_root=tmp_path)
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+BASE = {
+    "area": 65,
+    "rooms": 2,
+    "district": "Södermalm",
+    "year_built": 1998,
+    "monthly_fee": 3200,
+}
+
+
+def test_two_axis_grid_matches_single_predictions(artifacts_dir: Path) -> None:
+    from spi_api.main import create_app
+
+    areas = [40, 80, 120]
+    districts = ["Södermalm", "Kungsholmen"]
+    app = create_app()
+    with TestClient(app) as client:
+        resp = client.post(
+            "/sensitivity",
+            json={
+                "request": BASE,
+                "axes": [
+                    {"feature": "area", "values": areas},
+                    {"feature": "district", "values": districts},
+                ],
+            },
+        )
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["shape"] == [3, 2]
+        assert set(body["timing"]) == {"transform_ms", "predict_ms", "total_ms"}
+
+        for i, area in enumerate(areas):
+            for j, district in enumerate(districts):
+                single = client.post(
+                    "/predict", json={**BASE, "area": area, "district": district}
+                ).json()
+                cell = i * 2 + j
+                assert body["predicted_price_per_sqm"][cell] == pytest.approx(
+                    single["predicted_price_per_sqm"]
+                )
+                assert body["predicted_total_price"][cell] == pytest.approx(
+                    single["predicted_total_price"]
+                )
+
+
+def test_grid_size_limit(artifacts_dir: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    from spi_api.main import create_app
+
+    monkeypatch.setenv("SENSITIVITY_MAX_CELLS", "10")
+    app = create_app()
+    with TestClient(app) as client:
+        resp = client.post(
+            "/sensitivity",
+            json={
+                "request": BASE,
+                "axes": [
+                    {"feature": "area", "values": [40, 50, 60, 70]},
+                    {"feature": "monthly_fee", "values": [1000, 2000, 3000]},
+                ],
+            },
+        )
+        assert resp.status_code == 422
+
+
+@pytest.mark.parametrize(
+    "axes",
+    [
+        [],
+        [{"feature": "area", "values": [40]}, {"feature": "area", "values": [50]}],
+        [{"feature": "area", "values": [0, 50]}],
+        [{"feature": "year_built", "values": [1990.5]}],
+        [{"feature": "area", "values": list(range(1, 300))}],
+    ],
+)
+def test_invalid_axes_return_422(artifacts_dir: Path, axes: list) -> None:
+    from spi_api.main import create_app
+
+    app = create_app()
+    with TestClient(app) as client:
+        resp = client.post("/sensitivity", json={"request": BASE, "axes": axes})
+        assert resp.status_code == 422
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+PAYLOAD = {
+    "area": 65,
+    "rooms": 2,
+    "district": "Södermalm",
+    "year_built": 1998,
+    "monthly_fee": 3200,
+}
+
+CALLS = [
+    ("/predict", PAYLOAD),
+    ("/predict?interval=0.8", PAYLOAD),
+    ("/predict/trend", {"request": PAYLOAD, "feature": "area", "start": 40, "stop": 60}),
+    ("/sensitivity", {"request": PAYLOAD, "axes": [{"feature": "rooms", "values": [1, 2]}]}),
+]
+
+
+def _responses(monkeypatch: pytest.MonkeyPatch, fast: str) -> list[dict]:
+    from spi_api.main import create_app
+
+    monkeypatch.setenv("SPI_FAST_SERIALIZATION", fast)
+    with TestClient(create_app()) as client:
+        out = []
+        for url, body in CALLS:
+            resp = client.post(url, json=body)
+            assert resp.status_code == 200
+            assert resp.headers["content-type"].startswith("application/json")
+            out.append(resp.json())
+        return out
+
+
+def _without_timings(body: dict) -> dict:
+    return {k: v for k, v in body.items() if k not in {"inference_ms", "timing"}}
+
+
+def test_fast_serialization_matches_default_responses(
+    artifacts_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    default = _responses(monkeypatch, "0")
+    fast = _responses(monkeypatch, "1")
+    for a, b in zip(default, fast, strict=True):
+        assert _without_timings(a) == _without_timings(b)
+
+    log_lines = (artifacts_dir / "predictions.jsonl").read_text(encoding="utf-8").splitlines()
+    assert len(log_lines) == 2 * len(CALLS)
+    assert json.loads(log_lines[-1])["request"]["district"] == "Södermalm"
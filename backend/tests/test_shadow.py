@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import joblib
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.dummy import DummyRegressor
+
+from spi_api.logging_utils import JsonlSink
+from spi_api.model_loader import load_artifacts
+from spi_api.shadow import ShadowScorer, load_candidates
+
+PAYLOAD = {
+    "area": 65,
+    "rooms": 2,
+    "district": "Södermalm",
+    "year_built": 1998,
+    "monthly_fee": 3200,
+}
+
+
+def _constant_model(path: Path, value: float) -> Path:
+    model = DummyRegressor(strategy="constant", constant=value).fit([[0.0]], [value])
+    joblib.dump(model, path)
+    return path
+
+
+def test_predict_is_shadow_scored_into_separate_log(
+    artifacts_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from spi_api.main import create_app
+
+    shadow_log = artifacts_dir / "shadow.jsonl"
+    candidate = _constant_model(artifacts_dir / "model_v2.pkl", 50000.0)
+    monkeypatch.setenv("SHADOW_MODELS", f"v2={candidate}")
+    monkeypatch.setenv("SHADOW_LOG_PATH", str(shadow_log))
+    monkeypatch.setenv("SHADOW_FLUSH_S", "0.01")
+
+    with TestClient(create_app()) as client:
+        primary = [client.post("/predict", json=PAYLOAD).json() for _ in range(3)]
+    # Leaving the client closes the scorer, which drains the queue first
+    records = [json.loads(line) for line in shadow_log.read_text(encoding="utf-8").splitlines()]
+
+    assert len(records) == 3
+    for rec, resp in zip(records, primary, strict=True):
+        assert rec["model_version"] == "test"
+        assert rec["prediction"] == pytest.approx(resp["predicted_price_per_sqm"])
+        assert rec["shadow"]["v2"]["prediction"] == 50000.0
+        assert rec["shadow"]["v2"]["diff"] == pytest.approx(50000.0 - rec["prediction"])
+    predictions_log = (artifacts_dir / "predictions.jsonl").read_text(encoding="utf-8")
+    assert "shadow" not in predictions_log
+
+
+def test_queue_is_bounded_and_sampling_skips_rows(artifacts_dir: Path) -> None:
+    primary = load_artifacts()
+    candidates = load_candidates(
+        f"v2={_constant_model(artifacts_dir / 'model_v2.pkl', 1.0)}", primary
+    )
+    row = {**PAYLOAD, "transaction_year": None}
+
+    # Not started: nothing drains the queue, so rows past max_queue are dropped
+    scorer = ShadowScorer(candidates, JsonlSink(str(artifacts_dir / "s.jsonl")), max_queue=2)
+    assert [scorer.submit(row, 2.0, "test") for _ in range(4)] == [True, True, False, False]
+    assert scorer.stats()["dropped"] == 2
+
+    scorer.start()
+    scorer.close()
+    stats = scorer.stats()
+    assert stats["scored"] == 2
+    assert stats["candidates"]["v2"]["mean_abs_diff"] == pytest.approx(1.0)
+
+    never = ShadowScorer(candidates, JsonlSink(str(artifacts_dir / "n.jsonl")), sample_rate=0.0)
+    assert not any(never.submit(row, 2.0, "test") for _ in range(50))
+    assert never.stats()["submitted"] == 0
+
+
+def test_worker_survives_failing_log_writes_and_closes_with_full_queue(
+    artifacts_dir: Path,
+) -> None:
+    import time
+
+    class BrokenSink(JsonlSink):
+        def write(self, payload: dict) -> None:
+            raise OSError("disk full")
+
+    candidates = load_candidates(
+        f"v2={_constant_model(artifacts_dir / 'model_v2.pkl', 1.0)}", load_artifacts()
+    )
+    row = {**PAYLOAD, "transaction_year": None}
+    scorer = ShadowScorer(
+        candidates, BrokenSink(str(artifacts_dir / "s.jsonl")), max_queue=2, flush_s=0.01
+    )
+    scorer.start()
+    for _ in range(3):
+        assert scorer.submit(row, 2.0, "test")
+        time.sleep(0.2)
+    assert scorer.stats()["errors"] == 3
+
+    for _ in range(5):
+        scorer.submit(row, 2.0, "test")
+    start = time.perf_counter()
+    scorer.close(timeout=5.0)
+    assert time.perf_counter() - start < 5.0
+    assert scorer.stats()["queued"] == 0
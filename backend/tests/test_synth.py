@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+
+from spi_data.synth import DISTRICTS, district_table, generate_chunk, write_partitions
+
+
+def test_partitions_do_not_depend_on_worker_count(tmp_path: Path) -> None:
+    table = district_table(100, skew=1.0)
+    serial = write_partitions(tmp_path / "a", 2500, chunk_rows=1000, seed=7, districts=table)
+    parallel = write_partitions(
+        tmp_path / "b", 2500, chunk_rows=1000, seed=7, districts=table, workers=2
+    )
+
+    assert [p.name for p in serial] == ["part_000000.csv", "part_000001.csv", "part_000002.csv"]
+    for a, b in zip(serial, parallel, strict=True):
+        assert a.read_bytes() == b.read_bytes()
+    df = pd.concat([pd.read_csv(p) for p in serial])
+    assert len(df) == 2500
+    assert df["district"].isin(table.names).all()
+
+
+def test_district_premium_and_skew() -> None:
+    table = district_table(1000, skew=1.2)
+    df = generate_chunk(20000, seed=0, chunk=0, districts=table)
+
+    assert list(table.names[: len(DISTRICTS)]) == list(DISTRICTS)
+    counts = df["district"].value_counts()
+    assert counts.index[0] == DISTRICTS[0]
+    assert counts.iloc[0] > 20 * counts.iloc[100]
+    # Östermalm's premium shows up against an otherwise identical district mix
+    by_district = df.groupby("district", observed=True)["price_per_sqm"].mean()
+    assert by_district["Östermalm"] - by_district["Norrmalm"] > 25000
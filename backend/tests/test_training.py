@@ -0,0 +1,409 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Callable
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from spi_train.cache import StageCache
+from spi_train.config import load_params
+from spi_train.training import train_and_evaluate
+
+DISTRICTS = ["Södermalm", "Kungsholmen", "Vasastan", "Östermalm", "Bromma", "Farsta"]
+
+
+@pytest.mark.parametrize("encoding", ["onehot", "ordinal", "target"])
+@pytest.mark.parametrize("model_name", ["baseline", "hgb"])
+def test_train_and_evaluate_supports_categorical_encodings(
+    tmp_path: Path,
+    train_csv: Path,
+    encoding: str,
+    model_name: str,
+    write_params: Callable[..., Path],
+) -> None:
+    params = load_params(write_params(data={"encoding": {"method": encoding}}))
+
+    run, model_path, pre_path = train_and_evaluate(
+        params=params, model_name=model_name, repo_root=tmp_path, version_tag="t"
+    )
+
+    assert len(run.fold_metrics) == 3
+    assert np.isfinite(run.mean_mae)
+    pre = joblib.load(pre_path)
+    model = joblib.load(model_path)
+    X = pd.DataFrame(
+        [{"area": 50, "rooms": 2, "district": "Nowhere", "year_built": 1990, "monthly_fee": 3000}]
+    )
+    assert np.isfinite(model.predict(pre.transform(X))).all()
+
+
+def test_target_encoding_is_reproducible(
+    tmp_path: Path, train_csv: Path, write_params: Callable[..., Path]
+) -> None:
+    params = load_params(write_params(data={"encoding": {"method": "target"}}))
+
+    runs = [
+        train_and_evaluate(params=params, model_name="baseline", repo_root=tmp_path, version_tag=t)
+        for t in ("a", "b")
+    ]
+
+    assert runs[0][0].fold_metrics == runs[1][0].fold_metrics
+    X = pd.read_csv(train_csv)
+    encoded = [joblib.load(pre_path).transform(X) for _, _, pre_path in runs]
+    np.testing.assert_array_equal(encoded[0], encoded[1])
+
+
+def test_unknown_encoding_is_rejected(
+    tmp_path: Path, train_csv: Path, write_params: Callable[..., Path]
+) -> None:
+    params = load_params(write_params(data={"encoding": {"method": "hashing"}}))
+    with pytest.raises(ValueError, match="Unknown categorical encoding"):
+        train_and_evaluate(
+            params=params, model_name="baseline", repo_root=tmp_path, version_tag="t"
+        )
+
+
+def test_run_json_records_stage_profile(
+    tmp_path: Path, train_csv: Path, write_params: Callable[..., Path]
+) -> None:
+    params = load_params(write_params())
+
+    train_and_evaluate(
+        params=params, model_name="rf", repo_root=tmp_path, version_tag="t", profile_memory=True
+    )
+
+    payload = json.loads((tmp_path / "reports" / "latest.json").read_text(encoding="utf-8"))
+    profile = payload["profile"]
+    assert {"load_csv", "iqr_clip", "preprocess", "fit", "predict", "full_fit"} <= set(
+        profile["totals"]
+    )
+    assert profile["totals"]["fit"]["calls"] == 3
+    fold_stages = [s for s in profile["stages"] if s["fold"] == 2]
+    assert [s["stage"] for s in fold_stages] == ["preprocess", "fit", "predict"]
+    assert all(s["peak_tracemalloc_mb"] is not None for s in profile["stages"])
+
+
+def test_cache_reuses_upstream_stages_when_only_hyperparameters_change(
+    tmp_path: Path, train_csv: Path, write_params: Callable[..., Path]
+) -> None:
+    cache = StageCache(tmp_path / "cache")
+    params = load_params(write_params())
+    first, _, _ = train_and_evaluate(
+        params=params, model_name="rf", repo_root=tmp_path, version_tag="t", cache=cache
+    )
+    assert cache.hits == 0
+
+    again, _, _ = train_and_evaluate(
+        params=params, model_name="rf", repo_root=tmp_path, version_tag="t", cache=cache
+    )
+    assert again.mean_mae == first.mean_mae
+    assert cache.misses == cache.hits
+
+    hits_before = cache.hits
+    tuned = load_params(
+        write_params(models={"rf": {"type": "random_forest", "n_estimators": 5, "max_depth": 3}})
+    )
+    train_and_evaluate(
+        params=tuned, model_name="rf", repo_root=tmp_path, version_tag="t", cache=cache
+    )
+    # frame + splits + 3 fold preprocessors + full preprocessor are reused; model stages are not
+    assert cache.hits - hits_before == 6
+
+
+def test_missing_training_csv_is_reported_with_cache(
+    tmp_path: Path, write_params: Callable[..., Path]
+) -> None:
+    params = load_params(write_params())
+    with pytest.raises(FileNotFoundError, match="Training CSV not found"):
+        train_and_evaluate(
+            params=params,
+            model_name="baseline",
+            repo_root=tmp_path,
+            version_tag="t",
+            cache=StageCache(tmp_path / "cache"),
+        )
+
+
+def test_cache_evicts_least_recently_used_entries(tmp_path: Path) -> None:
+    cache = StageCache(tmp_path / "cache", max_bytes=10_000)
+    for i in range(5):
+        cache.put(f"{i:02d}" + "0" * 62, np.zeros(400))
+    assert cache.evict() > 0
+    assert cache.size_bytes() <= 10_000
+    assert cache.get("04" + "0" * 62)[0]
+    assert not cache.get("00" + "0" * 62)[0]
+
+
+def test_fitted_clipper_is_saved_with_preprocessor(
+    tmp_path: Path, train_csv: Path, write_params: Callable[..., Path]
+) -> None:
+    params = load_params(
+        write_params(data={"outliers": {"enabled": True, "method": "iqr_clip_fitted"}})
+    )
+
+    run, _, pre_path = train_and_evaluate(
+        params=params, model_name="baseline", repo_root=tmp_path, version_tag="t"
+    )
+
+    assert "iqr_clip" not in _profile_stages(tmp_path)
+    pre = joblib.load(pre_path)
+    clipper = pre.named_transformers_["num"].named_steps["clip"]
+    X = pd.DataFrame(
+        [{"area": 1e6, "rooms": 2, "district": "Bromma", "year_built": 1990, "monthly_fee": 3000}]
+    )
+    area_col = list(pre.get_feature_names_out()).index("area")
+    assert pre.transform(X)[0, area_col] == pytest.approx(clipper.upper_[0])
+
+
+def _profile_stages(repo_root: Path) -> set[str]:
+    payload = json.loads((repo_root / "reports" / "latest.json").read_text(encoding="utf-8"))
+    return set(payload["profile"]["totals"])
+
+
+def test_fused_metrics_match_per_fold_metrics() -> None:
+    from spi_train.fused_metrics import bootstrap_ci, fused_regression_metrics
+    from spi_train.metrics import mae, r2, rmse
+
+    rng = np.random.default_rng(1)
+    y = rng.normal(100, 10, size=400)
+    preds = y + rng.normal(0, 3, size=(2, 400))
+    folds = rng.integers(0, 4, size=400)
+
+    fused = fused_regression_metrics(y, preds, segments=folds)
+
+    for fold in range(4):
+        sel = folds == fold
+        for m in range(2):
+            assert fused["mae"][m, fold] == pytest.approx(mae(y[sel], preds[m, sel]))
+            assert fused["rmse"][m, fold] == pytest.approx(rmse(y[sel], preds[m, sel]))
+            assert fused["r2"][m, fold] == pytest.approx(r2(y[sel], preds[m, sel]))
+
+    ci = bootstrap_ci(y, preds, n_boot=200)
+    for m in range(2):
+        lo, hi = ci["mae"][m]
+        assert lo < mae(y, preds[m]) < hi
+
+
+def test_fused_r2_of_constant_target_is_zero() -> None:
+    from spi_train.fused_metrics import bootstrap_ci, fused_regression_metrics
+
+    rng = np.random.default_rng(0)
+    y = np.full(1000, 52345.67)
+    preds = y + rng.normal(0, 1, size=(1, 1000))
+
+    fused = fused_regression_metrics(y, preds, segments=rng.integers(0, 4, size=1000))
+    assert (fused["r2"] == 0).all()
+    assert (bootstrap_ci(y, preds, n_boot=50)["r2"] == 0).all()
+
+
+def test_run_json_records_extra_metrics(
+    tmp_path: Path, train_csv: Path, write_params: Callable[..., Path]
+) -> None:
+    params = load_params(write_params(train={"bootstrap_samples": 50}))
+
+    train_and_evaluate(params=params, model_name="baseline", repo_root=tmp_path, version_tag="t")
+
+    payload = json.loads((tmp_path / "reports" / "latest.json").read_text(encoding="utf-8"))
+    extra = payload["metrics_extra"]
+    assert extra["mean_mape"] > 0
+    assert set(extra["by_feature"]["district"]) == set(pd.read_csv(train_csv)["district"])
+    lo, hi = extra["bootstrap_ci_95"]["mae"]
+    assert lo <= hi
+
+
+def test_hgb_interval_pair_is_exported(
+    tmp_path: Path, train_csv: Path, write_params: Callable[..., Path]
+) -> None:
+    params = load_params(write_params(train={"interval_level": 0.8}))
+
+    train_and_evaluate(params=params, model_name="hgb", repo_root=tmp_path, version_tag="t")
+
+    payload = json.loads((tmp_path / "reports" / "latest.json").read_text(encoding="utf-8"))
+    assert payload["artifacts"]["interval_path"] == "models/interval_t.pkl"
+    pair = joblib.load(tmp_path / "models" / "interval_t.pkl")
+    assert pair["level"] == 0.8
+    assert pair["lower"].quantile == pytest.approx(0.1)
+    assert pair["upper"].quantile == pytest.approx(0.9)
+
+
+def test_comparables_index_is_exported(
+    tmp_path: Path, train_csv: Path, write_params: Callable[..., Path]
+) -> None:
+    params = load_params(write_params(train={"build_comparables": True}))
+
+    train_and_evaluate(params=params, model_name="baseline", repo_root=tmp_path, version_tag="t")
+
+    payload = json.loads((tmp_path / "reports" / "latest.json").read_text(encoding="utf-8"))
+    assert payload["artifacts"]["comparables_path"] == "models/comparables_t.pkl"
+    assert "comparables" in _profile_stages(tmp_path)
+    index = joblib.load(tmp_path / "models" / "comparables_t.pkl")
+    assert index.n_rows == 300
+    assert set(index.trees) == set(pd.read_csv(train_csv)["district"])
+
+
+def test_comparables_return_unclipped_features(
+    tmp_path: Path, train_csv: Path, write_params: Callable[..., Path]
+) -> None:
+    df = pd.read_csv(train_csv)
+    df.loc[0, ["area", "district"]] = [900.0, "Bromma"]
+    df.to_csv(train_csv, index=False)
+    params = load_params(write_params(train={"build_comparables": True}))
+
+    train_and_evaluate(params=params, model_name="baseline", repo_root=tmp_path, version_tag="t")
+
+    index = joblib.load(tmp_path / "models" / "comparables_t.pkl")
+    query = df.loc[0, ["area", "rooms", "year_built", "monthly_fee"]].to_numpy(dtype=float)
+    found = index.query(query, "Bromma", 300)
+    assert max(c["features"]["area"] for c in found) == pytest.approx(900.0)
+
+
+def test_compression_replaces_forest_with_smaller_flat_forest(
+    tmp_path: Path, train_csv: Path, write_params: Callable[..., Path]
+) -> None:
+    from spi_train.tree_arrays import FlatForest
+
+    params_path = write_params(
+        models={"rf": {"type": "random_forest", "n_estimators": 20, "max_depth": 8}},
+        compression={
+            "enabled": True,
+            "prune_min_gain": 1e-4,
+            "leaf_dtype": "float16",
+            "max_fidelity_loss": 0.05,
+        },
+    )
+    params = load_params(params_path)
+
+    train_and_evaluate(params=params, model_name="rf", repo_root=tmp_path, version_tag="t")
+
+    payload = json.loads((tmp_path / "reports" / "latest.json").read_text(encoding="utf-8"))
+    report = payload["compression"]
+    assert payload["artifacts"]["uncompressed_model_path"] == "models/model_t_uncompressed.pkl"
+    assert report["pruned_nodes"] > 0
+    assert report["n_trees"]["compressed"] <= 20
+    assert report["compressed"]["file_bytes"] < report["original"]["file_bytes"]
+    assert report["fidelity"]["rmse_vs_original"] < 0.05 * 3 * 5000
+    assert "compression" in _profile_stages(tmp_path)
+
+    compressed = joblib.load(tmp_path / "models" / "model_t.pkl")
+    original = joblib.load(tmp_path / "models" / "model_t_uncompressed.pkl")
+    assert isinstance(compressed, FlatForest)
+    assert compressed.value.dtype == np.float16
+    assert compressed.threshold.dtype == np.float32
+    assert len(original.estimators_) == 20
+
+
+def test_distillation_exports_student_and_records_both_models(
+    tmp_path: Path, train_csv: Path, write_params: Callable[..., Path]
+) -> None:
+    from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+
+    params_path = write_params(
+        distillation={
+            "enabled": True,
+            "n_synthetic": 2000,
+            "student": {"type": "hist_gradient_boosting", "max_depth": 3, "max_iter": 50},
+        }
+    )
+    params = load_params(params_path)
+
+    train_and_evaluate(params=params, model_name="rf", repo_root=tmp_path, version_tag="t")
+
+    payload = json.loads((tmp_path / "reports" / "latest.json").read_text(encoding="utf-8"))
+    report = payload["distillation"]
+    assert payload["artifacts"]["teacher_model_path"] == "models/model_t_teacher.pkl"
+    assert report["teacher"]["cv"]["mae"] == pytest.approx(payload["run"]["mean_mae"])
+    assert report["student"]["cv"]["r2"] > 0.5
+    assert report["student"]["type"] == "hist_gradient_boosting"
+    assert "rmse_vs_teacher" in report["fidelity"]
+    assert "distillation" in _profile_stages(tmp_path)
+    assert isinstance(
+        joblib.load(tmp_path / "models" / "model_t.pkl"), HistGradientBoostingRegressor
+    )
+    assert isinstance(
+        joblib.load(tmp_path / "models" / "model_t_teacher.pkl"), RandomForestRegressor
+    )
+
+
+def test_distilled_student_predicts_through_the_serving_path(
+    tmp_path: Path, write_params: Callable[..., Path]
+) -> None:
+    from spi_api.inference import frame_from_rows, predict_frame
+    from spi_api.model_loader import LoadedArtifacts
+
+    # Enough districts that one-hot output falls under ColumnTransformer's sparse threshold
+    rng = np.random.default_rng(0)
+    n = 400
+    districts = [f"District {i}" for i in range(20)]
+    df = pd.DataFrame(
+        {
+            "area": rng.uniform(20, 150, size=n),
+            "rooms": rng.integers(1, 6, size=n),
+            "district": rng.choice(districts, size=n),
+            "year_built": rng.integers(1900, 2024, size=n),
+            "monthly_fee": rng.normal(3500, 800, size=n),
+            "price_per_sqm": rng.normal(60000, 5000, size=n),
+        }
+    )
+    (tmp_path / "data").mkdir()
+    df.to_csv(tmp_path / "data" / "train.csv", index=False)
+    params_path = write_params(
+        distillation={
+            "enabled": True,
+            "n_synthetic": 500,
+            "student": {"type": "hist_gradient_boosting", "max_iter": 20},
+        }
+    )
+
+    _, model_path, pre_path = train_and_evaluate(
+        params=load_params(params_path), model_name="rf", repo_root=tmp_path, version_tag="t"
+    )
+
+    artifacts = LoadedArtifacts(
+        preprocessor=joblib.load(pre_path), model=joblib.load(model_path), model_version="t"
+    )
+    rows = df.drop(columns="price_per_sqm").head(5).to_dict("records")
+    pred = predict_frame(artifacts, frame_from_rows(rows))
+    assert pred.shape == (5,)
+    assert np.isfinite(pred).all()
+
+
+def test_collapsed_duplicates_fit_the_same_linear_model(
+    tmp_path: Path, write_params: Callable[..., Path]
+) -> None:
+    rng = np.random.default_rng(0)
+    n = 400
+    district = rng.choice(DISTRICTS, size=n)
+    df = pd.DataFrame(
+        {
+            "area": rng.integers(3, 6, size=n) * 20.0,
+            "rooms": 2,
+            "district": district,
+            "year_built": 1950,
+            "monthly_fee": 3000.0,
+            "price_per_sqm": 50000 + (district == "Östermalm") * 30000 + rng.normal(0, 500, n),
+        }
+    )
+    (tmp_path / "data").mkdir()
+    df.to_csv(tmp_path / "data" / "train.csv", index=False)
+
+    coefs = {}
+    for collapse in (False, True):
+        params = load_params(write_params(train={"collapse_duplicates": collapse}))
+        train_and_evaluate(
+            params=params, model_name="baseline", repo_root=tmp_path, version_tag=str(collapse)
+        )
+        coefs[collapse] = joblib.load(tmp_path / "models" / f"model_{collapse}.pkl").coef_
+
+    payload = json.loads((tmp_path / "reports" / "latest.json").read_text(encoding="utf-8"))
+    assert payload["collapse_duplicates"] == {"by_target": False, "rows": 400, "unique_rows": 18}
+    assert "collapse_duplicates" in _profile_stages(tmp_path)
+    # Out-of-fold predictions are scored on every original row
+    assert (
+        sum(payload["metrics_extra"]["by_feature"]["district"][d]["count"] for d in DISTRICTS)
+        == 400
+    )
+    np.testing.assert_allclose(coefs[True], coefs[False], rtol=1e-6, atol=1e-6)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+BASE = {
+    "area": 65,
+    "rooms": 2,
+    "district": "Södermalm",
+    "year_built": 1998,
+    "monthly_fee": 3200,
+}
+
+
+def test_trend_matches_single_predictions(artifacts_dir: Path) -> None:
+    from spi_api.main import create_app
+
+    app = create_app()
+    with TestClient(app) as client:
+        resp = client.post(
+            "/predict/trend",
+            json={"request": BASE, "feature": "area", "start": 40, "stop": 100, "step": 20},
+        )
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["feature"] == "area"
+        assert [p["value"] for p in body["points"]] == [40, 60, 80, 100]
+
+        for point in body["points"]:
+            single = client.post("/predict", json={**BASE, "area": point["value"]}).json()
+            assert point["predicted_price_per_sqm"] == pytest.approx(
+                single["predicted_price_per_sqm"]
+            )
+            assert point["predicted_total_price"] == pytest.approx(single["predicted_total_price"])
+
+
+def test_trend_defaults_to_transaction_year_and_logs_one_record(artifacts_dir: Path) -> None:
+    from spi_api.main import create_app
+
+    app = create_app()
+    with TestClient(app) as client:
+        resp = client.post("/predict/trend", json={"request": BASE, "start": 2000, "stop": 2024})
+        assert resp.status_code == 200
+        assert len(resp.json()["points"]) == 25
+
+    lines = (artifacts_dir / "predictions.jsonl").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1
+    record = json.loads(lines[0])
+    assert record["sweep"]["values"] == list(range(2000, 2025))
+    assert len(record["predicted_total_price"]) == 25
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"start": 2024, "stop": 2000},
+        {"start": 1980, "stop": 2024},
+        {"start": 2000.5, "stop": 2024},
+        {"feature": "area", "start": 1, "stop": 10000, "step": 1},
+        {"feature": "area", "start": -10, "stop": 50, "step": 10},
+    ],
+)
+def test_trend_rejects_invalid_ranges(artifacts_dir: Path, payload: dict) -> None:
+    from spi_api.main import create_app
+
+    app = create_app()
+    with TestClient(app) as client:
+        resp = client.post("/predict/trend", json={"request": BASE, **payload})
+        assert resp.status_code == 422
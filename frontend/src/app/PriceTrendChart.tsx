@@ -54,36 +54,32 @@ export default function PriceTrendChart({
 
     async function fetchTrend() {
       setLoading(true);
-      const years = Array.from({ length: 25 }, (_, i) => 2000 + i);
 
-      const results: TrendPoint[] = [];
-
-      // Batch in groups of 5 to avoid hammering the API
-      for (let i = 0; i < years.length; i += 5) {
-        const batch = years.slice(i, i + 5);
-        const promises = batch.map(async (year) => {
-          try {
-            const resp = await fetch(`${apiBaseUrl}/predict`, {
-              method: "POST",
-              headers: { "Content-Type": "application/json" },
-              body: JSON.stringify({ ...form, transaction_year: year }),
-            });
-            if (!resp.ok) return { year, price: null };
-            const json = await resp.json();
-            return {
-              year,
-              price: json.predicted_total_price as number,
-            };
-          } catch {
-            return { year, price: null };
-          }
+      let results: TrendPoint[] = [];
+      try {
+        // One server-side sweep instead of one /predict call per year
+        const resp = await fetch(`${apiBaseUrl}/predict/trend`, {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({
+            request: form,
+            feature: "transaction_year",
+            start: 2000,
+            stop: 2024,
+          }),
         });
-        const batchResults = await Promise.all(promises);
-        results.push(...batchResults);
+        if (resp.ok) {
+          const json = await resp.json();
+          results = (
+            json.points as { value: number; predicted_total_price: number }[]
+          ).map((p) => ({ year: p.value, price: p.predicted_total_price }));
+        }
+      } catch {
+        results = [];
       }
 
       if (!cancelled) {
-        setData(results.sort((a, b) => a.year - b.year));
+        setData(results);
         setLoading(false);
       }
     }